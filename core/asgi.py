@@ -1,8 +1,14 @@
 """
-ASGI config for proyecto_oftalmologico project.
+ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Con ASGI las vistas async de gestion_clinica (dashboard, calendario de turnos y
+búsqueda de pacientes) atienden muchos requests concurrentes sin un thread por
+request. Ejemplo:
+
+    uvicorn core.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -11,6 +17,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proyecto_oftalmologico.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
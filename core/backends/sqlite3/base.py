@@ -0,0 +1,113 @@
+# core/backends/sqlite3/base.py
+
+"""
+Backend SQLite para producción (ENGINE = 'core.backends.sqlite3').
+
+Sobre el backend estándar de Django:
+
+- Al conectar aplica los PRAGMAS (WAL, synchronous=NORMAL, caché, mmap, ...):
+  con WAL los lectores no bloquean al escritor ni viceversa.
+- Las transacciones (transaction.atomic) empiezan con BEGIN IMMEDIATE: el lock
+  de escritura se toma al inicio, de modo que dos transacciones que leen y luego
+  escriben esperan su turno en lugar de fallar con "database is locked".
+- Si el lock no se obtiene dentro del 'timeout' de SQLite, se reintenta con
+  espera exponencial (con jitter). Solo se reintenta lo que es seguro repetir:
+  el BEGIN de una transacción y las sentencias sueltas fuera de una transacción.
+
+Opciones adicionales en DATABASES[...]['OPTIONS']:
+    'pragmas': dict que se combina con PRAGMAS (None elimina uno).
+    'reintentos': cantidad máxima de reintentos (default: REINTENTOS).
+    'espera_inicial': primera espera en segundos (default: ESPERA_INICIAL).
+"""
+
+import logging
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Con WAL, NORMAL solo puede perder la última transacción ante un corte de energía
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,      # ~20 MB de caché de páginas por conexión
+    'mmap_size': 268435456,    # 256 MB mapeados en memoria
+    'temp_store': 'MEMORY',
+    'wal_autocheckpoint': 1000,
+}
+
+TIMEOUT = 10          # segundos que SQLite espera el lock antes de devolver SQLITE_BUSY
+REINTENTOS = 5
+ESPERA_INICIAL = 0.05
+ESPERA_MAXIMA = 2.0
+
+
+def es_bloqueo(error):
+    mensaje = str(error).lower()
+    return 'database is locked' in mensaje or 'database is busy' in mensaje
+
+
+class ReintentosMixin:
+    """Ejecuta una función reintentando mientras la base esté bloqueada."""
+
+    def con_reintentos(self, funcion, *args):
+        intento = 0
+        while True:
+            try:
+                return funcion(*args)
+            except base.Database.OperationalError as error:
+                if not es_bloqueo(error) or intento >= self.reintentos:
+                    raise
+                espera = min(ESPERA_MAXIMA, self.espera_inicial * 2 ** intento)
+                espera *= random.uniform(0.5, 1.5)
+                intento += 1
+                logger.warning(
+                    "SQLite bloqueada, reintento %s/%s en %.3f s", intento, self.reintentos, espera)
+                time.sleep(espera)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+
+    def execute(self, query, params=None):
+        # Fuera de una transacción (sentencias sueltas y el propio BEGIN IMMEDIATE) se
+        # reintenta; dentro no: lo ya ejecutado en la transacción se perdería al fallar.
+        if self.connection.in_transaction:
+            return super().execute(query, params)
+        return self.db_wrapper.con_reintentos(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        if self.connection.in_transaction:
+            return super().executemany(query, param_list)
+        param_list = list(param_list)
+        return self.db_wrapper.con_reintentos(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(ReintentosMixin, base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        opciones = self.settings_dict['OPTIONS']
+
+        self.pragmas = {**PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.reintentos = kwargs.pop('reintentos', REINTENTOS)
+        self.espera_inicial = kwargs.pop('espera_inicial', ESPERA_INICIAL)
+        kwargs.setdefault('timeout', TIMEOUT)
+        # BEGIN IMMEDIATE salvo que se configure otro 'transaction_mode' explícitamente
+        if 'transaction_mode' not in opciones:
+            self.transaction_mode = 'IMMEDIATE'
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = self.con_reintentos(super().get_new_connection, conn_params)
+        for nombre, valor in self.pragmas.items():
+            if valor is not None:
+                # journal_mode=WAL toma un lock momentáneo: también se reintenta
+                self.con_reintentos(conn.execute, f'PRAGMA {nombre} = {valor}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.db_wrapper = self
+        return cursor
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir el request completo (gestion_clinica/middleware.py)
+    'gestion_clinica.middleware.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'gestion_clinica.middleware.FijarPrimarioMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -53,8 +56,6 @@ TEMPLATES = [
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         # Directorio de templates a nivel proyecto (opcional)
         'DIRS': [BASE_DIR / 'templates'],
-        # Busca templates dentro de las carpetas 'templates' de cada app (CLAVE)
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -62,6 +63,15 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates compilados una sola vez por proceso (también con DEBUG: el
+            # autoreload de runserver descarta la caché al editar un template).
+            # Busca en DIRS y en las carpetas 'templates' de cada app (reemplaza a APP_DIRS).
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -72,13 +82,63 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Backend SQLite propio (core/backends/sqlite3): WAL, pragmas, BEGIN IMMEDIATE y
+# reintentos ante "database is locked". Las conexiones se reutilizan entre requests.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 10,
+        },
+    },
+    # Copia de solo lectura para listados, reportes y exportaciones (gestion_clinica/replica.py).
+    # Se refresca con 'python manage.py refrescar_replica --intervalo 60'; mientras no
+    # exista el archivo, todas las lecturas usan 'default'.
+    'replica': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 10,
+            # Sin journal_mode: la copia ya trae el de la principal, y abrir una réplica
+            # todavía inexistente no debe escribir nada en el archivo vacío
+            'pragmas': {'journal_mode': None, 'query_only': 'ON'},
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['gestion_clinica.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# 'fragmentos': HTML de la ficha del paciente ({% cache %} en paciente_detail.html).
+# Es memoria local de cada proceso: los datos clínicos no se escriben en disco y la
+# clave incluye el sello de versión del paciente, así que no hace falta invalidar
+# entre workers (cada uno renderiza una vez por versión).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'consultorio-default',
+    },
+    'fragmentos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'consultorio-fragmentos',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
 }
 
+# Segundos que un navegador lee de la base principal después de escribir
+# (debe superar el intervalo de refresco de la réplica)
+REPLICA_FIJAR_PRIMARIO = 120
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,3 +198,57 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 # Configuración de redirección de Login y Logout
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Números de registro de paciente reservados por proceso en cada viaje a la BD
+NUM_REGISTRO_BLOQUE = 20
+
+# Agenda por defecto para profesionales sin HorarioAtencion cargado (ver gestion_clinica/agenda.py)
+AGENDA_HORARIO_DEFECTO = {
+    'dias': [0, 1, 2, 3, 4],  # Lunes a viernes
+    'hora_inicio': '08:00',
+    'hora_fin': '20:00',
+    'duracion_turno': 30,
+}
+
+# Cada cuánto cada proceso verifica si cambió la versión de los catálogos en caché
+# (Profesional, ObraSocial; ver gestion_clinica/catalogos.py), en segundos
+CATALOGOS_VERIFICAR_CADA = 5
+
+# HTML de formularios sin enviar guardado en memoria por proceso (templatetags/formularios.py)
+FORMULARIOS_CACHE_CAPACIDAD = 200
+
+# Vigencia del HTML de la ficha del paciente (caché 'fragmentos') y de sus tendencias
+# de PIO/AV (gestion_clinica/tendencias.py), en segundos. Un cambio en el paciente,
+# sus HC/E.O. o los catálogos genera otra clave antes de eso.
+FICHA_PACIENTE_CACHE_SEGUNDOS = 60 * 60 * 24
+
+# Archivos generados por tareas en segundo plano (gestion_clinica/trabajos.py)
+TAREAS_ARCHIVOS_DIR = BASE_DIR / 'archivos' / 'tareas'
+
+# PDF de consultas y fichas, guardados por contenido (gestion_clinica/documentos.py)
+DOCUMENTOS_PDF_DIR = BASE_DIR / 'archivos' / 'documentos'
+
+# Listados del admin de tablas grandes (gestion_clinica/admin.py, ChangelistRapidoMixin):
+# tope del conteo de resultados filtrados y vigencia de la primera/última fecha de
+# date_hierarchy (caché 'default'), en segundos
+ADMIN_LIMITE_CONTEO = 10000
+ADMIN_LIMITES_FECHAS_SEGUNDOS = 60 * 10
+
+# Instrumentación de requests (gestion_clinica/middleware.py y metricas.py)
+INSTRUMENTACION_UMBRAL_LENTO_MS = 500  # requests más lentos se registran en 'gestion_clinica.lentas'
+INSTRUMENTACION_CAPACIDAD = 1000       # mediciones recientes guardadas por vista
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'gestion_clinica': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'core.backends': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
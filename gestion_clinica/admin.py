@@ -1,22 +1,112 @@
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import Q
+from django.utils import timezone
 from .models import (
     Profesional,
     ObraSocial,
     Paciente,
     HistoriaClinica,
     ExamenOftalmologico,
-    Turno  # ⭐ Nuevo: Importar el modelo Turno ⭐
+    Turno,  # ⭐ Nuevo: Importar el modelo Turno ⭐
+    HorarioAtencion,
+    Tarea,
 )
+from . import agenda, busqueda_clinica, catalogos, reportes, tareas
+from .busqueda import buscar_pacientes, normalizar
+from .forms import TurnoAdminForm
+from .paginacion import PaginadorEstimado
+
+
+class CatalogoListFilter(admin.RelatedFieldListFilter):
+    """Filtro lateral por profesional/obra social leído de la caché de catalogos.py."""
+
+    def field_choices(self, field, request, model_admin):
+        return [(objeto.pk, str(objeto)) for objeto in catalogos.de_modelo(field.related_model).todos()]
+
+
+class FranjaEdadListFilter(admin.SimpleListFilter):
+    """Filtro por franja de edad (reportes.FRANJAS_EDAD), resuelto sobre fecha_nacimiento."""
+    title = 'franja de edad'
+    parameter_name = 'edad'
+
+    def lookups(self, request, model_admin):
+        return [(etiqueta, etiqueta) for etiqueta, _, _ in reportes.FRANJAS_EDAD]
+
+    def queryset(self, request, queryset):
+        for etiqueta, minimo, maximo in reportes.FRANJAS_EDAD:
+            if self.value() == etiqueta:
+                return reportes.filtrar_por_edad(queryset, minimo, maximo)
+        return queryset
+
+
+def buscar_profesionales(termino):
+    """Ids de profesionales cuyo apellido, nombre o matrícula empiezan con cada palabra (caché de catálogos)."""
+    palabras = normalizar(termino).split()
+    return [
+        profesional.pk for profesional in catalogos.PROFESIONALES.todos()
+        if all(
+            any(valor.startswith(palabra) for valor in normalizar(str(profesional)).split())
+            for palabra in palabras
+        )
+    ]
+
+
+class ChangelistRapidoMixin:
+    """
+    Listados del admin para tablas grandes:
+    - list_select_related (en cada admin): las columnas FK salen del mismo SELECT.
+    - PaginadorEstimado y sin show_full_result_count: ningún COUNT(*) de la tabla entera.
+    - date_hierarchy con la primera/última fecha en caché (templatetags/admin_rapido.py).
+    - Búsqueda solo por índices: id exacto, paciente por busqueda.py (busqueda_paciente
+      es la ruta hasta Paciente) y profesional por prefijo en la caché de catálogos
+      (busqueda_profesional). search_fields solo habilita la caja de búsqueda. Las
+      búsquedas traen hasta ADMIN_LIMITE_CONTEO ids (no el tope del autocompletado).
+    sortable_by deja ordenar solo por columnas indexadas.
+    """
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    change_list_template = 'admin/gestion_clinica/change_list_rapido.html'
+    busqueda_paciente = None
+    busqueda_profesional = None
+
+    def condiciones_busqueda(self, termino):
+        condiciones = []
+        if termino.isdigit():
+            condiciones.append(Q(pk=int(termino)))
+        if self.busqueda_paciente:
+            pacientes = buscar_pacientes(termino, limite=settings.ADMIN_LIMITE_CONTEO)
+            condiciones.append(Q(**{f'{self.busqueda_paciente}__in': pacientes}))
+        if self.busqueda_profesional:
+            condiciones.append(Q(**{f'{self.busqueda_profesional}__in': buscar_profesionales(termino)}))
+        return condiciones
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        condiciones = self.condiciones_busqueda(search_term.strip())
+        if not condiciones:
+            return queryset.none(), False
+        return queryset.filter(reduce(or_, condiciones)), False
 
 # -------------------------------------------------------------
 # 1. Administración de Modelos de Catálogo
 # -------------------------------------------------------------
 
 
+class HorarioAtencionInline(admin.TabularInline):
+    model = HorarioAtencion
+    extra = 0
+
+
 @admin.register(Profesional)
 class ProfesionalAdmin(admin.ModelAdmin):
     list_display = ['apellido', 'nombre', 'matricula']
     search_fields = ['apellido', 'nombre', 'matricula']
+    inlines = [HorarioAtencionInline]  # Agenda semanal (ver agenda.py)
 
 
 @admin.register(ObraSocial)
@@ -38,7 +128,7 @@ class ExamenInline(admin.StackedInline):
 
 
 @admin.register(Paciente)
-class PacienteAdmin(admin.ModelAdmin):
+class PacienteAdmin(ChangelistRapidoMixin, admin.ModelAdmin):
     list_display = [
         'num_registro',
         'apellido',
@@ -48,8 +138,17 @@ class PacienteAdmin(admin.ModelAdmin):
         'obra_social'
     ]
     search_fields = ['num_registro', 'apellido', 'nombre', 'dni']
-    list_filter = ['genero', 'obra_social']
+    list_filter = ['genero', FranjaEdadListFilter, ('obra_social', CatalogoListFilter)]
+    list_select_related = ['obra_social']
     readonly_fields = ['num_registro']  # Se genera vía signal
+    autocomplete_fields = ['obra_social']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Se usa el índice de búsqueda (busqueda.py) en lugar de un icontains por campo;
+        # también lo aprovecha el autocompletado de paciente en HC y Turnos.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=buscar_pacientes(search_term, limite=settings.ADMIN_LIMITE_CONTEO)), False
 
 
 class ExamenOftalmologicoInline(admin.StackedInline):
@@ -58,7 +157,7 @@ class ExamenOftalmologicoInline(admin.StackedInline):
 
 
 @admin.register(HistoriaClinica)
-class HistoriaClinicaAdmin(admin.ModelAdmin):
+class HistoriaClinicaAdmin(ChangelistRapidoMixin, admin.ModelAdmin):
     list_display = [
         'id',
         'fecha',  # ⭐ CORREGIDO: Usar 'fecha' en lugar de 'fecha_consulta'
@@ -67,13 +166,18 @@ class HistoriaClinicaAdmin(admin.ModelAdmin):
         'profesional',
     ]
     list_filter = [
-        'profesional',
+        ('profesional', CatalogoListFilter),
         'fecha',  # ⭐ CORREGIDO: Usar 'fecha' en lugar de 'fecha_consulta'
     ]
+    list_select_related = ['paciente', 'profesional']
+    sortable_by = ['id', 'fecha']
     search_fields = ['paciente__apellido', 'diagnostico']
+    busqueda_paciente = 'paciente'
+    busqueda_profesional = 'profesional'
     date_hierarchy = 'fecha'  # ⭐ CORREGIDO: Usar 'fecha'
     autocomplete_fields = ['paciente', 'profesional']
     inlines = [ExamenOftalmologicoInline]
+
     fieldsets = (
         (None, {
             'fields': ('paciente', 'profesional')
@@ -83,12 +187,21 @@ class HistoriaClinicaAdmin(admin.ModelAdmin):
         }),
     )
 
+    def condiciones_busqueda(self, termino):
+        # Además, texto de HC/E.O. por el índice FTS5 (busqueda_clinica.py) en lugar de un LIKE sobre diagnostico
+        return super().condiciones_busqueda(termino) + [
+            Q(pk__in=busqueda_clinica.buscar_ids(termino, limite=settings.ADMIN_LIMITE_CONTEO))]
+
 
 @admin.register(ExamenOftalmologico)
-class ExamenOftalmologicoAdmin(admin.ModelAdmin):
+class ExamenOftalmologicoAdmin(ChangelistRapidoMixin, admin.ModelAdmin):
     list_display = ['historia_clinica', 'pio_od',
                     'pio_oi', 'agudeza_visual_od', 'agudeza_visual_oi']
+    list_select_related = ['historia_clinica__paciente']  # __str__ de la HC muestra el paciente
+    sortable_by = []
     search_fields = ['historia_clinica__paciente__apellido']
+    busqueda_paciente = 'historia_clinica__paciente'
+    busqueda_profesional = 'historia_clinica__profesional'
 
 # -------------------------------------------------------------
 # 3. Administración del Nuevo Modelo Turno (Objetivo 2.1)
@@ -96,18 +209,58 @@ class ExamenOftalmologicoAdmin(admin.ModelAdmin):
 
 
 @admin.register(Turno)
-class TurnoAdmin(admin.ModelAdmin):
+class TurnoAdmin(ChangelistRapidoMixin, admin.ModelAdmin):
     list_display = ['fecha_hora', 'paciente', 'profesional', 'estado']
-    list_filter = ['estado', 'profesional']
+    list_filter = ['estado', ('profesional', CatalogoListFilter)]
+    list_select_related = ['paciente', 'profesional']
+    sortable_by = ['fecha_hora']
     search_fields = ['paciente__apellido', 'profesional__apellido']
+    busqueda_paciente = 'paciente'
+    busqueda_profesional = 'profesional'
     date_hierarchy = 'fecha_hora'
     autocomplete_fields = ['paciente', 'profesional']
+    form = TurnoAdminForm  # Superposición y horario de atención (agenda.py)
     fieldsets = (
         (None, {
-            'fields': ('paciente', 'profesional', 'fecha_hora', 'estado')
+            'fields': ('paciente', 'profesional', 'fecha_hora', 'duracion', 'estado')
         }),
         ('Notas', {
             'fields': ('observaciones',),
             'classes': ('collapse',),  # Oculta las observaciones por defecto
         })
     )
+
+    def save_model(self, request, obj, form, change):
+        # Con la agenda del profesional bloqueada, igual que las reservas de las vistas
+        agenda.reservar(obj)
+
+
+# -------------------------------------------------------------
+# 4. Cola de Tareas en Segundo Plano (solo consulta)
+# -------------------------------------------------------------
+
+
+@admin.register(Tarea)
+class TareaAdmin(ChangelistRapidoMixin, admin.ModelAdmin):
+    list_display = ['pk', 'tipo', 'estado', 'prioridad', 'progreso', 'intentos', 'usuario', 'creada', 'finalizada']
+    list_filter = ['estado', 'tipo']
+    list_select_related = ['usuario']
+    date_hierarchy = 'creada'
+    actions = ['reintentar', 'cancelar']
+    readonly_fields = [campo.name for campo in Tarea._meta.fields]
+
+    def has_add_permission(self, request):
+        # Las tareas se crean con tareas.encolar()
+        return False
+
+    @admin.action(description="Reintentar las tareas fallidas o canceladas seleccionadas")
+    def reintentar(self, request, queryset):
+        cantidad = queryset.filter(estado__in=(tareas.FALLIDA, tareas.CANCELADA)).update(
+            estado=tareas.PENDIENTE, intentos=0, error='', progreso=0, mensaje='',
+            finalizada=None, disponible_desde=timezone.now())
+        self.message_user(request, f"{cantidad} tareas vuelven a la cola.")
+
+    @admin.action(description="Cancelar las tareas pendientes o en curso seleccionadas")
+    def cancelar(self, request, queryset):
+        cantidad = sum(tareas.cancelar(pk) for pk in queryset.values_list('pk', flat=True))
+        self.message_user(request, f"{cantidad} tareas canceladas.")
@@ -0,0 +1,247 @@
+# gestion_clinica/agenda.py
+
+"""
+Motor de disponibilidad de turnos por profesional.
+
+- Los horarios de atención salen de HorarioAtencion (o de AGENDA_HORARIO_DEFECTO
+  si el profesional no tiene horarios cargados).
+- esta_libre() hace una consulta indexada acotada al intervalo pedido (solo los
+  turnos que pueden solaparse con él) y los compara directamente.
+- proximos_libres() carga los turnos ocupados de un bloque de días con una sola
+  consulta y los organiza en un IndiceIntervalos (listas ordenadas + bisect):
+  armarlo cuesta O(n log n) por bloque y cada slot candidato se verifica en
+  O(log n).
+- reservar() vuelve a verificar la disponibilidad dentro de una transacción que
+  bloquea la agenda del profesional, de modo que dos recepcionistas que reservan
+  el mismo horario a la vez no generan un doble turno. Todo guardado de un turno
+  (alta, cambio de estado, admin) pasa por reservar().
+"""
+
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DURACION_MAXIMA_TURNO, HorarioAtencion, Profesional, Turno
+
+# Estados que no ocupan lugar en la agenda
+ESTADOS_LIBRES = ('CANCELADO',)
+
+# Cantidad de días que se consultan por vez al buscar turnos libres
+DIAS_POR_BLOQUE = 7
+
+# -------------------------------------------------------------
+# 1. Índice de intervalos
+# -------------------------------------------------------------
+
+
+class IndiceIntervalos:
+    """
+    Intervalos ocupados [inicio, fin) ordenados por inicio. 'fin_maximo[i]' guarda
+    el mayor fin entre los intervalos 0..i, lo que permite detectar solapamientos
+    con una búsqueda binaria aun si hubiera turnos superpuestos cargados.
+    """
+
+    def __init__(self, intervalos):
+        intervalos = sorted(intervalos)
+        self.inicios = [inicio for inicio, _ in intervalos]
+        self.fin_maximo = []
+        maximo = None
+        for _, fin in intervalos:
+            maximo = fin if maximo is None or fin > maximo else maximo
+            self.fin_maximo.append(maximo)
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def esta_libre(self, inicio, fin):
+        # Intervalos que empiezan antes de 'fin': los primeros i de la lista
+        i = bisect_left(self.inicios, fin)
+        return i == 0 or self.fin_maximo[i - 1] <= inicio
+
+
+def _turnos_ocupados(profesional_id, desde, hasta, excluir_turno_id=None):
+    """Turnos activos que pueden solaparse con [desde, hasta) (una sola consulta)."""
+    queryset = Turno.objects.filter(
+        profesional_id=profesional_id,
+        fecha_hora__gte=desde - timedelta(minutes=DURACION_MAXIMA_TURNO),
+        fecha_hora__lt=hasta,
+    ).exclude(estado__in=ESTADOS_LIBRES)
+    if excluir_turno_id:
+        queryset = queryset.exclude(pk=excluir_turno_id)
+    return [
+        (fecha_hora, fecha_hora + timedelta(minutes=duracion))
+        for fecha_hora, duracion in queryset.values_list('fecha_hora', 'duracion')
+    ]
+
+# -------------------------------------------------------------
+# 2. Horarios de atención
+# -------------------------------------------------------------
+
+
+def _limites_dia(dia):
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return inicio, inicio + timedelta(days=1)
+
+
+def _horario_defecto():
+    config = settings.AGENDA_HORARIO_DEFECTO
+    return {
+        dia: [(
+            time.fromisoformat(config['hora_inicio']),
+            time.fromisoformat(config['hora_fin']),
+            config['duracion_turno'],
+        )]
+        for dia in config['dias']
+    }
+
+
+def horarios_semanales(profesional_id, usar_defecto=True):
+    """
+    {dia_semana: [(hora_inicio, hora_fin, duracion_turno), ...]} del profesional.
+    Si no tiene horarios cargados se usa el horario por defecto (o {} si usar_defecto=False).
+    """
+    horarios = {}
+    for dia, inicio, fin, duracion in HorarioAtencion.objects.filter(
+        profesional_id=profesional_id
+    ).values_list('dia_semana', 'hora_inicio', 'hora_fin', 'duracion_turno'):
+        horarios.setdefault(dia, []).append((inicio, fin, duracion))
+    if not horarios and usar_defecto:
+        return _horario_defecto()
+    return horarios
+
+
+def _franjas_del_dia(horarios, dia):
+    """Franjas [inicio, fin) con fecha y hora (aware) para un día concreto."""
+    for hora_inicio, hora_fin, duracion in sorted(horarios.get(dia.weekday(), [])):
+        yield (
+            timezone.make_aware(datetime.combine(dia, hora_inicio)),
+            timezone.make_aware(datetime.combine(dia, hora_fin)),
+            timedelta(minutes=duracion),
+        )
+
+
+def dentro_de_horario(horarios, inicio, fin):
+    dia = timezone.localtime(inicio).date()
+    return any(
+        franja_inicio <= inicio and fin <= franja_fin
+        for franja_inicio, franja_fin, _ in _franjas_del_dia(horarios, dia)
+    )
+
+# -------------------------------------------------------------
+# 3. Consultas de disponibilidad
+# -------------------------------------------------------------
+
+
+def esta_libre(profesional_id, inicio, duracion, excluir_turno_id=None):
+    """¿Está libre el intervalo [inicio, inicio + duracion) para el profesional?"""
+    fin = inicio + timedelta(minutes=duracion)
+    return all(
+        ocupado_fin <= inicio or fin <= ocupado_inicio
+        for ocupado_inicio, ocupado_fin in _turnos_ocupados(profesional_id, inicio, fin, excluir_turno_id)
+    )
+
+
+def proximos_libres(profesional_id, desde=None, cantidad=5, dias_maximos=60):
+    """
+    Devuelve hasta 'cantidad' slots libres [(inicio, fin), ...] a partir de 'desde',
+    recorriendo las franjas de atención del profesional día por día. Los turnos
+    ocupados se cargan en bloques de DIAS_POR_BLOQUE días (una consulta por bloque).
+    """
+    desde = desde or timezone.now()
+    horarios = horarios_semanales(profesional_id)
+    libres = []
+    primer_dia = timezone.localtime(desde).date()
+
+    for desplazamiento in range(0, dias_maximos, DIAS_POR_BLOQUE):
+        bloque_inicio = primer_dia + timedelta(days=desplazamiento)
+        dias = [bloque_inicio + timedelta(days=i)
+                for i in range(min(DIAS_POR_BLOQUE, dias_maximos - desplazamiento))]
+        if not any(dia.weekday() in horarios for dia in dias):
+            continue
+
+        limite_inferior, _ = _limites_dia(dias[0])
+        _, limite_superior = _limites_dia(dias[-1])
+        indice = IndiceIntervalos(
+            _turnos_ocupados(profesional_id, limite_inferior, limite_superior))
+
+        for dia in dias:
+            for franja_inicio, franja_fin, paso in _franjas_del_dia(horarios, dia):
+                slot = franja_inicio
+                while slot + paso <= franja_fin:
+                    fin = slot + paso
+                    if slot >= desde and indice.esta_libre(slot, fin):
+                        libres.append((slot, fin))
+                        if len(libres) >= cantidad:
+                            return libres
+                    slot = fin
+    return libres
+
+# -------------------------------------------------------------
+# 4. Reserva segura ante concurrencia
+# -------------------------------------------------------------
+
+
+def bloquear_agenda(profesional_id):
+    """
+    Bloquea la agenda del profesional hasta el fin de la transacción actual.
+    Con SELECT ... FOR UPDATE donde la base lo soporta; en SQLite, una escritura
+    inocua sobre el profesional toma el lock de escritura de la base de datos,
+    serializando las reservas concurrentes.
+    """
+    if connection.features.has_select_for_update:
+        Profesional.objects.select_for_update().filter(pk=profesional_id).exists()
+    else:
+        Profesional.objects.filter(pk=profesional_id).update(matricula=F('matricula'))
+
+
+def ocupa_lugar_nuevo(turno):
+    """
+    ¿Guardar el turno toma un lugar de la agenda que antes no ocupaba? (alta,
+    reactivación de un turno cancelado o cambio de profesional, horario o
+    duración). Los demás cambios (ej: pasar a ATENDIDO) no se vuelven a verificar.
+    """
+    if turno.estado in ESTADOS_LIBRES:
+        return False
+    if turno.pk is None:
+        return True
+    anterior = Turno.objects.filter(pk=turno.pk).values(
+        'estado', 'profesional_id', 'fecha_hora', 'duracion').first()
+    return (
+        anterior is None
+        or anterior['estado'] in ESTADOS_LIBRES
+        or (anterior['profesional_id'], anterior['fecha_hora'], anterior['duracion'])
+        != (turno.profesional_id, turno.fecha_hora, turno.duracion)
+    )
+
+
+def validar_disponibilidad(turno):
+    """Lanza ValidationError si el turno se superpone con otro o cae fuera del horario."""
+    if turno.estado in ESTADOS_LIBRES:
+        return
+
+    fin = turno.fecha_hora + timedelta(minutes=turno.duracion)
+    if not esta_libre(turno.profesional_id, turno.fecha_hora, turno.duracion, turno.pk):
+        raise ValidationError(
+            "El profesional ya tiene un turno asignado en ese horario.", code='superpuesto')
+
+    # Solo se restringe al horario de atención si el profesional lo tiene cargado
+    horarios = horarios_semanales(turno.profesional_id, usar_defecto=False)
+    if horarios and not dentro_de_horario(horarios, turno.fecha_hora, fin):
+        raise ValidationError(
+            "El horario elegido está fuera de la agenda de atención del profesional.",
+            code='fuera_de_horario')
+
+
+def reservar(turno):
+    """Guarda el turno; si ocupa un lugar nuevo, verifica la disponibilidad con la agenda bloqueada."""
+    with transaction.atomic():
+        bloquear_agenda(turno.profesional_id)
+        if ocupa_lugar_nuevo(turno):
+            validar_disponibilidad(turno)
+        turno.save()
+    return turno
@@ -11,3 +11,4 @@ class GestionClinicaConfig(AppConfig):
     def ready(self):
         """Importa las señales de la aplicación para que Django las detecte."""
         import gestion_clinica.signals  # <-- Se asegura de que signals.py se ejecute.
+        import gestion_clinica.trabajos  # Registro de tipos de tarea en segundo plano (tareas.py)
@@ -0,0 +1,288 @@
+# gestion_clinica/busqueda.py
+
+"""
+Motor de búsqueda de pacientes.
+
+Mantiene un índice normalizado (IndicePaciente), las palabras de apellido y
+nombre (PalabraPaciente) y una tabla de trigramas (TrigramaPaciente) por
+paciente. Las búsquedas combinan:
+
+1. Coincidencias exactas y por prefijo en DNI y N° de registro.
+2. Coincidencias por prefijo en apellido y nombre (insensibles a acentos y mayúsculas),
+   también en las palabras que no van primero ('garcia' encuentra a 'Pérez García').
+3. Coincidencias aproximadas por trigramas (solo si las anteriores casi no dan resultados).
+
+Todas las búsquedas por prefijo se resuelven como rangos (>= q, < q + '\\uffff')
+sobre columnas indexadas, de modo que nunca se recorre la tabla completa.
+"""
+
+import math
+import re
+import unicodedata
+
+from django.db import connections, router, transaction
+from django.db.models import Count
+
+from .models import IndicePaciente, PalabraPaciente, TrigramaPaciente
+
+# Cantidad máxima de resultados por defecto (autocompletado y API); limite=None devuelve todos
+LIMITE_RESULTADOS = 200
+# Proporción mínima de trigramas de la consulta que debe compartir un paciente
+SIMILITUD_MINIMA = 0.5
+# La búsqueda aproximada solo corre si las exactas/por prefijo dan menos resultados que esto
+MINIMO_SIN_TRIGRAMAS = 5
+# Tope de pacientes candidatos de la búsqueda aproximada (y de filas contadas por trigrama)
+TOPE_CANDIDATOS_TRIGRAMAS = 2000
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+# -------------------------------------------------------------
+# 1. Normalización
+# -------------------------------------------------------------
+
+
+def normalizar(texto):
+    """Convierte a minúsculas, elimina acentos y signos: 'Pérez-Núñez' -> 'perez nunez'."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def trigramas(texto):
+    """
+    Devuelve el conjunto de trigramas de cada palabra del texto normalizado.
+    Como en pg_trgm, cada palabra se rellena con dos espacios al inicio y uno al final.
+    """
+    resultado = set()
+    for palabra in normalizar(texto).split():
+        palabra = f'  {palabra} '
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+def _rango_prefijo(campo, prefijo):
+    """Filtro de rango equivalente a 'campo LIKE prefijo%' que aprovecha el índice."""
+    return {f'{campo}__gte': prefijo, f'{campo}__lt': prefijo + '\uffff'}
+
+# -------------------------------------------------------------
+# 2. Mantenimiento del índice
+# -------------------------------------------------------------
+
+
+def _entrada_indice(paciente):
+    return IndicePaciente(
+        paciente_id=paciente.pk,
+        apellido=normalizar(paciente.apellido),
+        nombre=normalizar(paciente.nombre),
+        dni=normalizar(paciente.dni).replace(' ', ''),
+        num_registro=paciente.num_registro or '',
+    )
+
+
+def _palabras_paciente(paciente):
+    apellido = set(normalizar(paciente.apellido).split())
+    return [
+        PalabraPaciente(paciente_id=paciente.pk, palabra=palabra, en_apellido=palabra in apellido)
+        for palabra in apellido | set(normalizar(paciente.nombre).split())
+    ]
+
+
+def _trigramas_paciente(paciente):
+    return [
+        TrigramaPaciente(paciente_id=paciente.pk, trigrama=trigrama)
+        for trigrama in trigramas(f'{paciente.apellido} {paciente.nombre}')
+    ]
+
+
+def indexar_paciente(paciente):
+    """Actualiza (o crea) las entradas de índice de un paciente."""
+    entrada = _entrada_indice(paciente)
+    with transaction.atomic():
+        IndicePaciente.objects.update_or_create(
+            paciente_id=paciente.pk,
+            defaults={
+                'apellido': entrada.apellido,
+                'nombre': entrada.nombre,
+                'dni': entrada.dni,
+                'num_registro': entrada.num_registro,
+            },
+        )
+        PalabraPaciente.objects.filter(paciente_id=paciente.pk).delete()
+        PalabraPaciente.objects.bulk_create(_palabras_paciente(paciente))
+        TrigramaPaciente.objects.filter(paciente_id=paciente.pk).delete()
+        TrigramaPaciente.objects.bulk_create(_trigramas_paciente(paciente))
+
+
+def indexar_pacientes(pacientes, batch_size=1000):
+    """
+    Indexa en bloque pacientes recién creados (ej: después de un bulk_create,
+    que no dispara señales). Los pacientes no deben estar indexados previamente.
+    """
+    entradas, palabras_bloque, trigramas_bloque = [], [], []
+    for paciente in pacientes:
+        entradas.append(_entrada_indice(paciente))
+        palabras_bloque.extend(_palabras_paciente(paciente))
+        trigramas_bloque.extend(_trigramas_paciente(paciente))
+
+    with transaction.atomic():
+        IndicePaciente.objects.bulk_create(entradas, batch_size=batch_size)
+        PalabraPaciente.objects.bulk_create(palabras_bloque, batch_size=batch_size)
+        TrigramaPaciente.objects.bulk_create(trigramas_bloque, batch_size=batch_size)
+
+# -------------------------------------------------------------
+# 3. Búsqueda
+# -------------------------------------------------------------
+
+
+def buscar_pacientes(consulta, limite=LIMITE_RESULTADOS):
+    """
+    Devuelve una lista de IDs de pacientes ordenados por relevancia (como mucho
+    'limite'; con limite=None, todos los que coinciden).
+
+    Puntajes: DNI/registro exacto > prefijo de DNI/registro > apellido exacto >
+    prefijo de apellido > otra palabra del apellido > prefijo de nombre > otra
+    palabra del nombre > similitud por trigramas.
+    """
+    texto = normalizar(consulta)
+    if not texto:
+        return []
+
+    puntajes = {}
+
+    def sumar(ids, puntaje):
+        for paciente_id in ids:
+            if puntaje > puntajes.get(paciente_id, 0):
+                puntajes[paciente_id] = puntaje
+
+    indice = IndicePaciente.objects.values_list('paciente_id', flat=True)
+    compacto = texto.replace(' ', '')
+
+    if compacto.isdigit():
+        # Búsqueda numérica: DNI o N° de registro
+        sumar(indice.filter(dni=compacto)[:limite], 100)
+        sumar(indice.filter(num_registro=compacto)[:limite], 100)
+        sumar(indice.filter(**_rango_prefijo('dni', compacto))[:limite], 80)
+        sumar(indice.filter(**_rango_prefijo('num_registro', compacto))[:limite], 80)
+        return _ordenar(puntajes, limite)
+
+    palabras = texto.split()
+
+    # Apellido completo (ej: 'perez garcia') o su primera palabra
+    sumar(indice.filter(apellido=texto)[:limite], 70)
+    sumar(_buscar_por_prefijo('apellido', palabras, limite), 60)
+    sumar(_buscar_por_prefijo('nombre', palabras, limite), 40)
+    # Cualquier palabra del apellido o del nombre (apellidos y nombres compuestos)
+    en_apellido, en_nombre = _buscar_por_palabra(palabras, limite)
+    sumar(en_apellido, 50)
+    sumar(en_nombre, 30)
+
+    if len(puntajes) < MINIMO_SIN_TRIGRAMAS and len(compacto) >= 3:
+        # Búsqueda aproximada (errores de tipeo, apellidos compuestos, etc.)
+        for paciente_id, similitud in _buscar_por_trigramas(texto, limite):
+            sumar([paciente_id], similitud * 30)
+
+    return _ordenar(puntajes, limite)
+
+
+def _buscar_por_prefijo(campo, palabras, limite):
+    """
+    Pacientes cuyo 'campo' empieza con la primera palabra. Con varias palabras
+    ('perez juan'), todas deben ser prefijo de alguna palabra del paciente: se
+    filtra mientras se recorre el rango, antes de aplicar el límite.
+    """
+    candidatos = IndicePaciente.objects.filter(**_rango_prefijo(campo, palabras[0]))
+    if len(palabras) == 1:
+        return list(candidatos.values_list('paciente_id', flat=True)[:limite])
+
+    coincidentes = []
+    for paciente_id, apellido, nombre in candidatos.values_list(
+            'paciente_id', 'apellido', 'nombre').iterator(chunk_size=1000):
+        if _contiene_prefijos(palabras, f'{apellido} {nombre}'):
+            coincidentes.append(paciente_id)
+            if limite is not None and len(coincidentes) >= limite:
+                break
+    return coincidentes
+
+
+def _buscar_por_palabra(palabras, limite):
+    """
+    (ids por palabra del apellido, ids por palabra del nombre) de los pacientes con
+    alguna palabra que empieza con la primera de la consulta; con varias palabras,
+    como en _buscar_por_prefijo, todas deben ser prefijo de alguna del paciente.
+    """
+    filas = PalabraPaciente.objects.filter(**_rango_prefijo('palabra', palabras[0]))
+    if len(palabras) > 1:
+        filas = filas.values_list(
+            'paciente_id', 'en_apellido', 'paciente__indice_busqueda__apellido',
+            'paciente__indice_busqueda__nombre')
+    else:
+        filas = filas.values_list('paciente_id', 'en_apellido')
+
+    en_apellido, en_nombre = [], []
+    for fila in filas.iterator(chunk_size=1000):
+        if len(palabras) > 1 and not _contiene_prefijos(palabras, f'{fila[2]} {fila[3]}'):
+            continue
+        (en_apellido if fila[1] else en_nombre).append(fila[0])
+        if limite is not None and len(en_apellido) + len(en_nombre) >= limite:
+            break
+    return en_apellido, en_nombre
+
+
+def _contiene_prefijos(palabras, texto_paciente):
+    palabras_paciente = texto_paciente.split()
+    return all(
+        any(p.startswith(palabra) for p in palabras_paciente)
+        for palabra in palabras
+    )
+
+
+def _buscar_por_trigramas(texto, limite):
+    """
+    Pacientes que comparten al menos SIMILITUD_MINIMA de los trigramas de la consulta.
+
+    Quien comparte 'minimo' de los n trigramas tiene al menos uno de los
+    n - minimo + 1 más raros, así que los candidatos salen solo de esos (los
+    comunes, como ' pe' o 'ez ', tienen listas enormes) y el conteo por paciente
+    se hace sobre ellos. Cada trigrama se cuenta hasta TOPE_CANDIDATOS_TRIGRAMAS.
+    """
+    trigramas_consulta = trigramas(texto)
+    if not trigramas_consulta:
+        return []
+
+    minimo = max(1, math.ceil(len(trigramas_consulta) * SIMILITUD_MINIMA))
+    frecuencias = _frecuencias(trigramas_consulta)
+    raros = sorted(trigramas_consulta, key=lambda trigrama: (frecuencias[trigrama], trigrama))
+    # Subconsulta (no una lista de ids): el filtro se arma sin pasar cada id por el ORM
+    candidatos = (
+        TrigramaPaciente.objects.filter(trigrama__in=raros[:len(raros) - minimo + 1])
+        .values('paciente_id').distinct()[:TOPE_CANDIDATOS_TRIGRAMAS]
+    )
+    filas = (
+        TrigramaPaciente.objects.filter(trigrama__in=trigramas_consulta, paciente_id__in=candidatos)
+        .values('paciente_id')
+        .annotate(coincidencias=Count('*'))
+        .filter(coincidencias__gte=minimo)
+        .order_by('-coincidencias')[:limite]
+    )
+    total = len(trigramas_consulta)
+    return [(fila['paciente_id'], fila['coincidencias'] / total) for fila in filas]
+
+
+def _frecuencias(trigramas_consulta):
+    """Pacientes con cada trigrama (hasta TOPE_CANDIDATOS_TRIGRAMAS), en una sola consulta."""
+    trigramas_consulta = sorted(trigramas_consulta)
+    tabla = TrigramaPaciente._meta.db_table
+    conteo = f"(SELECT COUNT(*) FROM (SELECT 1 FROM {tabla} WHERE trigrama = %s LIMIT %s))"
+    parametros = []
+    for trigrama in trigramas_consulta:
+        parametros += [trigrama, TOPE_CANDIDATOS_TRIGRAMAS]
+    with connections[router.db_for_read(TrigramaPaciente)].cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join([conteo] * len(trigramas_consulta))}", parametros)
+        return dict(zip(trigramas_consulta, cursor.fetchone()))
+
+
+def _ordenar(puntajes, limite):
+    ordenados = sorted(puntajes.items(), key=lambda item: (-item[1], item[0]))
+    return [paciente_id for paciente_id, _ in ordenados[:limite]]
@@ -0,0 +1,198 @@
+# gestion_clinica/busqueda_clinica.py
+
+"""
+Búsqueda de texto completo en los campos narrativos de HC y E.O.
+
+Usa la tabla FTS5 de SQLite creada en la migración 0017 (rowid = id de la HC),
+con el tokenizador unicode61 sin diacríticos: 'excavación', 'EXCAVACION' y
+'excavacion' son el mismo término. Los triggers de esa migración la mantienen
+al día en cada alta, modificación o baja (incluidos los bulk_create).
+
+- consulta_fts(): traduce lo que escribe el usuario a una expresión MATCH.
+  Cada palabra se busca como prefijo ('excav' encuentra 'excavación') y todas
+  deben aparecer; el texto entre comillas se busca como frase exacta. La
+  entrada se normaliza antes (busqueda.normalizar), así que nunca llega
+  sintaxis de FTS5 escrita por el usuario.
+- buscar(): resultados ordenados por relevancia (bm25, con PESOS por campo) y
+  fragmentos resaltados de cada campo que coincide. Cuesta dos consultas por
+  página: la de FTS5 y la de las HC con su paciente.
+"""
+
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import catalogos
+from .busqueda import normalizar
+from .models import ExamenOftalmologico, HistoriaClinica
+
+TABLA = 'gestion_clinica_historia_fts'
+
+# (columna de la tabla FTS, etiqueta), en el orden de la tabla
+CAMPOS = (
+    ('motivo_consulta', 'Motivo de consulta'),
+    ('diagnostico', 'Diagnóstico'),
+    ('tratamiento', 'Tratamiento'),
+    ('observaciones', 'Observaciones'),
+    ('biomicroscopia', 'Biomicroscopía'),
+    ('fondo_ojo', 'Fondo de ojo'),
+    ('observaciones_examen', 'Observaciones del examen'),
+)
+# Peso de cada columna en bm25 (una coincidencia en el diagnóstico vale más que en el motivo)
+PESOS = (1.0, 3.0, 1.5, 1.0, 2.0, 2.0, 1.0)
+
+RESULTADOS_POR_PAGINA = 25
+# Tope de resultados para quien pide solo ids (ej: búsqueda del admin)
+LIMITE_IDS = 1000
+# Palabras por consulta (las siguientes se ignoran)
+MAXIMO_TERMINOS = 8
+# Tokens por fragmento resaltado
+LARGO_FRAGMENTO = 12
+
+# Marcas de inicio/fin de coincidencia en los fragmentos (se reemplazan por <mark> después de escapar)
+_INICIO, _FIN = '\x02', '\x03'
+_FRASES = re.compile(r'"([^"]*)"')
+
+# -------------------------------------------------------------
+# 1. Consulta
+# -------------------------------------------------------------
+
+
+def consulta_fts(texto, campo=None):
+    """
+    Expresión MATCH para el texto del usuario ('' si no queda ningún término).
+    campo (una columna de CAMPOS) limita la búsqueda a esa columna.
+    """
+    terminos = []
+    for frase in _FRASES.findall(texto or ''):
+        frase = normalizar(frase)
+        if frase:
+            terminos.append(f'"{frase}"')
+    for palabra in normalizar(_FRASES.sub(' ', texto or '')).split():
+        terminos.append(f'"{palabra}"*')
+    if not terminos:
+        return ''
+    expresion = ' AND '.join(terminos[:MAXIMO_TERMINOS])
+    if campo in dict(CAMPOS):
+        expresion = f'{campo} : ({expresion})'
+    return expresion
+
+
+def _conexion():
+    # Misma base que el resto de las lecturas (la réplica dentro de LecturaReplicaMixin)
+    return connections[router.db_for_read(HistoriaClinica)]
+
+
+def _resaltar(fragmento):
+    return mark_safe(escape(fragmento).replace(_INICIO, '<mark>').replace(_FIN, '</mark>'))
+
+
+# -------------------------------------------------------------
+# 2. Búsqueda
+# -------------------------------------------------------------
+
+
+def buscar_ids(texto, campo=None, limite=LIMITE_IDS):
+    """Ids de HC que coinciden, de la más relevante a la menos relevante."""
+    expresion = consulta_fts(texto, campo)
+    if not expresion:
+        return []
+    with _conexion().cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s AND rank MATCH %s ORDER BY rank LIMIT %s",
+            [expresion, _rango(), limite],
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _rango():
+    return f"bm25({', '.join(str(peso) for peso in PESOS)})"
+
+
+def buscar(texto, campo=None, pagina=1, por_pagina=RESULTADOS_POR_PAGINA, paciente_id=None):
+    """
+    Una página de resultados: {'resultados': [...], 'pagina', 'hay_mas'}.
+
+    Cada resultado trae la HC (con paciente), el nombre del profesional (caché
+    de catálogos) y 'coincidencias': [(etiqueta, fragmento HTML resaltado)].
+    """
+    expresion = consulta_fts(texto, campo)
+    pagina = max(int(pagina), 1)
+    vacio = {'resultados': [], 'pagina': pagina, 'hay_mas': False}
+    if not expresion:
+        return vacio
+
+    fragmentos = ', '.join(
+        f"snippet({TABLA}, {columna}, '{_INICIO}', '{_FIN}', '…', {LARGO_FRAGMENTO})"
+        for columna in range(len(CAMPOS))
+    )
+    filtro_paciente, parametros = '', [expresion, _rango()]
+    if paciente_id is not None:
+        filtro_paciente = (
+            f" AND rowid IN (SELECT id FROM {HistoriaClinica._meta.db_table} WHERE paciente_id = %s)")
+        parametros.append(paciente_id)
+    # Se pide una fila de más para saber si hay otra página (sin contar el total)
+    parametros += [por_pagina + 1, (pagina - 1) * por_pagina]
+
+    conexion = _conexion()
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, {fragmentos} FROM {TABLA} "
+            f"WHERE {TABLA} MATCH %s AND rank MATCH %s{filtro_paciente} "
+            f"ORDER BY rank LIMIT %s OFFSET %s",
+            parametros,
+        )
+        filas = cursor.fetchall()
+    if not filas:
+        return vacio
+
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    historias = (
+        HistoriaClinica.objects.using(conexion.alias).select_related('paciente')
+        .only('fecha', 'profesional_id', 'paciente__apellido',
+              'paciente__nombre', 'paciente__num_registro')
+        .in_bulk([fila[0] for fila in filas])
+    )
+    resultados = []
+    for historia_id, *textos in filas:
+        historia = historias.get(historia_id)
+        if historia is None:
+            # Borrada entre las dos consultas
+            continue
+        resultados.append({
+            'historia': historia,
+            'profesional': catalogos.PROFESIONALES.obtener(historia.profesional_id),
+            'coincidencias': [
+                (etiqueta, _resaltar(fragmento))
+                for (_, etiqueta), fragmento in zip(CAMPOS, textos)
+                if fragmento and _INICIO in fragmento
+            ],
+        })
+    return {'resultados': resultados, 'pagina': pagina, 'hay_mas': hay_mas}
+
+
+# -------------------------------------------------------------
+# 3. Mantenimiento
+# -------------------------------------------------------------
+
+
+def reconstruir(optimizar=True):
+    """Vuelve a cargar el índice desde las tablas (ej: después de restaurar un backup parcial)."""
+    historias, examenes = HistoriaClinica._meta.db_table, ExamenOftalmologico._meta.db_table
+    with transaction.atomic(), connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA}")
+        cursor.execute(
+            f"INSERT INTO {TABLA} (rowid, motivo_consulta, diagnostico, tratamiento, observaciones, "
+            f"biomicroscopia, fondo_ojo, observaciones_examen) "
+            f"SELECT h.id, h.motivo_consulta, h.diagnostico, h.tratamiento, h.observaciones, "
+            f"coalesce(e.biomicroscopia, ''), coalesce(e.fondo_ojo, ''), coalesce(e.observaciones, '') "
+            f"FROM {historias} h LEFT JOIN {examenes} e ON e.historia_clinica_id = h.id"
+        )
+        total = cursor.rowcount
+        if optimizar:
+            # Fusiona los segmentos del índice (las altas incrementales van creando segmentos chicos)
+            cursor.execute(f"INSERT INTO {TABLA} ({TABLA}) VALUES ('optimize')")
+    return total
@@ -0,0 +1,99 @@
+# gestion_clinica/catalogos.py
+
+"""
+Caché en memoria (por proceso) de los catálogos Profesional y ObraSocial.
+
+Son tablas chicas que cambian pocas veces al año pero se leen en casi todos los
+requests (selects de formularios, filtros de listados, títulos del calendario).
+
+- Cada catálogo guarda sus filas junto con un número de versión, almacenado en
+  la tabla Contador (clave 'catalogo:<modelo>').
+- Al guardar o borrar una fila, las señales (signals.py) incrementan la versión
+  y descartan la copia local. Los demás procesos (otros workers) comparan su
+  versión con la de la base cada CATALOGOS_VERIFICAR_CADA segundos y recargan
+  si cambió.
+- Las operaciones masivas que no disparan señales (bulk_create, update) deben
+  llamar a invalidar() a mano.
+
+Los objetos en caché son compartidos: se tratan como de solo lectura.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import contadores
+from .models import Contador, ObraSocial, Profesional
+
+
+class Catalogo:
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.clave = f'catalogo:{modelo._meta.model_name}'
+        self.version = None
+        self._objetos = None
+        self._por_pk = {}
+        self._verificado = None
+        self._lock = threading.Lock()
+
+    def _version_en_base(self):
+        return Contador.objects.using(DEFAULT_DB_ALIAS).filter(
+            clave=self.clave).values_list('valor', flat=True).first() or 0
+
+    def _vigente(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if self._objetos is not None and ahora - self._verificado < settings.CATALOGOS_VERIFICAR_CADA:
+                return self._objetos, self._por_pk
+            # La versión se lee antes que las filas: si alguien escribe en el medio,
+            # la próxima verificación vuelve a cargar.
+            version = self._version_en_base()
+            if self._objetos is None or version != self.version:
+                # Siempre de la base principal: la réplica puede estar atrasada
+                objetos = tuple(self.modelo.objects.using(DEFAULT_DB_ALIAS).all())
+                self._objetos = objetos
+                self._por_pk = {objeto.pk: objeto for objeto in objetos}
+                self.version = version
+            self._verificado = ahora
+            return self._objetos, self._por_pk
+
+    def todos(self):
+        """Todas las filas, en el orden del Meta.ordering del modelo."""
+        return self._vigente()[0]
+
+    def por_pk(self):
+        return self._vigente()[1]
+
+    def obtener(self, pk):
+        """Fila con ese pk (o None). Acepta pks como texto, como los que llegan en un POST."""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return self.por_pk().get(pk)
+
+    def olvidar(self):
+        """Descarta la copia local (la próxima lectura recarga)."""
+        with self._lock:
+            self._objetos = None
+
+    def invalidar(self):
+        """Incrementa la versión en la base (avisa a los demás procesos) y descarta la copia local."""
+        contadores.incrementar_total(self.clave)
+        self.olvidar()
+        # Otro thread del proceso pudo recargar las filas anteriores antes del commit
+        transaction.on_commit(self.olvidar)
+
+
+PROFESIONALES = Catalogo(Profesional)
+OBRAS_SOCIALES = Catalogo(ObraSocial)
+
+_POR_MODELO = {catalogo.modelo: catalogo for catalogo in (PROFESIONALES, OBRAS_SOCIALES)}
+
+
+def de_modelo(modelo):
+    """Catálogo en caché de un modelo, o None si el modelo no tiene caché."""
+    return _POR_MODELO.get(modelo)
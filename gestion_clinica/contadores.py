@@ -0,0 +1,182 @@
+# gestion_clinica/contadores.py
+
+"""
+Contadores materializados para el dashboard.
+
+- Contador: totales globales (ej: pacientes registrados).
+- ContadorDiario: cantidad de consultas y de turnos por día (hora local).
+
+Las señales (signals.py) los actualizan en cada alta/baja/reprogramación, y el
+comando 'reconstruir_contadores' los recalcula desde cero. El dashboard lee
+solo unas pocas filas, sin importar el tamaño de las tablas.
+
+contar_entre() cuenta un intervalo de fecha/hora exacto: los días completos salen
+de ContadorDiario y las puntas (el resto del primer y del último día) se cuentan
+en la tabla, con el índice de la fecha.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Contador, ContadorDiario, HistoriaClinica, Paciente, Turno
+
+TOTAL_PACIENTES = 'pacientes'
+CONSULTAS = 'consultas'
+TURNOS = 'turnos'
+
+# Tabla y campo de fecha de cada métrica diaria
+ORIGENES = {
+    CONSULTAS: (HistoriaClinica, 'fecha'),
+    TURNOS: (Turno, 'fecha_hora'),
+}
+
+# -------------------------------------------------------------
+# 1. Actualización incremental
+# -------------------------------------------------------------
+
+
+def _incrementar(queryset, crear, campo, delta):
+    """UPDATE campo = campo + delta; si la fila no existe se crea (tolerando altas concurrentes)."""
+    if not delta:
+        return
+    if queryset.update(**{campo: F(campo) + delta}):
+        return
+    try:
+        with transaction.atomic():
+            crear(delta)
+    except IntegrityError:
+        # Otro proceso creó la fila entre el UPDATE y el INSERT
+        queryset.update(**{campo: F(campo) + delta})
+
+
+def incrementar_total(clave, delta=1):
+    _incrementar(
+        Contador.objects.filter(clave=clave),
+        lambda valor: Contador.objects.create(clave=clave, valor=valor),
+        'valor', delta,
+    )
+
+
+def incrementar_dia(metrica, dia, delta=1):
+    _incrementar(
+        ContadorDiario.objects.filter(metrica=metrica, dia=dia),
+        lambda cantidad: ContadorDiario.objects.create(metrica=metrica, dia=dia, cantidad=cantidad),
+        'cantidad', delta,
+    )
+
+
+def dia_local(fecha_hora):
+    """Día (en la zona horaria del sistema) al que pertenece una fecha/hora."""
+    return timezone.localdate(fecha_hora) if timezone.is_aware(fecha_hora) else fecha_hora.date()
+
+# -------------------------------------------------------------
+# 2. Lectura
+# -------------------------------------------------------------
+
+
+def _valor_total(clave):
+    return Contador.objects.filter(clave=clave).values_list('valor', flat=True)
+
+
+def _dias(metrica, desde, hasta):
+    return ContadorDiario.objects.filter(metrica=metrica, dia__range=(desde, hasta))
+
+
+def total(clave):
+    return _valor_total(clave).first() or 0
+
+
+def suma_dias(metrica, desde, hasta):
+    """Suma de una métrica entre dos días (ambos inclusive)."""
+    return _dias(metrica, desde, hasta).aggregate(total=Sum('cantidad'))['total'] or 0
+
+
+def _inicio_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _partes(metrica, desde, hasta):
+    """
+    [desde, hasta) como (días completos en ContadorDiario, filas de las puntas en la
+    tabla de origen). Si no hay ningún día completo, todo se cuenta en la tabla.
+    """
+    modelo, campo = ORIGENES[metrica]
+    primer_completo = dia_local(desde)
+    if desde > _inicio_dia(primer_completo):
+        primer_completo += timedelta(days=1)
+    ultimo_completo = dia_local(hasta) - timedelta(days=1)
+    if primer_completo > ultimo_completo:
+        return None, modelo.objects.filter(**{f'{campo}__gte': desde, f'{campo}__lt': hasta})
+    puntas = modelo.objects.filter(
+        Q(**{f'{campo}__gte': desde, f'{campo}__lt': _inicio_dia(primer_completo)})
+        | Q(**{f'{campo}__gte': _inicio_dia(ultimo_completo + timedelta(days=1)), f'{campo}__lt': hasta})
+    )
+    return _dias(metrica, primer_completo, ultimo_completo), puntas
+
+
+def contar_entre(metrica, desde, hasta):
+    """Cantidad con fecha/hora en [desde, hasta)."""
+    dias, puntas = _partes(metrica, desde, hasta)
+    completos = 0
+    if dias is not None:
+        completos = dias.aggregate(total=Sum('cantidad'))['total'] or 0
+    return completos + puntas.count()
+
+
+# Versiones async (ORM async de Django) para las vistas async
+
+
+async def atotal(clave):
+    return await _valor_total(clave).afirst() or 0
+
+
+async def asuma_dias(metrica, desde, hasta):
+    resultado = await _dias(metrica, desde, hasta).aaggregate(total=Sum('cantidad'))
+    return resultado['total'] or 0
+
+
+async def acontar_entre(metrica, desde, hasta):
+    dias, puntas = _partes(metrica, desde, hasta)
+    completos = 0
+    if dias is not None:
+        completos = (await dias.aaggregate(total=Sum('cantidad')))['total'] or 0
+    return completos + await puntas.acount()
+
+# -------------------------------------------------------------
+# 3. Reconstrucción completa
+# -------------------------------------------------------------
+
+
+def _por_dia(queryset, campo):
+    return (
+        queryset.annotate(dia=TruncDate(campo))
+        .values('dia')
+        .annotate(cantidad=Count('pk'))
+        .order_by()
+    )
+
+
+@transaction.atomic
+def reconstruir():
+    """Recalcula todos los contadores a partir de las tablas de origen."""
+    # Las demás claves de Contador (ej: versiones de catalogos.py) no se derivan de tablas
+    Contador.objects.filter(clave=TOTAL_PACIENTES).delete()
+    ContadorDiario.objects.all().delete()
+
+    Contador.objects.create(clave=TOTAL_PACIENTES, valor=Paciente.objects.count())
+
+    filas = []
+    for metrica, queryset, campo in (
+        (CONSULTAS, HistoriaClinica.objects.all(), 'fecha'),
+        (TURNOS, Turno.objects.all(), 'fecha_hora'),
+    ):
+        filas.extend(
+            ContadorDiario(metrica=metrica, dia=fila['dia'], cantidad=fila['cantidad'])
+            for fila in _por_dia(queryset, campo)
+        )
+    ContadorDiario.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
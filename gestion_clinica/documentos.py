@@ -0,0 +1,327 @@
+# gestion_clinica/documentos.py
+
+"""
+PDF de una consulta (HC + E.O.) y de la ficha completa del paciente.
+
+Los PDF se guardan por contenido en settings.DOCUMENTOS_PDF_DIR:
+
+- datos_consulta() / datos_ficha(): todo lo que se imprime, como dict JSON.
+- clave(): sha256 de esos datos (y de VERSION_DISENO). Como HC y E.O. son
+  inmutables, la misma consulta siempre da la misma clave; si cambia algo que
+  se imprime (datos filiatorios, nombre del profesional, una consulta nueva
+  en la ficha) cambia la clave y se genera otro archivo.
+- obtener(): ruta del PDF; se genera solo si todavía no existe en disco.
+
+Las fichas con más de CONSULTAS_SINCRONICAS consultas no se generan durante
+el request: se encolan como tarea 'generar_ficha_pdf' (trabajos.py).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import KeepTogether, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from . import catalogos, tareas
+from .models import HistoriaClinica, Tarea
+
+# Cambiarla cuando cambie el diseño del PDF: invalida todos los archivos generados
+VERSION_DISENO = 1
+# Fichas con más consultas se generan en segundo plano
+CONSULTAS_SINCRONICAS = 20
+
+TITULO = 'OptiGestión - Consultorio Oftalmológico'
+SIN_DATOS = 'Sin datos'
+
+# -------------------------------------------------------------
+# 1. Datos a imprimir
+# -------------------------------------------------------------
+
+
+def _datos_paciente(paciente):
+    obra_social = catalogos.OBRAS_SOCIALES.obtener(paciente.obra_social_id)
+    return {
+        'num_registro': paciente.num_registro,
+        'apellido': paciente.apellido,
+        'nombre': paciente.nombre,
+        'dni': paciente.dni,
+        'fecha_nacimiento': f'{paciente.fecha_nacimiento:%d/%m/%Y}',
+        'genero': paciente.get_genero_display(),
+        'obra_social': str(obra_social) if obra_social else '',
+        'num_afiliado': paciente.num_afiliado or '',
+    }
+
+
+def _datos_historia(historia):
+    datos = {
+        'pk': historia.pk,
+        'fecha': f'{timezone.localtime(historia.fecha):%d/%m/%Y %H:%M}',
+        'profesional': str(historia.profesional),
+        'motivo_consulta': historia.motivo_consulta,
+        'diagnostico': historia.diagnostico,
+        'tratamiento': historia.tratamiento,
+        'observaciones': historia.observaciones,
+        'examen': None,
+    }
+    examen = getattr(historia, 'examen', None)
+    if examen is not None:
+        datos['examen'] = {
+            'agudeza_visual_od': examen.agudeza_visual_od or '',
+            'agudeza_visual_oi': examen.agudeza_visual_oi or '',
+            'pio_od': examen.pio_od or '',
+            'pio_oi': examen.pio_oi or '',
+            'biomicroscopia': examen.biomicroscopia,
+            'fondo_ojo': examen.fondo_ojo,
+            'observaciones': examen.observaciones or '',
+        }
+    return datos
+
+
+def _historias():
+    return HistoriaClinica.objects.select_related('profesional', 'examen')
+
+
+def datos_consulta(historia_pk):
+    """Datos del PDF de una consulta (HistoriaClinica.DoesNotExist si no existe)."""
+    historia = _historias().select_related('paciente').get(pk=historia_pk)
+    return {
+        'documento': 'consulta',
+        'paciente': _datos_paciente(historia.paciente),
+        'historias': [_datos_historia(historia)],
+    }
+
+
+def datos_ficha(paciente):
+    """Datos del PDF de la ficha completa: antecedentes y todas las consultas, de la más antigua a la más reciente."""
+    historias = _historias().filter(paciente=paciente).order_by('fecha', 'pk')
+    return {
+        'documento': 'ficha',
+        'paciente': _datos_paciente(paciente),
+        'antecedentes_sistemicos': paciente.antecedentes_sistemicos or '',
+        'antecedentes_oftalmologicos': paciente.antecedentes_oftalmologicos or '',
+        'historias': [_datos_historia(historia) for historia in historias],
+    }
+
+
+# -------------------------------------------------------------
+# 2. Almacenamiento por contenido
+# -------------------------------------------------------------
+
+
+def clave(datos):
+    contenido = json.dumps([VERSION_DISENO, datos], sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def clave_ficha(paciente):
+    """
+    (clave, cantidad de consultas) de la ficha sin armar sus datos. Queda en caché
+    mientras no cambien la ficha (ficha_actualizada) ni los catálogos que se
+    imprimen (obra social, nombre del profesional).
+    """
+    versiones = []
+    for catalogo in (catalogos.PROFESIONALES, catalogos.OBRAS_SOCIALES):
+        catalogo.por_pk()  # verifica la versión vigente del catálogo
+        versiones.append(str(catalogo.version))
+    clave_cache = (
+        f'documentos:ficha:{paciente.pk}-{paciente.ficha_actualizada.timestamp()}'
+        f':{":".join(versiones)}:{VERSION_DISENO}'
+    )
+    resultado = cache.get(clave_cache)
+    if resultado is None:
+        datos = datos_ficha(paciente)
+        resultado = (clave(datos), len(datos['historias']))
+        cache.set(clave_cache, resultado, settings.FICHA_PACIENTE_CACHE_SEGUNDOS)
+    return resultado
+
+
+def ruta(clave_documento):
+    """Archivo del documento (dos niveles de directorio para no acumular miles de archivos juntos)."""
+    return Path(settings.DOCUMENTOS_PDF_DIR) / clave_documento[:2] / f'{clave_documento}.pdf'
+
+
+def existe(datos):
+    return ruta(clave(datos)).is_file()
+
+
+def obtener(datos, progreso=None):
+    """Ruta del PDF de esos datos; lo genera si no existe (escritura atómica: nunca se sirve un archivo a medias)."""
+    destino = ruta(clave(datos))
+    if destino.is_file():
+        return destino
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as salida:
+            renderizar(datos, salida, progreso)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    return destino
+
+
+def nombre_archivo(datos):
+    paciente = datos['paciente']
+    if datos['documento'] == 'consulta':
+        fecha = datos['historias'][0]['fecha'][:10].replace('/', '-')
+        return f"consulta_{paciente['num_registro']}_{fecha}.pdf"
+    return f"ficha_{paciente['num_registro']}.pdf"
+
+
+def encolar_ficha(paciente, clave_documento, usuario=None):
+    """
+    Tarea que genera la ficha; si ya hay una pendiente o en curso para esa clave, la
+    reutiliza. Si la última falló se encola otra: los reintentos de cada una los
+    limita su propio max_intentos.
+    """
+    tarea = (
+        Tarea.objects.filter(tipo='generar_ficha_pdf', parametros__clave=clave_documento)
+        .order_by('-pk').first()
+    )
+    if tarea is None or tarea.estado in (tareas.COMPLETADA, tareas.CANCELADA, tareas.FALLIDA):
+        tarea = tareas.encolar(
+            'generar_ficha_pdf', {'paciente': paciente.pk, 'clave': clave_documento}, prioridad=5, usuario=usuario)
+    return tarea
+
+
+# -------------------------------------------------------------
+# 3. Renderizado (ReportLab)
+# -------------------------------------------------------------
+
+_ESTILOS = getSampleStyleSheet()
+ESTILO_TEXTO = ParagraphStyle('Texto', parent=_ESTILOS['BodyText'], fontSize=9.5, leading=12)
+ESTILO_ETIQUETA = ParagraphStyle('Etiqueta', parent=ESTILO_TEXTO, fontName='Helvetica-Bold')
+ESTILO_TITULO = ParagraphStyle('Titulo', parent=_ESTILOS['Heading2'], spaceAfter=4)
+ESTILO_SECCION = ParagraphStyle(
+    'Seccion', parent=_ESTILOS['Heading4'], textColor=colors.HexColor('#0d6efd'), spaceBefore=8, spaceAfter=2)
+
+ESTILO_TABLA = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e9f2fb')),
+    ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#e9f2fb')),
+])
+
+
+def _parrafo(texto, estilo=ESTILO_TEXTO):
+    """Texto del usuario como párrafo (se escapa: ReportLab interpreta marcado)."""
+    return Paragraph(escape(texto or SIN_DATOS).replace('\n', '<br/>'), estilo)
+
+
+def _tabla(pares):
+    """Tabla de dos pares (etiqueta, valor) por fila."""
+    filas = []
+    for inicio in range(0, len(pares), 2):
+        fila = []
+        for etiqueta, valor in pares[inicio:inicio + 2]:
+            fila += [Paragraph(escape(etiqueta), ESTILO_ETIQUETA), _parrafo(valor)]
+        filas.append(fila + [''] * (4 - len(fila)))
+    tabla = Table(filas, colWidths=[3.5 * cm, 5 * cm, 3.5 * cm, 5 * cm])
+    tabla.setStyle(ESTILO_TABLA)
+    if len(pares) % 2:
+        # El último valor ocupa también las columnas del par que falta
+        tabla.setStyle([('SPAN', (1, -1), (3, -1)), ('BACKGROUND', (2, -1), (2, -1), colors.white)])
+    return tabla
+
+
+def _bloques_paciente(datos):
+    paciente = datos['paciente']
+    bloques = [
+        Paragraph(escape(f"{paciente['apellido']}, {paciente['nombre']}"), ESTILO_TITULO),
+        _tabla([
+            ('N° de registro', paciente['num_registro']),
+            ('DNI', paciente['dni']),
+            ('Fecha de nacimiento', paciente['fecha_nacimiento']),
+            ('Género', paciente['genero']),
+            ('Obra social', paciente['obra_social']),
+            ('N° de afiliado', paciente['num_afiliado']),
+        ]),
+    ]
+    if datos['documento'] == 'ficha':
+        bloques += [
+            Paragraph('Antecedentes sistémicos', ESTILO_SECCION), _parrafo(datos['antecedentes_sistemicos']),
+            Paragraph('Antecedentes oftalmológicos', ESTILO_SECCION), _parrafo(datos['antecedentes_oftalmologicos']),
+        ]
+    return bloques
+
+
+def _bloques_historia(historia, numero=None):
+    titulo = f"Consulta del {historia['fecha']}"
+    if numero is not None:
+        titulo = f'Consulta N° {numero} - {historia["fecha"]}'
+    bloques = [
+        Paragraph(escape(titulo), ESTILO_SECCION),
+        _tabla([('Profesional', historia['profesional']), ('Motivo', historia['motivo_consulta'])]),
+        Spacer(1, 4),
+        _tabla([('Diagnóstico', historia['diagnostico']), ('Tratamiento', historia['tratamiento'])]),
+    ]
+    if historia['observaciones']:
+        bloques += [Spacer(1, 4), _tabla([('Observaciones', historia['observaciones'])])]
+
+    examen = historia['examen']
+    if examen is None:
+        bloques.append(_parrafo('Sin examen oftalmológico registrado.'))
+    else:
+        bloques += [
+            Paragraph('Examen oftalmológico', ESTILO_SECCION),
+            _tabla([
+                ('Agudeza visual OD', examen['agudeza_visual_od']),
+                ('Agudeza visual OI', examen['agudeza_visual_oi']),
+                ('PIO OD', examen['pio_od']),
+                ('PIO OI', examen['pio_oi']),
+                ('Biomicroscopía', examen['biomicroscopia']),
+                ('Fondo de ojo', examen['fondo_ojo']),
+                ('Observaciones', examen['observaciones']),
+            ]),
+        ]
+    return bloques
+
+
+def renderizar(datos, salida, progreso=None):
+    """Escribe el PDF en 'salida' (archivo binario). progreso(porcentaje, mensaje) opcional, para las tareas."""
+    paciente = datos['paciente']
+    encabezado = f"{paciente['apellido']}, {paciente['nombre']} - Registro {paciente['num_registro']}"
+
+    def pie_de_pagina(canvas, documento):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawString(documento.leftMargin, A4[1] - 1.2 * cm, TITULO)
+        canvas.drawRightString(A4[0] - documento.rightMargin, A4[1] - 1.2 * cm, encabezado)
+        canvas.drawRightString(A4[0] - documento.rightMargin, 1 * cm, f'Página {documento.page}')
+        canvas.restoreState()
+
+    documento = SimpleDocTemplate(
+        salida, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm,
+        title=encabezado, author=TITULO,
+        # Sin fecha de creación ni id aleatorio: los mismos datos dan los mismos bytes
+        invariant=True,
+    )
+    if progreso is not None:
+        # ReportLab informa primero el total estimado ('SIZE_EST') y después el avance ('PROGRESS')
+        total = [1]
+
+        def informar(tipo, valor):
+            if tipo == 'SIZE_EST':
+                total[0] = max(valor, 1)
+            elif tipo == 'PROGRESS':
+                progreso(100 * valor / total[0], f'Página {documento.page}')
+        documento.setProgressCallBack(informar)
+
+    bloques = _bloques_paciente(datos)
+    numerar = datos['documento'] == 'ficha'
+    for numero, historia in enumerate(datos['historias'], start=1):
+        bloques.append(Spacer(1, 8))
+        bloques.append(KeepTogether(_bloques_historia(historia, numero if numerar else None)))
+    documento.build(bloques, onFirstPage=pie_de_pagina, onLaterPages=pie_de_pagina)
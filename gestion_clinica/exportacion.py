@@ -0,0 +1,145 @@
+# gestion_clinica/exportacion.py
+
+"""
+Exportación en streaming de Historias Clínicas con su Examen Oftalmológico.
+
+Las filas se leen con iterator(chunk_size=...) sobre un único JOIN
+(HistoriaClinica -> paciente, profesional, examen) y se serializan de a una,
+de modo que la memoria usada no depende de la cantidad de registros. Lo usan la
+vista ExportarHistoriasView (StreamingHttpResponse) y el comando
+'exportar_historias'.
+
+Bajo ASGI (uvicorn), Django consume un iterador síncrono entero
+(sync_to_async(list)) antes de enviar la respuesta; la vista usa entonces
+en_async(), que avanza el generador de a LINEAS_POR_ENVIO líneas en un thread.
+
+Ambos formatos emiten algo antes de ejecutar la consulta (el encabezado del CSV,
+una línea vacía en NDJSON) para que un proxy no corte la conexión por inactividad
+mientras la base prepara las primeras filas. En el CSV, los textos que empiezan
+con = + - @ se prefijan con ' para que una planilla no los evalúe como fórmulas.
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+
+from .models import HistoriaClinica
+
+TAMANO_BLOQUE = 2000
+# Líneas por envío en la versión async (en_async)
+LINEAS_POR_ENVIO = 500
+
+# (encabezado, función que obtiene el valor a partir de la historia clínica)
+COLUMNAS = [
+    ('historia_id', lambda hc: hc.pk),
+    ('fecha', lambda hc: timezone.localtime(hc.fecha).isoformat() if timezone.is_aware(hc.fecha)
+        else hc.fecha.isoformat()),
+    ('paciente_id', lambda hc: hc.paciente_id),
+    ('num_registro', lambda hc: hc.paciente.num_registro),
+    ('paciente_dni', lambda hc: hc.paciente.dni),
+    ('paciente_apellido', lambda hc: hc.paciente.apellido),
+    ('paciente_nombre', lambda hc: hc.paciente.nombre),
+    ('profesional_id', lambda hc: hc.profesional_id),
+    ('profesional', lambda hc: f'{hc.profesional.apellido}, {hc.profesional.nombre}'),
+    ('profesional_matricula', lambda hc: hc.profesional.matricula),
+    ('motivo_consulta', lambda hc: hc.motivo_consulta),
+    ('diagnostico', lambda hc: hc.diagnostico),
+    ('tratamiento', lambda hc: hc.tratamiento),
+    ('observaciones', lambda hc: hc.observaciones),
+]
+
+CAMPOS_EXAMEN = [
+    'agudeza_visual_od', 'agudeza_visual_oi', 'pio_od', 'pio_oi',
+    'biomicroscopia', 'fondo_ojo', 'observaciones',
+]
+
+ENCABEZADOS = [nombre for nombre, _ in COLUMNAS] + [f'examen_{campo}' for campo in CAMPOS_EXAMEN]
+
+# Caracteres con los que una planilla interpreta una celda como fórmula
+INICIO_FORMULA = ('=', '+', '-', '@')
+
+
+def historias_para_exportar(desde=None, hasta=None, profesional_id=None):
+    """
+    Historias clínicas entre dos días locales (ambos inclusive), opcionalmente de
+    un profesional, con paciente, profesional y examen unidos en la misma consulta.
+    """
+    queryset = HistoriaClinica.objects.select_related('paciente', 'profesional', 'examen')
+    if desde:
+        queryset = queryset.filter(fecha__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+    if hasta:
+        queryset = queryset.filter(
+            fecha__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)))
+    if profesional_id:
+        queryset = queryset.filter(profesional_id=profesional_id)
+    return queryset.order_by('fecha', 'pk')
+
+
+def filas(queryset, chunk_size=TAMANO_BLOQUE):
+    """Genera una lista de valores por historia clínica (en el orden de ENCABEZADOS)."""
+    for historia in queryset.iterator(chunk_size=chunk_size):
+        fila = [obtener(historia) for _, obtener in COLUMNAS]
+        try:
+            examen = historia.examen
+        except ObjectDoesNotExist:
+            examen = None
+        fila.extend(getattr(examen, campo) if examen else '' for campo in CAMPOS_EXAMEN)
+        yield fila
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea escrita en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _celda_csv(valor):
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def generar_csv(queryset, chunk_size=TAMANO_BLOQUE):
+    escritor = csv.writer(_Eco())
+    # El encabezado sale antes de ejecutar la consulta: el cliente recibe bytes de inmediato
+    yield escritor.writerow(ENCABEZADOS)
+    for fila in filas(queryset, chunk_size):
+        yield escritor.writerow([_celda_csv(valor) for valor in fila])
+
+
+def generar_ndjson(queryset, chunk_size=TAMANO_BLOQUE):
+    # NDJSON no tiene encabezado: una línea vacía (los lectores la ignoran) cumple el mismo papel
+    yield '\n'
+    for fila in filas(queryset, chunk_size):
+        yield json.dumps(dict(zip(ENCABEZADOS, fila)), ensure_ascii=False, default=str) + '\n'
+
+
+async def en_async(generador, lineas=LINEAS_POR_ENVIO):
+    """
+    Iterador async sobre un generador de exportación, para StreamingHttpResponse
+    bajo ASGI. Cada bloque se genera con sync_to_async (siempre en el mismo
+    thread, el de la conexión que tiene abierto el cursor) y se envía como un
+    único texto. La primera línea (la que sale antes de la consulta) se envía sola.
+    """
+    siguiente = sync_to_async(lambda cantidad: ''.join(islice(generador, cantidad)))
+    try:
+        if bloque := await siguiente(1):
+            yield bloque
+        while bloque := await siguiente(lineas):
+            yield bloque
+    finally:
+        # Si el cliente corta la descarga, el cursor se cierra en su thread
+        await sync_to_async(generador.close)()
+
+
+# formato: (generador, content type, extensión)
+FORMATOS = {
+    'csv': (generar_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (generar_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
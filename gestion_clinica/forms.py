@@ -1,13 +1,19 @@
 # gestion_clinica/forms.py
 
+import copy
+
 from crispy_forms.layout import Layout, Fieldset, Submit, Row, Column
 from crispy_forms.helper import FormHelper
 from django import forms
+from django.urls import reverse_lazy
 # AÑADIR PrescripcionLentes al grupo de modelos importados
 from .models import (
     Paciente, HistoriaClinica, Profesional, ObraSocial, ExamenOftalmologico, Turno,
     # ❌ ELIMINADA: PrescripcionLentes ya no se importa
 )
+from . import catalogos
+from .agenda import ocupa_lugar_nuevo, validar_disponibilidad
+from .widgets import AutocompletarSelect
 # ❌ ELIMINADA: La importación fallida del mixin
 # from .mixins import BaseFormMixin
 
@@ -18,20 +24,74 @@ class BaseFormMixin:
     """
     Mixin para agregar clases CSS de Bootstrap (form-control) a todos
     los campos del formulario automáticamente.
+
+    Las clases se aplican una sola vez por clase de formulario, sobre base_fields:
+    cada instancia recibe una copia de esos campos con los atributos ya puestos.
     """
 
     def __init__(self, *args, **kwargs):
+        type(self)._aplicar_clases_css()
         super().__init__(*args, **kwargs)
+
+    @classmethod
+    def _aplicar_clases_css(cls):
+        if cls.__dict__.get('_clases_css_aplicadas'):
+            return
         # Recorre todos los campos y añade la clase 'form-control'
-        for field_name, field in self.fields.items():
+        for field_name, field in cls.base_fields.items():
             # Evitamos aplicar a checkboxes y radio buttons si es necesario
             if field_name != 'password' and not isinstance(field.widget, forms.CheckboxInput):
                 field.widget.attrs.update({
                     'class': 'form-control'
                 })
+        cls._clases_css_aplicadas = True
 # ⭐ FIN DE LA DEFINICIÓN DE BaseFormMixin ⭐
 
 
+# --------------------------------------------------------------------------
+# Campos de catálogo (Profesional, ObraSocial) servidos desde catalogos.py
+# --------------------------------------------------------------------------
+
+
+class CatalogoChoiceIterator(forms.models.ModelChoiceIterator):
+    """Opciones del select leídas de la caché del catálogo, sin consultar la base."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for objeto in self.field.catalogo.todos():
+            yield self.choice(objeto)
+
+    def __len__(self):
+        return len(self.field.catalogo.todos()) + (1 if self.field.empty_label is not None else 0)
+
+
+class CatalogoChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField de un catálogo en caché: las opciones y el valor elegido salen
+    de la caché, sin consultas. La validación del modelo (full_clean) sí verifica
+    con una consulta que la FK exista.
+    Se usa desde Meta.field_classes; el catálogo sale del modelo del queryset.
+    """
+    iterator = CatalogoChoiceIterator
+
+    def __init__(self, queryset, **kwargs):
+        self.catalogo = catalogos.de_modelo(queryset.model)
+        super().__init__(queryset, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        objeto = self.catalogo.obtener(value)
+        if objeto is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+        # Copia: el objeto en caché es compartido entre requests
+        return copy.copy(objeto)
+
+
 # ⭐ IMPORTACIONES PARA CRISPY FORMS ⭐
 # <--- Añadir Row y Column
 
@@ -57,7 +117,25 @@ class PacienteForm(BaseFormMixin, forms.ModelForm):
         fields = '__all__'
         widgets = {
             'fecha_nacimiento': forms.DateInput(attrs={'type': 'date'}),
+            # Autocompletado remoto en lugar de un <option> por obra social (widgets.py)
+            'obra_social': AutocompletarSelect(
+                reverse_lazy('gestion_clinica:autocompletar_catalogo', kwargs={'catalogo': 'obra-social'})),
         }
+        field_classes = {'obra_social': CatalogoChoiceField}
+
+
+class PacienteImportacionForm(PacienteForm):
+    """
+    Reglas de PacienteForm para la importación masiva (comando 'importar_pacientes').
+    La obra social se resuelve por nombre desde un mapa en memoria, y la unicidad
+    del DNI se verifica por lote con una sola consulta, por lo que aquí se omiten.
+    """
+    class Meta(PacienteForm.Meta):
+        fields = None
+        exclude = ('obra_social',)
+
+    def validate_unique(self):
+        pass
 
 
 class HistoriaClinicaForm(BaseFormMixin, forms.ModelForm):
@@ -70,6 +148,7 @@ class HistoriaClinicaForm(BaseFormMixin, forms.ModelForm):
             'diagnostico': forms.Textarea(attrs={'rows': 3}),
             'tratamiento': forms.Textarea(attrs={'rows': 3}),
         }
+        field_classes = {'profesional': CatalogoChoiceField}
 
 
 class ExamenOftalmologicoForm(BaseFormMixin, forms.ModelForm):
@@ -120,38 +199,72 @@ class ObraSocialForm(BaseFormMixin, forms.ModelForm):
 # --------------------------------------------------------------------------
 
 
-class TurnoForm(BaseFormMixin, forms.ModelForm):
+class DisponibilidadTurnoMixin:
+    """
+    Verificación de superposición y horario de atención (agenda.py) para todo
+    formulario de Turno (vistas y admin), con los valores del formulario sobre los
+    del turno. Solo se verifica si el cambio ocupa un lugar nuevo de la agenda
+    (ej: reactivar un turno cancelado); la reserva definitiva se vuelve a verificar
+    con la agenda bloqueada al guardar (agenda.reservar).
+    """
+
+    def clean(self):
+        cleaned_data = super().clean()
+        turno = copy.copy(self.instance)
+        for campo in ('profesional', 'fecha_hora', 'duracion', 'estado'):
+            if campo in self.fields:
+                if cleaned_data.get(campo) is None:
+                    return cleaned_data  # El campo ya tiene su propio error
+                setattr(turno, campo, cleaned_data[campo])
+        if turno.profesional_id is None or turno.fecha_hora is None:
+            return cleaned_data
+        try:
+            if ocupa_lugar_nuevo(turno):
+                validar_disponibilidad(turno)
+        except forms.ValidationError as error:
+            # En el formulario de estado no hay fecha_hora: el error se muestra en el estado
+            self.add_error(next((campo for campo in ('fecha_hora', 'estado') if campo in self.fields), None), error)
+        return cleaned_data
+
+
+class TurnoForm(DisponibilidadTurnoMixin, BaseFormMixin, forms.ModelForm):
     class Meta:
         model = Turno
         fields = ['paciente', 'profesional',
-                  'fecha_hora', 'estado', 'observaciones']
+                  'fecha_hora', 'duracion', 'estado', 'observaciones']
         # Definimos widgets para mejorar la UX (especialmente para fecha_hora)
         widgets = {
             # Usamos 'datetime-local' para un selector de fecha y hora moderno
             'fecha_hora': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'observaciones': forms.Textarea(attrs={'rows': 3}),
+            # Solo se renderiza el paciente/profesional elegido; el resto se busca por JSON
+            'paciente': AutocompletarSelect(reverse_lazy('gestion_clinica:buscar_pacientes_api')),
+            'profesional': AutocompletarSelect(
+                reverse_lazy('gestion_clinica:autocompletar_catalogo', kwargs={'catalogo': 'profesional'})),
         }
+        field_classes = {'profesional': CatalogoChoiceField}
+
+    # Usamos FormHelper para configurar el botón de submit (ya que no lo hace el Mixin).
+    # Se construye una sola vez y lo comparten todas las instancias (no se modifica).
+    helper = FormHelper()
+    helper.layout = Layout(
+        Fieldset(
+            'Detalles del Turno',
+            'paciente',
+            'profesional',
+            'fecha_hora',
+            'duracion',
+            'estado',
+            'observaciones',
+        ),
+        Submit('submit', 'Guardar Turno', css_class='btn-success')
+    )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Usamos FormHelper para configurar el botón de submit (ya que no lo hace el Mixin)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            Fieldset(
-                'Detalles del Turno',
-                'paciente',
-                'profesional',
-                'fecha_hora',
-                'estado',
-                'observaciones',
-            ),
-            Submit('submit', 'Guardar Turno', css_class='btn-success')
-        )
 
 # ⭐ FORMULARIO PARA GESTIÓN DE ESTADO DE TURNO ⭐
 
 
-class TurnoEstadoForm(BaseFormMixin, forms.ModelForm):
+class TurnoEstadoForm(DisponibilidadTurnoMixin, BaseFormMixin, forms.ModelForm):
     """Formulario para actualizar solo el estado de un turno."""
     class Meta:
         model = Turno
@@ -160,5 +273,12 @@ class TurnoEstadoForm(BaseFormMixin, forms.ModelForm):
             'estado': forms.Select(attrs={'class': 'form-select'}),
         }
 
+
+class TurnoAdminForm(DisponibilidadTurnoMixin, forms.ModelForm):
+    """Formulario de TurnoAdmin (los campos salen de sus fieldsets)."""
+    class Meta:
+        model = Turno
+        fields = '__all__'
+
 # ❌ ELIMINADO: Todo el bloque de PrescripcionLentesForm
 # class PrescripcionLentesForm(forms.ModelForm): (...)
@@ -0,0 +1,149 @@
+# gestion_clinica/management/commands/benchmark_concurrencia.py
+
+"""
+Benchmark de concurrencia contra un servidor en ejecución (WSGI o ASGI).
+
+Lanza N clientes simultáneos (threads con conexiones keep-alive) que piden en
+ronda los endpoints de lectura más usados durante un tiempo fijo, y reporta
+requests por segundo, latencias p50/p95/p99 y errores. Los clientes se
+autentican con una sesión creada para --usuario en la base del servidor.
+
+Comparación sugerida (mismos datos, mismo hardware, mismos workers). Ambos
+servidores están en requirements.txt.
+
+    # WSGI (vistas async ejecutadas con async_to_sync, un thread por request)
+    gunicorn core.wsgi:application --workers 4 --threads 8
+    python manage.py benchmark_concurrencia --usuario admin --clientes 10 50 200
+
+    # ASGI (vistas async en el event loop)
+    uvicorn core.asgi:application --workers 4
+    python manage.py benchmark_concurrencia --usuario admin --clientes 10 50 200
+
+Medición de referencia: 1 CPU (servidor y clientes en la misma máquina),
+SQLite con 20.000 pacientes, 2 workers en ambos servidores (gunicorn 26.2 con
+--threads 8, uvicorn 0.54), 10 s por medición, sin errores:
+
+    clientes   WSGI req/s  p95 ms    ASGI req/s  p95 ms
+          10         44.3     520          33.2     620
+          50         39.0    2227          33.7    1949
+         200         41.5    6199          33.7   10573
+
+Con una sola CPU y SQLite (consultas síncronas, ejecutadas con sync_to_async)
+ASGI no rinde más que WSGI: el trabajo es de CPU y el event loop no tiene E/S
+que solapar. Conviene repetir la medición en el hardware de producción antes
+de cambiar de servidor.
+"""
+
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from gestion_clinica.metricas import percentil
+
+
+def _rutas_defecto():
+    hoy = timezone.localdate()
+    inicio_mes = hoy.replace(day=1)
+    fin = inicio_mes + timezone.timedelta(days=42)
+    return [
+        '/',
+        f'/pacientes/turnos/api/json/?start={inicio_mes}T00:00:00&end={fin}T00:00:00',
+        '/pacientes/api/buscar/?q=gon',
+    ]
+
+
+class Command(BaseCommand):
+    help = "Mide req/s y latencias de los endpoints de lectura con N clientes concurrentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000', help="Servidor a medir (default: http://127.0.0.1:8000).")
+        parser.add_argument('--usuario', required=True, help="Usuario con el que se autentican los clientes.")
+        parser.add_argument(
+            '--clientes', type=int, nargs='+', default=[10, 50],
+            help="Cantidades de clientes simultáneos a probar (default: 10 50).")
+        parser.add_argument(
+            '--segundos', type=float, default=10.0, help="Duración de cada medición (default: 10).")
+        parser.add_argument(
+            '--ruta', action='append', dest='rutas',
+            help="Ruta a pedir (repetible). Por defecto: dashboard, calendario y búsqueda.")
+
+    def handle(self, *args, **options):
+        destino = urlsplit(options['url'])
+        if destino.scheme not in ('http', 'https') or not destino.hostname:
+            raise CommandError(f"URL inválida: {options['url']}")
+
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario '{options['usuario']}'.")
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        rutas = options['rutas'] or _rutas_defecto()
+        self.stdout.write(f"Servidor: {options['url']}  rutas: {len(rutas)}  duración: {options['segundos']} s")
+        self.stdout.write(
+            f"{'clientes':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+        for cantidad in options['clientes']:
+            resultado = self._medir(destino, cookie, rutas, cantidad, options['segundos'])
+            tiempos = sorted(resultado['tiempos'])
+            self.stdout.write(
+                f"{cantidad:>8} {len(tiempos):>9} {len(tiempos) / resultado['segundos']:>9.1f} "
+                f"{percentil(tiempos, 50) or 0:>8.1f} {percentil(tiempos, 95) or 0:>8.1f} "
+                f"{percentil(tiempos, 99) or 0:>8.1f} {resultado['errores']:>8}")
+            if resultado['ejemplo_error']:
+                self.stdout.write(self.style.WARNING(f"  primer error: {resultado['ejemplo_error']}"))
+
+    def _medir(self, destino, cookie, rutas, cantidad, segundos):
+        resultado = {'tiempos': [], 'errores': 0, 'ejemplo_error': None}
+        lock = threading.Lock()
+        inicio = threading.Event()
+
+        def trabajar(desplazamiento):
+            clase = http.client.HTTPSConnection if destino.scheme == 'https' else http.client.HTTPConnection
+            conexion = clase(destino.hostname, destino.port, timeout=30)
+            tiempos, errores, ejemplo = [], 0, None
+            inicio.wait()
+            i = desplazamiento
+            while time.monotonic() < fin:
+                ruta = rutas[i % len(rutas)]
+                i += 1
+                t0 = time.perf_counter()
+                try:
+                    conexion.request('GET', ruta, headers={'Cookie': cookie})
+                    respuesta = conexion.getresponse()
+                    respuesta.read()
+                    if respuesta.status != 200:
+                        errores += 1
+                        ejemplo = ejemplo or f"{ruta}: HTTP {respuesta.status}"
+                        continue
+                except (OSError, http.client.HTTPException) as exc:
+                    errores += 1
+                    ejemplo = ejemplo or f"{ruta}: {exc!r}"
+                    conexion.close()
+                    continue
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            conexion.close()
+            with lock:
+                resultado['tiempos'].extend(tiempos)
+                resultado['errores'] += errores
+                resultado['ejemplo_error'] = resultado['ejemplo_error'] or ejemplo
+
+        hilos = [threading.Thread(target=trabajar, args=(n,), daemon=True) for n in range(cantidad)]
+        for hilo in hilos:
+            hilo.start()
+        t0 = time.monotonic()
+        fin = t0 + segundos
+        inicio.set()
+        for hilo in hilos:
+            hilo.join()
+        resultado['segundos'] = time.monotonic() - t0
+        return resultado
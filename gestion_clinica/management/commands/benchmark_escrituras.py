@@ -0,0 +1,125 @@
+# gestion_clinica/management/commands/benchmark_escrituras.py
+
+"""
+Benchmark de escrituras concurrentes sobre SQLite.
+
+Lanza N procesos escritores contra una base de datos temporal (nunca contra
+db.sqlite3) y compara el backend estándar de Django con core.backends.sqlite3.
+Cada transacción reproduce el patrón de una reserva de turno: lee un valor,
+lo actualiza e inserta una fila.
+
+    python manage.py benchmark_escrituras --escritores 1 4 8 --transacciones 200
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+PERFILES = {
+    # Backend estándar: journal por defecto, BEGIN diferido, sin reintentos
+    'estandar': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'OPTIONS': {'timeout': 5},
+    },
+    # Backend del proyecto (mismas opciones que settings.DATABASES)
+    'wal': {
+        'ENGINE': 'core.backends.sqlite3',
+        'OPTIONS': {'timeout': 5, 'transaction_mode': 'IMMEDIATE'},
+    },
+}
+
+ALIAS = 'benchmark'
+
+
+def _configurar_conexion(perfil, ruta):
+    """Registra (en el proceso actual) la conexión del benchmark."""
+    configuracion = {**PERFILES[perfil], 'NAME': ruta}
+    bases = connections.configure_settings({'default': {}, ALIAS: configuracion})
+    connections.settings[ALIAS] = bases[ALIAS]
+
+
+def _preparar_base(perfil, ruta):
+    _configurar_conexion(perfil, ruta)
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute("CREATE TABLE contador (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL)")
+        cursor.execute("INSERT INTO contador (id, valor) VALUES (1, 0)")
+        cursor.execute(
+            "CREATE TABLE registro (id INTEGER PRIMARY KEY, escritor INTEGER, valor INTEGER, texto TEXT)")
+    connections[ALIAS].close()
+    del connections[ALIAS]
+
+
+def _escritor(argumentos):
+    perfil, ruta, numero, transacciones = argumentos
+    if not django.apps.apps.ready:
+        django.setup()
+    _configurar_conexion(perfil, ruta)
+
+    exitosas = errores = 0
+    inicio = time.perf_counter()
+    for _ in range(transacciones):
+        try:
+            with transaction.atomic(using=ALIAS):
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute("SELECT valor FROM contador WHERE id = 1")
+                    valor = cursor.fetchone()[0] + 1
+                    cursor.execute("UPDATE contador SET valor = %s WHERE id = 1", [valor])
+                    cursor.execute(
+                        "INSERT INTO registro (escritor, valor, texto) VALUES (%s, %s, %s)",
+                        [numero, valor, 'x' * 200])
+            exitosas += 1
+        except Exception:
+            errores += 1
+    duracion = time.perf_counter() - inicio
+    connections[ALIAS].close()
+    return exitosas, errores, duracion
+
+
+class Command(BaseCommand):
+    help = "Mide el throughput de escritura de SQLite con N escritores concurrentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escritores', type=int, nargs='+', default=[1, 2, 4, 8],
+            help="Cantidades de procesos escritores a probar (default: 1 2 4 8).")
+        parser.add_argument(
+            '--transacciones', type=int, default=200,
+            help="Transacciones por escritor (default: 200).")
+        parser.add_argument(
+            '--perfiles', nargs='+', choices=sorted(PERFILES), default=sorted(PERFILES),
+            help="Perfiles de conexión a comparar.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'perfil':<10} {'escritores':>10} {'ok':>8} {'errores':>8} {'tx/s':>10} {'seg':>8}")
+        for perfil in options['perfiles']:
+            for escritores in options['escritores']:
+                resultado = self._medir(perfil, escritores, options['transacciones'])
+                self.stdout.write(
+                    f"{perfil:<10} {escritores:>10} {resultado['exitosas']:>8} "
+                    f"{resultado['errores']:>8} {resultado['por_segundo']:>10.0f} "
+                    f"{resultado['duracion']:>8.2f}")
+
+    def _medir(self, perfil, escritores, transacciones):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'benchmark.sqlite3')
+            _preparar_base(perfil, ruta)
+
+            inicio = time.perf_counter()
+            with multiprocessing.Pool(escritores) as pool:
+                resultados = pool.map(
+                    _escritor, [(perfil, ruta, numero, transacciones) for numero in range(escritores)])
+            duracion = time.perf_counter() - inicio
+
+        exitosas = sum(ok for ok, _, _ in resultados)
+        return {
+            'exitosas': exitosas,
+            'errores': sum(error for _, error, _ in resultados),
+            'duracion': duracion,
+            'por_segundo': exitosas / duracion if duracion else 0,
+        }
@@ -0,0 +1,256 @@
+# gestion_clinica/management/commands/benchmark_vistas.py
+
+"""
+Benchmark de latencia y cantidad de consultas SQL de cada URL de gestion_clinica.
+
+Para cada tamaño pedido crea una base de prueba (como el test runner, nunca la
+base real), la llena con 'generar_datos' y mide todas las rutas de
+gestion_clinica/urls.py con el cliente de pruebas de Django.
+
+    python manage.py benchmark_vistas --tamanos 100 1000 5000
+    python manage.py benchmark_vistas --guardar-linea-base
+    python manage.py benchmark_vistas --linea-base benchmarks/linea_base.json
+
+Los resultados se guardan en JSON. Con una línea base se marca como regresión
+toda URL que haga más consultas SQL que antes, o cuya mediana de latencia supere
+a la anterior en más de --tolerancia (y en más de --margen-ms).
+"""
+
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from gestion_clinica import urls as urls_app
+from gestion_clinica.models import HistoriaClinica, ObraSocial, Paciente, Profesional, Tarea, Turno
+
+RESULTADOS_DEFECTO = 'benchmarks/resultados.json'
+LINEA_BASE_DEFECTO = 'benchmarks/linea_base.json'
+
+
+def _ejemplos():
+    """Objetos representativos para completar los parámetros de las URLs."""
+    paciente = (
+        Paciente.objects.annotate(consultas=Count('historias_clinicas'))
+        .order_by('-consultas', 'pk').first()
+    )
+    historia = HistoriaClinica.objects.filter(examen__isnull=False).order_by('-pk').first()
+    return {
+        'paciente': paciente.pk,
+        'historia': historia.pk if historia else None,
+        'profesional': Profesional.objects.values_list('pk', flat=True).first(),
+        'obra_social': ObraSocial.objects.values_list('pk', flat=True).first(),
+        'turno': Turno.objects.values_list('pk', flat=True).order_by('-pk').first(),
+        'tarea': Tarea.objects.values_list('pk', flat=True).order_by('-pk').first(),
+    }
+
+
+def _casos(ejemplos):
+    """
+    {nombre de URL: [(etiqueta, kwargs, query string), ...]}. Las URLs nuevas
+    sin parámetros se miden sin configuración; las que tienen parámetros deben
+    agregarse aquí (si no, se informan como omitidas).
+    """
+    hoy = timezone.localdate()
+    inicio_mes = hoy.replace(day=1)
+    # Rango que pide FullCalendar en la vista mensual (6 semanas)
+    calendario = f'start={inicio_mes}T00:00:00&end={inicio_mes + timezone.timedelta(days=42)}T00:00:00'
+    paciente = {'pk': ejemplos['paciente']}
+    return {
+        'lista_pacientes': [
+            ('', {}, ''),
+            ('busqueda', {}, 'q=gonz'),
+            ('cursor', {}, 'paginacion=cursor'),
+        ],
+        'buscar_pacientes_api': [('', {}, 'q=gonz')],
+        'autocompletar_catalogo': [
+            ('profesional', {'catalogo': 'profesional'}, 'q=gon'),
+            ('obra-social', {'catalogo': 'obra-social'}, 'q=os'),
+        ],
+        'detalle_paciente': [('', paciente, '')],
+        'editar_paciente': [('', paciente, '')],
+        'historias_paciente_fragmento': [('', paciente, 'seccion=historial&page=2')],
+        'tendencias_paciente_api': [('', paciente, '')],
+        'pdf_ficha': [('', paciente, '')],
+        'crear_historia_clinica': [('', {'paciente_pk': ejemplos['paciente']}, '')],
+        'detalle_examen_oftalmologico': [('', {'hc_pk': ejemplos['historia']}, '')],
+        'pdf_consulta': [('', {'hc_pk': ejemplos['historia']}, '')],
+        'editar_profesional': [('', {'pk': ejemplos['profesional']}, '')],
+        'eliminar_profesional': [('', {'pk': ejemplos['profesional']}, '')],
+        'editar_obra_social': [('', {'pk': ejemplos['obra_social']}, '')],
+        'eliminar_obra_social': [('', {'pk': ejemplos['obra_social']}, '')],
+        'detalle_turno': [('', {'pk': ejemplos['turno']}, '')],
+        'turnos_json_api': [('mes', {}, calendario)],
+        'disponibilidad_turnos_api': [('', {}, f"profesional={ejemplos['profesional']}&cantidad=10")],
+        'exportar_historias': [('mes', {}, f'desde={hoy - timezone.timedelta(days=30)}')],
+        'estado_tarea': [('', {'pk': ejemplos['tarea']}, '')],
+        'busqueda_clinica': [('', {}, ''), ('texto', {}, 'q=presion ocular')],
+    }
+
+
+class Command(BaseCommand):
+    help = "Mide latencia y consultas SQL de cada URL de gestion_clinica con distintos volúmenes de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos', type=int, nargs='+', default=[100, 1000],
+            help="Cantidades de pacientes a generar (default: 100 1000).")
+        parser.add_argument(
+            '--repeticiones', type=int, default=5, help="Mediciones por URL (default: 5).")
+        parser.add_argument(
+            '--salida', default=RESULTADOS_DEFECTO, help=f"JSON de resultados (default: {RESULTADOS_DEFECTO}).")
+        parser.add_argument(
+            '--linea-base', help="JSON de una ejecución anterior contra el cual comparar.")
+        parser.add_argument(
+            '--guardar-linea-base', action='store_true',
+            help=f"Guardar además los resultados como línea base ({LINEA_BASE_DEFECTO}).")
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.25,
+            help="Aumento relativo de la mediana que se considera regresión (default: 0.25).")
+        parser.add_argument(
+            '--margen-ms', type=float, default=5.0,
+            help="Aumento absoluto mínimo (ms) para considerar regresión (default: 5).")
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        linea_base = None
+        if options['linea_base']:
+            ruta = Path(options['linea_base'])
+            if not ruta.exists():
+                raise CommandError(f"No existe la línea base {ruta}.")
+            linea_base = json.loads(ruta.read_text(encoding='utf-8'))
+
+        setup_test_environment()
+        configuracion = setup_databases(verbosity=0, interactive=False)
+        try:
+            resultados = {
+                'fecha': timezone.now().isoformat(),
+                'repeticiones': options['repeticiones'],
+                'tamanos': {},
+            }
+            for tamano in sorted(options['tamanos']):
+                resultados['tamanos'][str(tamano)] = self._medir_tamano(tamano, options)
+        finally:
+            teardown_databases(configuracion, verbosity=0)
+            teardown_test_environment()
+
+        self._guardar(resultados, options['salida'])
+        if options['guardar_linea_base']:
+            self._guardar(resultados, LINEA_BASE_DEFECTO)
+
+        if linea_base:
+            regresiones = self._comparar(resultados, linea_base, options)
+            if regresiones:
+                for regresion in regresiones:
+                    self.stdout.write(self.style.ERROR(f"REGRESIÓN {regresion}"))
+                raise CommandError(f"{len(regresiones)} regresiones respecto de la línea base.")
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto de la línea base."))
+
+    # --- Medición ---
+
+    def _medir_tamano(self, tamano, options):
+        call_command('flush', interactive=False, verbosity=0)
+        call_command('generar_datos', pacientes=tamano, semilla=options['semilla'], stdout=io.StringIO())
+
+        usuario = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        cliente = Client()
+        cliente.force_login(usuario)
+        casos = _casos(_ejemplos())
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{tamano} pacientes"))
+        self.stdout.write(f"{'url':<48} {'estado':>6} {'consultas':>9} {'p50 ms':>8} {'max ms':>8}")
+        medidas = {}
+        for patron in urls_app.urlpatterns:
+            if not isinstance(patron, URLPattern) or not patron.name:
+                continue
+            parametros = list(patron.pattern.converters)
+            variantes = casos.get(patron.name, [('', {}, '')] if not parametros else None)
+            if variantes is None:
+                self.stdout.write(self.style.WARNING(f"{patron.name}: omitida (sin datos de ejemplo)"))
+                continue
+
+            for etiqueta, kwargs, query in variantes:
+                clave = f'{patron.name}:{etiqueta}' if etiqueta else patron.name
+                if any(valor is None for valor in kwargs.values()):
+                    self.stdout.write(self.style.WARNING(f"{clave}: omitida (no hay datos)"))
+                    continue
+                url = reverse(f'{urls_app.app_name}:{patron.name}', kwargs=kwargs)
+                if query:
+                    url = f'{url}?{query}'
+                medidas[clave] = self._medir_url(cliente, url, options['repeticiones'])
+                medida = medidas[clave]
+                self.stdout.write(
+                    f"{clave:<48} {medida['estado']:>6} {medida['consultas']:>9} "
+                    f"{medida['p50_ms']:>8.1f} {medida['max_ms']:>8.1f}")
+        return medidas
+
+    def _medir_url(self, cliente, url, repeticiones):
+        self._pedir(cliente, url)  # calentamiento (plantillas, cachés)
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            response = self._pedir(cliente, url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self._pedir(cliente, url)
+        return {
+            'url': url,
+            'estado': response.status_code,
+            'consultas': len(consultas),
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'min_ms': round(min(tiempos), 2),
+            'max_ms': round(max(tiempos), 2),
+        }
+
+    def _pedir(self, cliente, url):
+        response = cliente.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    # --- Resultados ---
+
+    def _guardar(self, resultados, ruta):
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(f"Resultados guardados en {ruta}")
+
+    def _comparar(self, resultados, linea_base, options):
+        regresiones = []
+        for tamano, medidas in resultados['tamanos'].items():
+            anteriores = linea_base.get('tamanos', {}).get(tamano, {})
+            for clave, medida in medidas.items():
+                anterior = anteriores.get(clave)
+                if not anterior:
+                    continue
+                if medida['estado'] != anterior['estado']:
+                    regresiones.append(
+                        f"[{tamano}] {clave}: estado {anterior['estado']} -> {medida['estado']}")
+                if medida['consultas'] > anterior['consultas']:
+                    regresiones.append(
+                        f"[{tamano}] {clave}: consultas {anterior['consultas']} -> {medida['consultas']}")
+                limite = max(
+                    anterior['p50_ms'] * (1 + options['tolerancia']),
+                    anterior['p50_ms'] + options['margen_ms'])
+                if medida['p50_ms'] > limite:
+                    regresiones.append(
+                        f"[{tamano}] {clave}: p50 {anterior['p50_ms']:.1f} ms -> {medida['p50_ms']:.1f} ms")
+        return regresiones
+
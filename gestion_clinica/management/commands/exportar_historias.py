@@ -0,0 +1,58 @@
+# gestion_clinica/management/commands/exportar_historias.py
+
+"""
+Exporta Historias Clínicas + Exámenes en CSV o NDJSON, en streaming.
+
+    python manage.py exportar_historias --desde 2024-01-01 --hasta 2024-12-31 > hc.csv
+    python manage.py exportar_historias --formato ndjson --profesional 3 --salida hc.ndjson
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from gestion_clinica import exportacion
+
+
+class Command(BaseCommand):
+    help = "Exporta historias clínicas con su examen oftalmológico (CSV o NDJSON)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--formato', choices=sorted(exportacion.FORMATOS), default='csv',
+            help="Formato de salida (default: csv).")
+        parser.add_argument('--desde', help="Primer día a exportar (AAAA-MM-DD).")
+        parser.add_argument('--hasta', help="Último día a exportar (AAAA-MM-DD).")
+        parser.add_argument('--profesional', type=int, help="ID del profesional.")
+        parser.add_argument('--salida', help="Archivo de salida (default: salida estándar).")
+        parser.add_argument(
+            '--bloque', type=int, default=exportacion.TAMANO_BLOQUE,
+            help=f"Filas leídas por vez de la base de datos (default: {exportacion.TAMANO_BLOQUE}).")
+
+    def handle(self, *args, **options):
+        desde = self._parse_dia(options['desde'], '--desde')
+        hasta = self._parse_dia(options['hasta'], '--hasta')
+        queryset = exportacion.historias_para_exportar(desde, hasta, options['profesional'])
+        generador = exportacion.FORMATOS[options['formato']][0]
+
+        filas = 0
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+                for linea in generador(queryset, options['bloque']):
+                    salida.write(linea)
+                    filas += 1
+        else:
+            for linea in generador(queryset, options['bloque']):
+                self.stdout.write(linea, ending='')
+                filas += 1
+
+        if options['formato'] == 'csv':
+            filas -= 1  # encabezado
+        self.stderr.write(f"{filas} historias clínicas exportadas.")
+
+    def _parse_dia(self, valor, opcion):
+        if not valor:
+            return None
+        dia = parse_date(valor)
+        if dia is None:
+            raise CommandError(f"{opcion}: fecha inválida (use AAAA-MM-DD).")
+        return dia
@@ -0,0 +1,259 @@
+# gestion_clinica/management/commands/generar_datos.py
+
+"""
+Genera datos sintéticos con volúmenes realistas para pruebas de rendimiento.
+
+    python manage.py generar_datos --pacientes 5000 --anios 3
+
+Inserta con bulk_create en lotes (una transacción por lote). Como bulk_create no
+dispara señales, al final se actualizan el índice de búsqueda y los contadores
+del dashboard. Usar solo en bases de desarrollo: los datos son ficticios.
+"""
+
+import random
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as hora
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from gestion_clinica import catalogos, contadores, mediciones
+from gestion_clinica.busqueda import indexar_pacientes
+from gestion_clinica.models import (
+    ExamenOftalmologico, HistoriaClinica, ObraSocial, Paciente, Profesional, Turno,
+)
+from gestion_clinica.secuencias import reservar_num_registros
+
+NOMBRES = [
+    'Juan', 'María', 'José', 'Ana', 'Carlos', 'Laura', 'Luis', 'Sofía', 'Jorge', 'Lucía',
+    'Miguel', 'Valentina', 'Diego', 'Camila', 'Pablo', 'Martina', 'Sergio', 'Florencia',
+    'Ricardo', 'Gabriela', 'Héctor', 'Romina', 'Andrés', 'Julieta', 'Raúl', 'Agustina',
+]
+APELLIDOS = [
+    'González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez',
+    'García', 'Sánchez', 'Romero', 'Sosa', 'Álvarez', 'Torres', 'Ruiz', 'Ramírez', 'Flores',
+    'Benítez', 'Acosta', 'Medina', 'Herrera', 'Suárez', 'Aguirre', 'Giménez', 'Gutiérrez',
+    'Pereyra', 'Rojas', 'Molina', 'Castro', 'Ortiz', 'Silva', 'Núñez', 'Luna', 'Cabrera',
+]
+CALLES = ['San Martín', 'Belgrano', 'Rivadavia', 'Mitre', 'Sarmiento', 'Moreno', '9 de Julio']
+OBRAS_SOCIALES = [
+    ('OSDE', 'OSDE'), ('Swiss Medical', 'SMG'), ('Galeno', 'GAL'), ('PAMI', 'PAMI'),
+    ('IOMA', 'IOMA'), ('OSECAC', 'OSECAC'), ('Medifé', 'MED'), ('Sancor Salud', 'SAN'),
+    ('Omint', 'OMT'), ('Accord Salud', 'ACC'), ('OSPRERA', 'OSPRERA'), ('Unión Personal', 'UP'),
+]
+MOTIVOS = [
+    'Control anual', 'Disminución de agudeza visual', 'Ojo rojo', 'Ardor y picazón',
+    'Cefalea al leer', 'Control de presión ocular', 'Visión borrosa de lejos',
+    'Moscas volantes', 'Control post quirúrgico', 'Lagrimeo',
+]
+DIAGNOSTICOS = [
+    'Miopía', 'Hipermetropía', 'Astigmatismo', 'Presbicia', 'Conjuntivitis alérgica',
+    'Glaucoma de ángulo abierto', 'Catarata senil', 'Ojo seco', 'Blefaritis',
+    'Retinopatía diabética no proliferativa', 'Sin patología',
+]
+TRATAMIENTOS = [
+    'Corrección óptica', 'Lágrimas artificiales', 'Timolol 0.5% c/12 h', 'Control en 6 meses',
+    'Higiene palpebral', 'Derivación a cirugía', 'Antihistamínico tópico', 'Control en 1 año',
+]
+BIOMICROSCOPIAS = ['Sin particularidades', 'Hiperemia conjuntival leve', 'Opacidad de cristalino']
+FONDOS = ['Normal', 'Excavación 0.3', 'Excavación 0.6', 'Microaneurismas aislados']
+AGUDEZAS = ['0.25', '0.5', '0.75', '1.0', '1.25', '2.0', '3.0', '5.0', '10.0']
+ESTADOS_TURNO_PASADO = ['ATENDIDO'] * 7 + ['CANCELADO'] * 2 + ['CONFIRMADO']
+ESTADOS_TURNO_FUTURO = ['PENDIENTE'] * 3 + ['CONFIRMADO'] * 2 + ['CANCELADO']
+
+
+class Command(BaseCommand):
+    help = "Genera pacientes, catálogos, historias clínicas, exámenes y turnos sintéticos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacientes', type=int, default=1000)
+        parser.add_argument('--profesionales', type=int, default=8)
+        parser.add_argument(
+            '--obras-sociales', type=int, default=len(OBRAS_SOCIALES),
+            help=f"Cantidad de obras sociales (máximo {len(OBRAS_SOCIALES)}).")
+        parser.add_argument(
+            '--anios', type=int, default=3, help="Años de historia clínica hacia atrás (default: 3).")
+        parser.add_argument(
+            '--consultas', type=float, default=4,
+            help="Consultas promedio por paciente en todo el período (default: 4).")
+        parser.add_argument(
+            '--turnos', type=float, default=2,
+            help="Turnos promedio por paciente, pasados y futuros (default: 2).")
+        parser.add_argument('--lote', type=int, default=2000, help="Filas por bulk_create (default: 2000).")
+        parser.add_argument('--semilla', type=int, default=None, help="Semilla para datos reproducibles.")
+
+    def handle(self, *args, **options):
+        if options['pacientes'] < 1 or options['profesionales'] < 1:
+            raise CommandError("Debe generar al menos un paciente y un profesional.")
+
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        inicio = time.monotonic()
+
+        profesionales = self._profesionales(options['profesionales'])
+        obras_sociales = self._obras_sociales(min(options['obras_sociales'], len(OBRAS_SOCIALES)))
+        pacientes = self._pacientes(options['pacientes'], obras_sociales)
+        historias = self._historias(pacientes, profesionales, options['anios'], options['consultas'])
+        turnos = self._turnos(pacientes, profesionales, options['turnos'])
+
+        # bulk_create no dispara señales: se recalculan los contadores del dashboard
+        contadores.reconstruir()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generados {len(pacientes)} pacientes, {historias} historias clínicas y "
+            f"{turnos} turnos en {time.monotonic() - inicio:.1f} s."))
+
+    # --- Catálogos ---
+
+    def _profesionales(self, cantidad):
+        existentes = Profesional.objects.count()
+        nuevos = [
+            Profesional(
+                nombre=self.azar.choice(NOMBRES),
+                apellido=self.azar.choice(APELLIDOS),
+                matricula=f'MN-SINT-{existentes + i:05d}',
+            )
+            for i in range(1, cantidad + 1)
+        ]
+        profesionales = Profesional.objects.bulk_create(nuevos)
+        # bulk_create no dispara señales: se avisa a la caché de catálogos
+        catalogos.PROFESIONALES.invalidar()
+        return profesionales
+
+    def _obras_sociales(self, cantidad):
+        for nombre, siglas in OBRAS_SOCIALES[:cantidad]:
+            ObraSocial.objects.get_or_create(nombre=nombre, defaults={'siglas': siglas})
+        return list(ObraSocial.objects.values_list('pk', flat=True))
+
+    # --- Pacientes ---
+
+    def _pacientes(self, cantidad, obras_sociales):
+        hoy = date.today()
+        # DNI desde 90.000.000 (fuera del rango en uso) y consecutivos entre ejecuciones
+        dni_base = 90_000_000 + Paciente.objects.count()
+        creados = []
+        for desde in range(0, cantidad, self.lote):
+            n = min(self.lote, cantidad - desde)
+            pacientes = []
+            for numero, i in zip(reservar_num_registros(n), range(desde, desde + n)):
+                con_cobertura = obras_sociales and self.azar.random() < 0.85
+                obra_social = self.azar.choice(obras_sociales) if con_cobertura else None
+                pacientes.append(Paciente(
+                    num_registro=numero,
+                    nombre=self.azar.choice(NOMBRES),
+                    apellido=self.azar.choice(APELLIDOS),
+                    dni=str(dni_base + i),
+                    fecha_nacimiento=hoy - timedelta(days=self.azar.randint(365 * 2, 365 * 95)),
+                    genero='O' if self.azar.random() < 0.01 else self.azar.choice('MF'),
+                    telefono=f'11-{self.azar.randint(4000, 6999)}-{self.azar.randint(1000, 9999)}',
+                    domicilio=f'{self.azar.choice(CALLES)} {self.azar.randint(1, 5000)}',
+                    obra_social_id=obra_social,
+                    num_afiliado=str(self.azar.randint(10 ** 8, 10 ** 9)) if obra_social else None,
+                ))
+            with transaction.atomic():
+                Paciente.objects.bulk_create(pacientes)
+                indexar_pacientes(pacientes)
+            creados.extend(pacientes)
+        return creados
+
+    # --- Historias clínicas y exámenes ---
+
+    def _historias(self, pacientes, profesionales, anios, promedio):
+        ahora = timezone.now()
+        segundos = anios * 365 * 24 * 3600
+        total = 0
+        pendientes = []
+        for paciente in pacientes:
+            for _ in range(self._cantidad(promedio)):
+                fecha = ahora - timedelta(seconds=self.azar.randrange(segundos))
+                pendientes.append((paciente, fecha))
+                if len(pendientes) >= self.lote:
+                    total += self._guardar_historias(pendientes, profesionales)
+                    pendientes = []
+        if pendientes:
+            total += self._guardar_historias(pendientes, profesionales)
+        return total
+
+    def _guardar_historias(self, pendientes, profesionales):
+        historias = [
+            HistoriaClinica(
+                paciente=paciente,
+                profesional=self.azar.choice(profesionales),
+                motivo_consulta=self.azar.choice(MOTIVOS),
+                diagnostico=self.azar.choice(DIAGNOSTICOS),
+                tratamiento=self.azar.choice(TRATAMIENTOS),
+                observaciones='' if self.azar.random() < 0.7 else 'Paciente refiere mejoría.',
+            )
+            for paciente, _ in pendientes
+        ]
+        with transaction.atomic():
+            HistoriaClinica.objects.bulk_create(historias)
+            # 'fecha' es auto_now_add: bulk_create la pisa con la fecha actual
+            for historia, (_, fecha) in zip(historias, pendientes):
+                historia.fecha = fecha
+            HistoriaClinica.objects.bulk_update(historias, ['fecha'], batch_size=500)
+
+            examenes = [
+                ExamenOftalmologico(
+                    historia_clinica=historia,
+                    agudeza_visual_od=self.azar.choice(AGUDEZAS),
+                    agudeza_visual_oi=self.azar.choice(AGUDEZAS),
+                    pio_od=str(self.azar.randint(10, 28)),
+                    pio_oi=str(self.azar.randint(10, 28)),
+                    biomicroscopia=self.azar.choice(BIOMICROSCOPIAS),
+                    fondo_ojo=self.azar.choice(FONDOS),
+                )
+                for historia in historias if self.azar.random() < 0.8
+            ]
+            # bulk_create no dispara pre_save: las columnas numéricas se calculan acá
+            for examen in examenes:
+                mediciones.completar_valores(examen)
+            ExamenOftalmologico.objects.bulk_create(examenes)
+        return len(historias)
+
+    # --- Turnos ---
+
+    def _turnos(self, pacientes, profesionales, promedio):
+        """Turnos de 30 minutos sin superposición: un slot de agenda no se repite por profesional."""
+        hoy = timezone.localdate()
+        ocupados = set()
+        turnos = []
+        total = 0
+        for paciente in pacientes:
+            for _ in range(self._cantidad(promedio)):
+                profesional = self.azar.choice(profesionales)
+                dia = hoy + timedelta(days=self.azar.randint(-365, 60))
+                if dia.weekday() > 4:
+                    dia -= timedelta(days=dia.weekday() - 4)
+                slot = self.azar.randrange(24)  # 08:00 a 19:30
+                clave = (profesional.pk, dia, slot)
+                if clave in ocupados:
+                    continue
+                ocupados.add(clave)
+
+                fecha_hora = timezone.make_aware(
+                    datetime.combine(dia, hora(8)) + timedelta(minutes=30 * slot))
+                estados = ESTADOS_TURNO_PASADO if dia < hoy else ESTADOS_TURNO_FUTURO
+                turnos.append(Turno(
+                    paciente=paciente, profesional=profesional, fecha_hora=fecha_hora,
+                    duracion=30, estado=self.azar.choice(estados),
+                ))
+                if len(turnos) >= self.lote:
+                    total += self._guardar(Turno, turnos)
+                    turnos = []
+        if turnos:
+            total += self._guardar(Turno, turnos)
+        return total
+
+    # --- Utilidades ---
+
+    def _cantidad(self, promedio):
+        """Cantidad aleatoria con el promedio pedido (entre 0 y 2 * promedio)."""
+        return self.azar.randint(0, max(0, round(2 * promedio)))
+
+    def _guardar(self, modelo, objetos):
+        with transaction.atomic():
+            modelo.objects.bulk_create(objetos)
+        return len(objetos)
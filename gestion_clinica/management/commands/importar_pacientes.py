@@ -0,0 +1,233 @@
+# gestion_clinica/management/commands/importar_pacientes.py
+
+"""
+Importación masiva de pacientes desde un sistema anterior.
+
+    python manage.py importar_pacientes pacientes.csv
+    python manage.py importar_pacientes pacientes.ndjson --lote 1000
+    python manage.py importar_pacientes pacientes.json --rechazados errores.csv
+
+Columnas/claves reconocidas: nombre, apellido, dni, fecha_nacimiento (AAAA-MM-DD),
+genero (M/F/O), telefono, domicilio, obra_social (nombre o siglas), num_afiliado,
+antecedentes_sistemicos, antecedentes_oftalmologicos.
+
+El archivo se lee en streaming; cada lote se valida con las reglas de
+PacienteForm, se le asignan números de registro en bloque y se inserta con
+bulk_create dentro de una transacción. Las filas rechazadas se escriben en un
+CSV aparte con el motivo.
+"""
+
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from gestion_clinica import contadores
+from gestion_clinica.busqueda import indexar_pacientes, normalizar
+from gestion_clinica.forms import PacienteImportacionForm
+from gestion_clinica.models import ObraSocial, Paciente
+from gestion_clinica.secuencias import reservar_num_registros
+
+COLUMNAS = [
+    'nombre', 'apellido', 'dni', 'fecha_nacimiento', 'genero', 'telefono', 'domicilio',
+    'obra_social', 'num_afiliado', 'antecedentes_sistemicos', 'antecedentes_oftalmologicos',
+]
+
+
+def leer_csv(archivo):
+    for fila in csv.DictReader(archivo):
+        yield fila
+
+
+def leer_ndjson(archivo):
+    for linea in archivo:
+        linea = linea.strip()
+        if linea:
+            yield json.loads(linea)
+
+
+def leer_json(archivo, tamano_bloque=65536):
+    """Lee un arreglo JSON de objetos sin cargarlo completo en memoria."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    inicio_arreglo = False
+    fin_archivo = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if not inicio_arreglo:
+            if not buffer and not fin_archivo:
+                bloque = archivo.read(tamano_bloque)
+                fin_archivo = not bloque
+                buffer += bloque
+                continue
+            if not buffer.startswith('['):
+                raise CommandError("El archivo JSON debe contener un arreglo de objetos.")
+            buffer = buffer[1:]
+            inicio_arreglo = True
+            continue
+
+        buffer = buffer.lstrip(', \n\r\t')
+        if buffer.startswith(']'):
+            return
+        try:
+            objeto, fin = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if fin_archivo:
+                raise CommandError("JSON incompleto o mal formado.")
+            bloque = archivo.read(tamano_bloque)
+            fin_archivo = not bloque
+            buffer += bloque
+            continue
+        yield objeto
+        buffer = buffer[fin:]
+
+
+LECTORES = {'csv': leer_csv, 'ndjson': leer_ndjson, 'json': leer_json}
+
+
+class Command(BaseCommand):
+    help = "Importa pacientes en lote desde un archivo CSV, JSON o NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo a importar.")
+        parser.add_argument(
+            '--formato', choices=sorted(LECTORES),
+            help="Formato del archivo (por defecto se deduce de la extensión).")
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Cantidad de pacientes por transacción (default: 500).")
+        parser.add_argument(
+            '--rechazados',
+            help="CSV donde se escriben las filas rechazadas (default: <archivo>.rechazados.csv).")
+        parser.add_argument(
+            '--encoding', default='utf-8-sig', help="Codificación del archivo (default: utf-8-sig).")
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f"No existe el archivo {ruta}.")
+
+        formato = options['formato'] or ruta.suffix.lstrip('.').lower()
+        if formato == 'jsonl':
+            formato = 'ndjson'
+        if formato not in LECTORES:
+            raise CommandError("Formato no reconocido: use --formato csv|json|ndjson.")
+        if options['lote'] < 1:
+            raise CommandError("--lote debe ser mayor a cero.")
+
+        ruta_rechazados = Path(options['rechazados'] or f'{ruta}.rechazados.csv')
+        self.verbosity = options['verbosity']
+        self.obras_sociales = self._mapa_obras_sociales()
+        self.importados = 0
+        self.rechazados = 0
+        inicio = time.monotonic()
+
+        with open(ruta, encoding=options['encoding'], newline='') as archivo, \
+                open(ruta_rechazados, 'w', encoding='utf-8', newline='') as salida_rechazados:
+            self.escritor_rechazados = csv.DictWriter(
+                salida_rechazados, fieldnames=['linea'] + COLUMNAS + ['errores'], extrasaction='ignore')
+            self.escritor_rechazados.writeheader()
+
+            lote = []
+            for numero, fila in enumerate(LECTORES[formato](archivo), start=1):
+                lote.append((numero, fila))
+                if len(lote) >= options['lote']:
+                    self._procesar_lote(lote)
+                    lote = []
+                    self._informar_avance(inicio)
+            if lote:
+                self._procesar_lote(lote)
+
+        duracion = time.monotonic() - inicio
+        velocidad = self.importados / duracion if duracion else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.importados} pacientes importados, {self.rechazados} rechazados "
+            f"en {duracion:.1f} s ({velocidad:.0f} pacientes/s)."))
+        if self.rechazados:
+            self.stdout.write(f"Filas rechazadas en {ruta_rechazados}")
+
+    # --- Lotes ---
+
+    def _mapa_obras_sociales(self):
+        """{nombre o siglas normalizados: id} de todas las obras sociales (una consulta)."""
+        mapa = {}
+        for pk, nombre, siglas in ObraSocial.objects.values_list('pk', 'nombre', 'siglas'):
+            mapa[normalizar(nombre)] = pk
+            if siglas:
+                mapa.setdefault(normalizar(siglas), pk)
+        return mapa
+
+    def _validar(self, fila):
+        """Devuelve (paciente, None) o (None, errores) aplicando las reglas de PacienteForm."""
+        datos = {clave: (valor.strip() if isinstance(valor, str) else valor)
+                 for clave, valor in fila.items() if clave in COLUMNAS}
+        form = PacienteImportacionForm(data=datos)
+        if not form.is_valid():
+            errores = '; '.join(
+                f"{campo}: {' '.join(mensajes)}" for campo, mensajes in form.errors.items())
+            return None, errores
+
+        paciente = form.save(commit=False)
+        nombre_obra_social = normalizar(datos.get('obra_social'))
+        if nombre_obra_social:
+            obra_social_id = self.obras_sociales.get(nombre_obra_social)
+            if obra_social_id is None:
+                return None, f"obra_social: '{datos['obra_social']}' no existe."
+            paciente.obra_social_id = obra_social_id
+        return paciente, None
+
+    def _procesar_lote(self, lote):
+        validos = []
+        for numero, fila in lote:
+            paciente, errores = self._validar(fila)
+            if errores:
+                self._rechazar(numero, fila, errores)
+            else:
+                validos.append((numero, fila, paciente))
+
+        # DNI únicos: una consulta por lote contra la base, más los repetidos dentro del archivo
+        existentes = set(Paciente.objects.filter(
+            dni__in=[paciente.dni for _, _, paciente in validos]
+        ).values_list('dni', flat=True))
+        pacientes = []
+        for numero, fila, paciente in validos:
+            if paciente.dni in existentes:
+                self._rechazar(numero, fila, f"dni: ya existe un paciente con DNI {paciente.dni}.")
+                continue
+            existentes.add(paciente.dni)
+            pacientes.append(paciente)
+
+        if not pacientes:
+            return
+
+        try:
+            with transaction.atomic():
+                for paciente, num_registro in zip(pacientes, reservar_num_registros(len(pacientes))):
+                    paciente.num_registro = num_registro
+                Paciente.objects.bulk_create(pacientes)
+                # bulk_create no dispara señales: índice de búsqueda y contadores se actualizan aquí
+                indexar_pacientes(pacientes)
+                contadores.incrementar_total(contadores.TOTAL_PACIENTES, len(pacientes))
+        except IntegrityError as error:
+            # Ej: un DNI dado de alta en paralelo desde la recepción
+            for paciente in pacientes:
+                self._rechazar('', {campo: getattr(paciente, campo, '') for campo in COLUMNAS},
+                               f"lote rechazado por integridad: {error}")
+            return
+
+        self.importados += len(pacientes)
+
+    def _rechazar(self, numero, fila, errores):
+        self.rechazados += 1
+        self.escritor_rechazados.writerow({**fila, 'linea': numero, 'errores': errores})
+
+    def _informar_avance(self, inicio):
+        if self.verbosity >= 2:
+            duracion = time.monotonic() - inicio
+            self.stdout.write(
+                f"  {self.importados} importados, {self.rechazados} rechazados "
+                f"({self.importados / duracion if duracion else 0:.0f} pacientes/s)")
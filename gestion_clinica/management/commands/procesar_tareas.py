@@ -0,0 +1,38 @@
+# gestion_clinica/management/commands/procesar_tareas.py
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from gestion_clinica import tareas
+
+
+class Command(BaseCommand):
+    help = "Worker de la cola de tareas en segundo plano (modelo Tarea). SIGTERM/Ctrl+C: termina las tareas en curso y sale."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4, help="Tareas simultáneas en threads.")
+        parser.add_argument(
+            '--procesos', type=int, default=2,
+            help="Procesos para tareas de uso intensivo de CPU (0 = correrlas en threads).")
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument(
+            '--hasta-vaciar', action='store_true',
+            help="Salir cuando no queden tareas disponibles ni en curso (útil en cron).")
+
+    def handle(self, *args, **options):
+        worker = tareas.Worker(options['hilos'], options['procesos'], options['intervalo'])
+
+        def detener(signum, frame):
+            self.stdout.write("Deteniendo: se esperan las tareas en curso...")
+            worker.detener()
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+
+        self.stdout.write(
+            f"Worker {worker.nombre}: {options['hilos']} hilos, {options['procesos']} procesos, "
+            f"tipos: {', '.join(sorted(tareas.REGISTRO))}.")
+        worker.ejecutar(hasta_vaciar=options['hasta_vaciar'])
+        self.stdout.write("Worker detenido.")
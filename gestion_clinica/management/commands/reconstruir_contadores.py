@@ -0,0 +1,15 @@
+# gestion_clinica/management/commands/reconstruir_contadores.py
+
+from django.core.management.base import BaseCommand
+
+from gestion_clinica import contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los contadores materializados del dashboard."
+
+    def handle(self, *args, **options):
+        dias = contadores.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores reconstruidos: {contadores.total(contadores.TOTAL_PACIENTES)} pacientes, "
+            f"{dias} filas diarias."))
@@ -0,0 +1,27 @@
+# gestion_clinica/management/commands/refrescar_replica.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_clinica import replica
+
+
+class Command(BaseCommand):
+    help = "Copia la base principal sobre la réplica de lectura (API de backup de SQLite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help="Repetir cada N segundos (0 = copiar una sola vez).")
+
+    def handle(self, *args, **options):
+        if not replica.configurada():
+            raise CommandError("No hay una base 'replica' en settings.DATABASES.")
+
+        while True:
+            duracion = replica.refrescar()
+            self.stdout.write(f"Réplica actualizada en {duracion:.2f} s.")
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,18 @@
+# gestion_clinica/management/commands/reindexar_historias.py
+
+from django.core.management.base import BaseCommand
+
+from gestion_clinica import busqueda_clinica
+
+
+class Command(BaseCommand):
+    help = "Reconstruye desde cero el índice de texto completo de HC y E.O. (FTS5)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sin-optimizar', action='store_true',
+            help="No fusionar los segmentos del índice al terminar.")
+
+    def handle(self, *args, **options):
+        total = busqueda_clinica.reconstruir(optimizar=not options['sin_optimizar'])
+        self.stdout.write(self.style.SUCCESS(f"{total} historias clínicas indexadas."))
@@ -0,0 +1,40 @@
+# gestion_clinica/management/commands/reindexar_pacientes.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion_clinica.busqueda import indexar_pacientes
+from gestion_clinica.models import IndicePaciente, Paciente, PalabraPaciente, TrigramaPaciente
+
+
+class Command(BaseCommand):
+    help = "Reconstruye desde cero el índice de búsqueda de pacientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=2000,
+            help="Cantidad de pacientes indexados por lote (default: 2000).")
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        total = 0
+
+        with transaction.atomic():
+            TrigramaPaciente.objects.all().delete()
+            PalabraPaciente.objects.all().delete()
+            IndicePaciente.objects.all().delete()
+
+            pacientes = Paciente.objects.only(
+                'pk', 'apellido', 'nombre', 'dni', 'num_registro').order_by('pk')
+            bloque = []
+            for paciente in pacientes.iterator(chunk_size=lote):
+                bloque.append(paciente)
+                if len(bloque) >= lote:
+                    indexar_pacientes(bloque)
+                    total += len(bloque)
+                    bloque = []
+            if bloque:
+                indexar_pacientes(bloque)
+                total += len(bloque)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} pacientes indexados."))
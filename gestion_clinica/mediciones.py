@@ -0,0 +1,135 @@
+# gestion_clinica/mediciones.py
+
+"""
+Valores numéricos de PIO y agudeza visual para consultas clínicas.
+
+En ExamenOftalmologico la PIO se carga como texto libre ('14', '14 mmHg', '14,5')
+y la AV como texto de AV_CHOICES ('0.25' ... '20.0'). Cada examen guarda además
+una copia numérica e indexada de esos cuatro valores (campos *_valor):
+
+- La señal pre_save (signals.py) los completa en cada alta/edición.
+- Las cargas masivas con bulk_create deben llamar a completar_valores() a mano.
+- La migración 0014 completó los exámenes existentes.
+
+Las pesquisas por umbral o rango (ej: "PIO > 21 en el último año") se resuelven
+enteramente en la base con examenes() y pacientes().
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from .models import ExamenOftalmologico, Paciente
+
+PIO = 'pio'
+AGUDEZA_VISUAL = 'agudeza_visual'
+OJOS = ('od', 'oi')
+
+LOOKUPS_PERMITIDOS = {'gt', 'gte', 'lt', 'lte', 'range'}
+
+_NUMERO = re.compile(r'\d+(?:[.,]\d+)?')
+_FRACCION = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*/\s*(\d+(?:[.,]\d+)?)\s*$')
+
+# Límites de las columnas (max_digits/decimal_places del modelo)
+_PIO_MAXIMA = Decimal('999.9')
+_AGUDEZA_MAXIMA = Decimal('999.99')
+
+# -------------------------------------------------------------
+# 1. Conversión texto -> número
+# -------------------------------------------------------------
+
+
+def _decimal(texto):
+    try:
+        return Decimal(texto.replace(',', '.'))
+    except InvalidOperation:
+        return None
+
+
+def parsear_pio(texto):
+    """PIO en mmHg: primer número del texto ('14 mmHg' -> 14.0). None si no hay número."""
+    coincidencia = _NUMERO.search(texto or '')
+    if not coincidencia:
+        return None
+    valor = _decimal(coincidencia.group())
+    if valor is None or valor > _PIO_MAXIMA:
+        return None
+    return valor.quantize(Decimal('0.1'))
+
+
+def parsear_agudeza(texto):
+    """AV decimal: '0.5', '1,0' o fracción de Snellen ('20/40' -> 0.50). None si no se reconoce."""
+    texto = (texto or '').strip()
+    fraccion = _FRACCION.match(texto)
+    if fraccion:
+        numerador, denominador = _decimal(fraccion.group(1)), _decimal(fraccion.group(2))
+        valor = numerador / denominador if denominador else None
+    elif _NUMERO.fullmatch(texto):
+        valor = _decimal(texto)
+    else:
+        valor = None
+    if valor is None or valor > _AGUDEZA_MAXIMA:
+        return None
+    return valor.quantize(Decimal('0.01'))
+
+
+# campo de texto -> (columna numérica, conversión)
+CAMPOS_NUMERICOS = {
+    'pio_od': ('pio_od_valor', parsear_pio),
+    'pio_oi': ('pio_oi_valor', parsear_pio),
+    'agudeza_visual_od': ('agudeza_visual_od_valor', parsear_agudeza),
+    'agudeza_visual_oi': ('agudeza_visual_oi_valor', parsear_agudeza),
+}
+
+
+def completar_valores(examen):
+    """Calcula las columnas numéricas a partir de los textos (no guarda)."""
+    for campo, (columna, parsear) in CAMPOS_NUMERICOS.items():
+        setattr(examen, columna, parsear(getattr(examen, campo)))
+
+
+# -------------------------------------------------------------
+# 2. Pesquisas por umbral y por rango
+# -------------------------------------------------------------
+
+
+def condicion(medida, ojos=OJOS, **lookups):
+    """
+    Q sobre las columnas numéricas: se cumple si alguno de los ojos cumple todos los lookups.
+
+        condicion(PIO, gt=21)                         # PIO > 21 en OD u OI
+        condicion(AGUDEZA_VISUAL, lte=0.3, ojos=('od',))
+        condicion(PIO, range=(22, 30))                # extremos incluidos
+    """
+    if medida not in (PIO, AGUDEZA_VISUAL):
+        raise ValueError(f"Medida inexistente: {medida!r}.")
+    if not lookups or not set(lookups) <= LOOKUPS_PERMITIDOS:
+        raise ValueError(f"Se esperaba algún lookup de {sorted(LOOKUPS_PERMITIDOS)}.")
+    if not ojos or not set(ojos) <= set(OJOS):
+        raise ValueError(f"Ojos inválidos: {ojos!r}.")
+
+    resultado = Q()
+    for ojo in ojos:
+        resultado |= Q(**{f'{medida}_{ojo}_valor__{lookup}': valor for lookup, valor in lookups.items()})
+    return resultado
+
+
+def examenes(medida, ojos=OJOS, desde=None, hasta=None, **lookups):
+    """Exámenes que cumplen la condición; desde/hasta filtran por la fecha de la consulta."""
+    queryset = ExamenOftalmologico.objects.filter(condicion(medida, ojos, **lookups))
+    if desde is not None:
+        queryset = queryset.filter(historia_clinica__fecha__gte=desde)
+    if hasta is not None:
+        queryset = queryset.filter(historia_clinica__fecha__lt=hasta)
+    return queryset
+
+
+def pacientes(medida, ojos=OJOS, desde=None, hasta=None, **lookups):
+    """
+    Pacientes con al menos un examen que cumple la condición (una sola consulta con subquery).
+
+        pacientes(PIO, gt=21, desde=timezone.now() - timedelta(days=365))
+    """
+    return Paciente.objects.filter(
+        pk__in=examenes(medida, ojos, desde, hasta, **lookups).values('historia_clinica__paciente_id'))
@@ -0,0 +1,66 @@
+# gestion_clinica/metricas.py
+
+"""
+Latencias recientes por vista, en memoria.
+
+Cada vista guarda sus últimas N mediciones en un buffer circular (deque con
+maxlen), así que la memoria usada está acotada sin importar el tráfico. Los
+datos son por proceso: con varios workers, cada uno muestra los suyos.
+"""
+
+import math
+import threading
+from collections import deque
+
+from django.conf import settings
+
+CAPACIDAD_DEFECTO = 1000
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return None
+    rango = math.ceil(p / 100 * len(valores_ordenados))
+    return valores_ordenados[max(0, rango - 1)]
+
+
+class RegistroLatencias:
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._muestras = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, vista, milisegundos, consultas):
+        with self._lock:
+            buffer = self._muestras.get(vista)
+            if buffer is None:
+                buffer = self._muestras[vista] = deque(maxlen=self.capacidad)
+            buffer.append((milisegundos, consultas))
+
+    def resumen(self):
+        """[{vista, muestras, p50, p95, p99, maximo, consultas_promedio}] de la vista más lenta (p95) a la más rápida."""
+        with self._lock:
+            copia = {vista: list(buffer) for vista, buffer in self._muestras.items()}
+
+        filas = []
+        for vista, muestras in copia.items():
+            tiempos = sorted(ms for ms, _ in muestras)
+            filas.append({
+                'vista': vista,
+                'muestras': len(muestras),
+                'p50': percentil(tiempos, 50),
+                'p95': percentil(tiempos, 95),
+                'p99': percentil(tiempos, 99),
+                'maximo': tiempos[-1],
+                'consultas_promedio': sum(consultas for _, consultas in muestras) / len(muestras),
+            })
+        return sorted(filas, key=lambda fila: fila['p95'], reverse=True)
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+
+
+registro = RegistroLatencias(getattr(settings, 'INSTRUMENTACION_CAPACIDAD', CAPACIDAD_DEFECTO))
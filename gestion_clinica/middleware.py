@@ -0,0 +1,163 @@
+# gestion_clinica/middleware.py
+
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metricas, replica
+
+logger_lentas = logging.getLogger('gestion_clinica.lentas')
+
+
+class FijarPrimarioMiddleware:
+    """
+    Tras una escritura exitosa (POST, PUT, PATCH o DELETE) fija al navegador a la
+    base principal: la redirección posterior (ej: al detalle del paciente después
+    de ExamenOftalmologicoFirstCreateView) muestra lo recién guardado aunque la
+    réplica todavía no se haya refrescado.
+    """
+    metodos_escritura = ('POST', 'PUT', 'PATCH', 'DELETE')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.procesar(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.procesar(request, await self.get_response(request))
+
+    def procesar(self, request, response):
+        if request.method in self.metodos_escritura and response.status_code < 400:
+            replica.fijar_primario(response)
+        return response
+
+
+class RegistroConsultas:
+    """execute_wrapper que cuenta y cronometra las consultas SQL de un request."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.sentencias = Counter()   # mismo SQL (posible N+1)
+        self.identicas = Counter()    # mismo SQL con los mismos parámetros
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.sentencias[sql] += 1
+            if not many:
+                self.identicas[(sql, repr(params))] += 1
+
+    @property
+    def duplicadas(self):
+        """Consultas que repiten exactamente otra anterior del mismo request."""
+        return sum(veces - 1 for veces in self.identicas.values())
+
+    def mas_repetidas(self, cantidad=3):
+        return [
+            {'sql': sql[:200], 'veces': veces}
+            for sql, veces in self.sentencias.most_common(cantidad) if veces > 1
+        ]
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request: tiempo total, cantidad y tiempo de consultas SQL (en todas
+    las bases) y consultas duplicadas.
+
+    - Agrega el header Server-Timing (visible en las herramientas del navegador).
+    - Registra la latencia por vista en metricas.registro (página de métricas).
+    - Los requests que superan INSTRUMENTACION_UMBRAL_LENTO_MS se escriben en el
+      logger 'gestion_clinica.lentas' como una línea JSON.
+
+    En respuestas en streaming solo se mide hasta que empieza el envío.
+
+    Funciona en WSGI y en ASGI: con ASGI no obliga a Django a pasar el request
+    a un thread antes de llegar a las vistas async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.umbral_lento_ms = getattr(settings, 'INSTRUMENTACION_UMBRAL_LENTO_MS', 500)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registro_sql = RegistroConsultas()
+        inicio = time.perf_counter()
+        with self._instalar(registro_sql):
+            response = self.get_response(request)
+        return self.procesar(request, response, registro_sql, inicio)
+
+    async def __acall__(self, request):
+        registro_sql = RegistroConsultas()
+        inicio = time.perf_counter()
+        # Las conexiones son locales a cada thread: los wrappers se instalan en el
+        # thread donde sync_to_async ejecuta el ORM de este request
+        pila = await sync_to_async(self._instalar)(registro_sql)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pila.close)()
+        return self.procesar(request, response, registro_sql, inicio)
+
+    def _instalar(self, registro_sql):
+        pila = ExitStack()
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(registro_sql))
+        return pila
+
+    def procesar(self, request, response, registro_sql, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        sql_ms = registro_sql.segundos * 1000
+
+        vista = self._nombre_vista(request)
+        metricas.registro.registrar(vista, total_ms, registro_sql.cantidad)
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={sql_ms:.1f};desc="{registro_sql.cantidad} consultas"',
+            f'app;dur={total_ms - sql_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        if total_ms >= self.umbral_lento_ms:
+            logger_lentas.warning(json.dumps({
+                'vista': vista,
+                'metodo': request.method,
+                'ruta': request.path,
+                'estado': response.status_code,
+                'ms': round(total_ms, 1),
+                'consultas': registro_sql.cantidad,
+                'sql_ms': round(sql_ms, 1),
+                'duplicadas': registro_sql.duplicadas,
+                'mas_repetidas': registro_sql.mas_repetidas(),
+            }, ensure_ascii=False))
+        return response
+
+    def _nombre_vista(self, request):
+        """Nombre de la URL resuelta (ej: 'gestion_clinica:lista_pacientes')."""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'sin resolver'
+        return match.view_name or match._func_path
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0005_remove_examenoftalmologico_fecha_anulacion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turno',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='turno',
+            name='fecha_hora',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
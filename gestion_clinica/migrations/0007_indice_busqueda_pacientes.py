@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:07
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia de la normalización de busqueda.py en el momento de esta migración:
+# la migración no debe cambiar si después cambia el código de la aplicación.
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+LOTE = 2000
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def trigramas(texto):
+    resultado = set()
+    for palabra in normalizar(texto).split():
+        palabra = f'  {palabra} '
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+def indexar_pacientes_existentes(apps, schema_editor):
+    """Carga inicial del índice de búsqueda con los pacientes ya registrados (por lotes)."""
+    Paciente = apps.get_model('gestion_clinica', 'Paciente')
+    IndicePaciente = apps.get_model('gestion_clinica', 'IndicePaciente')
+    TrigramaPaciente = apps.get_model('gestion_clinica', 'TrigramaPaciente')
+
+    def guardar(entradas, trigramas_bloque):
+        IndicePaciente.objects.bulk_create(entradas, batch_size=1000)
+        TrigramaPaciente.objects.bulk_create(trigramas_bloque, batch_size=1000)
+
+    entradas, trigramas_bloque = [], []
+    for paciente in Paciente.objects.order_by('pk').iterator(chunk_size=LOTE):
+        entradas.append(IndicePaciente(
+            paciente_id=paciente.pk,
+            apellido=normalizar(paciente.apellido),
+            nombre=normalizar(paciente.nombre),
+            dni=normalizar(paciente.dni).replace(' ', ''),
+            num_registro=paciente.num_registro or '',
+        ))
+        trigramas_bloque.extend(
+            TrigramaPaciente(paciente_id=paciente.pk, trigrama=trigrama)
+            for trigrama in trigramas(f'{paciente.apellido} {paciente.nombre}')
+        )
+        if len(entradas) >= LOTE:
+            guardar(entradas, trigramas_bloque)
+            entradas, trigramas_bloque = [], []
+    guardar(entradas, trigramas_bloque)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0006_turno_actualizado_fecha_hora_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicePaciente',
+            fields=[
+                ('paciente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indice_busqueda', serialize=False, to='gestion_clinica.paciente')),
+                ('apellido', models.CharField(db_index=True, max_length=100)),
+                ('nombre', models.CharField(db_index=True, max_length=100)),
+                ('dni', models.CharField(db_index=True, max_length=20)),
+                ('num_registro', models.CharField(blank=True, db_index=True, max_length=6)),
+            ],
+            options={
+                'verbose_name': 'Índice de Paciente',
+                'verbose_name_plural': 'Índices de Pacientes',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrigramaPaciente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='gestion_clinica.paciente')),
+            ],
+            options={
+                'verbose_name': 'Trigrama de Paciente',
+                'verbose_name_plural': 'Trigramas de Pacientes',
+                'indexes': [models.Index(fields=['trigrama', 'paciente'], name='trigrama_paciente_idx')],
+            },
+        ),
+        migrations.RunPython(indexar_pacientes_existentes, migrations.RunPython.noop),
+    ]
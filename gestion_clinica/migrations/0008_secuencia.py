@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:08
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def crear_secuencia_num_registro(apps, schema_editor):
+    """Inicializa la secuencia con el mayor N° de registro ya asignado."""
+    Paciente = apps.get_model('gestion_clinica', 'Paciente')
+    Secuencia = apps.get_model('gestion_clinica', 'Secuencia')
+
+    ultimo = Paciente.objects.aggregate(ultimo=Max('num_registro'))['ultimo']
+    Secuencia.objects.get_or_create(
+        nombre='num_registro_paciente',
+        defaults={'ultimo_valor': int(ultimo) if ultimo and ultimo.isdigit() else 0},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0007_indice_busqueda_pacientes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Secuencia',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('ultimo_valor', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia',
+                'verbose_name_plural': 'Secuencias',
+            },
+        ),
+        migrations.RunPython(crear_secuencia_num_registro, migrations.RunPython.noop),
+    ]
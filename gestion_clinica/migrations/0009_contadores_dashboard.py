@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:10
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def calcular_contadores(apps, schema_editor):
+    """Carga inicial de los contadores con los datos existentes."""
+    Paciente = apps.get_model('gestion_clinica', 'Paciente')
+    HistoriaClinica = apps.get_model('gestion_clinica', 'HistoriaClinica')
+    Turno = apps.get_model('gestion_clinica', 'Turno')
+    Contador = apps.get_model('gestion_clinica', 'Contador')
+    ContadorDiario = apps.get_model('gestion_clinica', 'ContadorDiario')
+
+    Contador.objects.create(clave='pacientes', valor=Paciente.objects.count())
+    for metrica, modelo, campo in (
+        ('consultas', HistoriaClinica, 'fecha'),
+        ('turnos', Turno, 'fecha_hora'),
+    ):
+        filas = (
+            modelo.objects.annotate(dia=TruncDate(campo))
+            .values('dia').annotate(cantidad=Count('pk')).order_by()
+        )
+        ContadorDiario.objects.bulk_create(
+            [ContadorDiario(metrica=metrica, dia=fila['dia'], cantidad=fila['cantidad']) for fila in filas],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0008_secuencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('clave', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador',
+                'verbose_name_plural': 'Contadores',
+            },
+        ),
+        migrations.CreateModel(
+            name='ContadorDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrica', models.CharField(max_length=30)),
+                ('dia', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador Diario',
+                'verbose_name_plural': 'Contadores Diarios',
+                'constraints': [models.UniqueConstraint(fields=('metrica', 'dia'), name='contador_diario_unico')],
+            },
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0009_contadores_dashboard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['apellido', 'nombre', 'id'], name='paciente_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha_hora', 'id'], name='turno_orden_idx'),
+        ),
+    ]
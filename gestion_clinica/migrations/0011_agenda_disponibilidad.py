@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:13
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0010_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turno',
+            name='duracion',
+            field=models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)], verbose_name='Duración (min)'),
+        ),
+        migrations.CreateModel(
+            name='HorarioAtencion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('duracion_turno', models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)], verbose_name='Duración del Turno (min)')),
+                ('profesional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios', to='gestion_clinica.profesional')),
+            ],
+            options={
+                'verbose_name': 'Horario de Atención',
+                'verbose_name_plural': 'Horarios de Atención',
+                'ordering': ['profesional', 'dia_semana', 'hora_inicio'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0011_agenda_disponibilidad'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historiaclinica',
+            name='fecha',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de Consulta'),
+        ),
+    ]
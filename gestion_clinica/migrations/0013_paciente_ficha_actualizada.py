@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0012_historiaclinica_fecha_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='ficha_actualizada',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:37
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+# Copia de la conversión de mediciones.py en el momento de esta migración:
+# la migración no debe cambiar si después cambia el código de la aplicación.
+_NUMERO = re.compile(r'\d+(?:[.,]\d+)?')
+_FRACCION = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*/\s*(\d+(?:[.,]\d+)?)\s*$')
+_PIO_MAXIMA = Decimal('999.9')
+_AGUDEZA_MAXIMA = Decimal('999.99')
+TAMANO_BLOQUE = 2000
+
+
+def _decimal(texto):
+    try:
+        return Decimal(texto.replace(',', '.'))
+    except InvalidOperation:
+        return None
+
+
+def parsear_pio(texto):
+    coincidencia = _NUMERO.search(texto or '')
+    if not coincidencia:
+        return None
+    valor = _decimal(coincidencia.group())
+    if valor is None or valor > _PIO_MAXIMA:
+        return None
+    return valor.quantize(Decimal('0.1'))
+
+
+def parsear_agudeza(texto):
+    texto = (texto or '').strip()
+    fraccion = _FRACCION.match(texto)
+    if fraccion:
+        numerador, denominador = _decimal(fraccion.group(1)), _decimal(fraccion.group(2))
+        valor = numerador / denominador if denominador else None
+    elif _NUMERO.fullmatch(texto):
+        valor = _decimal(texto)
+    else:
+        valor = None
+    if valor is None or valor > _AGUDEZA_MAXIMA:
+        return None
+    return valor.quantize(Decimal('0.01'))
+
+
+CAMPOS_NUMERICOS = {
+    'pio_od': ('pio_od_valor', parsear_pio),
+    'pio_oi': ('pio_oi_valor', parsear_pio),
+    'agudeza_visual_od': ('agudeza_visual_od_valor', parsear_agudeza),
+    'agudeza_visual_oi': ('agudeza_visual_oi_valor', parsear_agudeza),
+}
+
+
+def completar_valores_existentes(apps, schema_editor):
+    """Completa las columnas numéricas de los exámenes ya cargados, por bloques de pk."""
+    ExamenOftalmologico = apps.get_model('gestion_clinica', 'ExamenOftalmologico')
+    columnas = [columna for columna, _ in CAMPOS_NUMERICOS.values()]
+
+    ultimo_pk = 0
+    while True:
+        bloque = list(
+            ExamenOftalmologico.objects.filter(pk__gt=ultimo_pk).order_by('pk')
+            .only('pk', *CAMPOS_NUMERICOS)[:TAMANO_BLOQUE]
+        )
+        if not bloque:
+            break
+        for examen in bloque:
+            for campo, (columna, parsear) in CAMPOS_NUMERICOS.items():
+                setattr(examen, columna, parsear(getattr(examen, campo)))
+        ExamenOftalmologico.objects.bulk_update(bloque, columnas, batch_size=500)
+        ultimo_pk = bloque[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0013_paciente_ficha_actualizada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examenoftalmologico',
+            name='agudeza_visual_od_valor',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='examenoftalmologico',
+            name='agudeza_visual_oi_valor',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='examenoftalmologico',
+            name='pio_od_valor',
+            field=models.DecimalField(db_index=True, decimal_places=1, editable=False, max_digits=4, null=True),
+        ),
+        migrations.AddField(
+            model_name='examenoftalmologico',
+            name='pio_oi_valor',
+            field=models.DecimalField(db_index=True, decimal_places=1, editable=False, max_digits=4, null=True),
+        ),
+        migrations.RunPython(completar_valores_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0014_examen_valores_numericos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paciente',
+            name='fecha_nacimiento',
+            field=models.DateField(db_index=True),
+        ),
+    ]
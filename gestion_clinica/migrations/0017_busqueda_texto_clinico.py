@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:05
+
+from django.db import migrations
+
+# Índice FTS5 de los textos de HC + E.O. (ver busqueda_clinica.py). rowid = id de la HC.
+# Lo mantienen triggers de SQLite: también cubren bulk_create y las escrituras del admin.
+TABLA = 'gestion_clinica_historia_fts'
+
+CREAR = [
+    f"""
+    CREATE VIRTUAL TABLE {TABLA} USING fts5(
+        motivo_consulta, diagnostico, tratamiento, observaciones,
+        biomicroscopia, fondo_ojo, observaciones_examen,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER gestion_clinica_historia_fts_ai AFTER INSERT ON gestion_clinica_historiaclinica BEGIN
+        INSERT INTO {TABLA} (rowid, motivo_consulta, diagnostico, tratamiento, observaciones,
+                             biomicroscopia, fondo_ojo, observaciones_examen)
+        VALUES (new.id, new.motivo_consulta, new.diagnostico, new.tratamiento, new.observaciones, '', '', '');
+    END
+    """,
+    f"""
+    CREATE TRIGGER gestion_clinica_historia_fts_au
+    AFTER UPDATE OF motivo_consulta, diagnostico, tratamiento, observaciones ON gestion_clinica_historiaclinica BEGIN
+        UPDATE {TABLA}
+        SET motivo_consulta = new.motivo_consulta, diagnostico = new.diagnostico,
+            tratamiento = new.tratamiento, observaciones = new.observaciones
+        WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER gestion_clinica_historia_fts_ad AFTER DELETE ON gestion_clinica_historiaclinica BEGIN
+        DELETE FROM {TABLA} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER gestion_clinica_examen_fts_ai AFTER INSERT ON gestion_clinica_examenoftalmologico BEGIN
+        UPDATE {TABLA}
+        SET biomicroscopia = new.biomicroscopia, fondo_ojo = new.fondo_ojo,
+            observaciones_examen = coalesce(new.observaciones, '')
+        WHERE rowid = new.historia_clinica_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER gestion_clinica_examen_fts_au AFTER UPDATE ON gestion_clinica_examenoftalmologico BEGIN
+        UPDATE {TABLA} SET biomicroscopia = '', fondo_ojo = '', observaciones_examen = ''
+        WHERE rowid = old.historia_clinica_id AND old.historia_clinica_id != new.historia_clinica_id;
+        UPDATE {TABLA}
+        SET biomicroscopia = new.biomicroscopia, fondo_ojo = new.fondo_ojo,
+            observaciones_examen = coalesce(new.observaciones, '')
+        WHERE rowid = new.historia_clinica_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER gestion_clinica_examen_fts_ad AFTER DELETE ON gestion_clinica_examenoftalmologico BEGIN
+        UPDATE {TABLA} SET biomicroscopia = '', fondo_ojo = '', observaciones_examen = ''
+        WHERE rowid = old.historia_clinica_id;
+    END
+    """,
+    # Carga inicial con las historias existentes
+    f"""
+    INSERT INTO {TABLA} (rowid, motivo_consulta, diagnostico, tratamiento, observaciones,
+                         biomicroscopia, fondo_ojo, observaciones_examen)
+    SELECT h.id, h.motivo_consulta, h.diagnostico, h.tratamiento, h.observaciones,
+           coalesce(e.biomicroscopia, ''), coalesce(e.fondo_ojo, ''), coalesce(e.observaciones, '')
+    FROM gestion_clinica_historiaclinica h
+    LEFT JOIN gestion_clinica_examenoftalmologico e ON e.historia_clinica_id = h.id
+    """,
+]
+
+ELIMINAR = [
+    f'DROP TRIGGER IF EXISTS {trigger}' for trigger in (
+        'gestion_clinica_historia_fts_ai', 'gestion_clinica_historia_fts_au', 'gestion_clinica_historia_fts_ad',
+        'gestion_clinica_examen_fts_ai', 'gestion_clinica_examen_fts_au', 'gestion_clinica_examen_fts_ad',
+    )
+] + [f'DROP TABLE IF EXISTS {TABLA}']
+
+
+def _ejecutar(sentencias):
+    def operacion(apps, schema_editor):
+        # FTS5 es propio de SQLite (el backend del proyecto)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sentencia in sentencias:
+            schema_editor.execute(sentencia)
+    return operacion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0016_tarea'),
+    ]
+
+    operations = [
+        migrations.RunPython(_ejecutar(CREAR), _ejecutar(ELIMINAR)),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:28
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia de la normalización de busqueda.py en el momento de esta migración:
+# la migración no debe cambiar si después cambia el código de la aplicación.
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+LOTE = 2000
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def indexar_palabras_existentes(apps, schema_editor):
+    """Palabras de apellido y nombre de los pacientes ya registrados (por lotes)."""
+    Paciente = apps.get_model('gestion_clinica', 'Paciente')
+    PalabraPaciente = apps.get_model('gestion_clinica', 'PalabraPaciente')
+
+    bloque = []
+    pacientes = Paciente.objects.only('pk', 'apellido', 'nombre').order_by('pk')
+    for paciente in pacientes.iterator(chunk_size=LOTE):
+        apellido = set(normalizar(paciente.apellido).split())
+        bloque.extend(
+            PalabraPaciente(paciente_id=paciente.pk, palabra=palabra, en_apellido=palabra in apellido)
+            for palabra in apellido | set(normalizar(paciente.nombre).split())
+        )
+        if len(bloque) >= LOTE:
+            PalabraPaciente.objects.bulk_create(bloque, batch_size=1000)
+            bloque = []
+    PalabraPaciente.objects.bulk_create(bloque, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_clinica', '0017_busqueda_texto_clinico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PalabraPaciente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('palabra', models.CharField(max_length=100)),
+                ('en_apellido', models.BooleanField()),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='palabras', to='gestion_clinica.paciente')),
+            ],
+            options={
+                'verbose_name': 'Palabra de Paciente',
+                'verbose_name_plural': 'Palabras de Pacientes',
+                'indexes': [models.Index(fields=['palabra', 'paciente'], name='palabra_paciente_idx')],
+            },
+        ),
+        migrations.RunPython(indexar_palabras_existentes, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,14 @@
 # gestion_clinica/models.py
 
+from django.conf import settings
 from django.db import models
 from django.urls import reverse
 from django.utils.crypto import get_random_string
-from datetime import date
 from django.utils import timezone
-# ❌ ELIMINADA: Importación de validadores ya no es necesaria
-# from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.validators import MinValueValidator, MaxValueValidator
+
+# Duración máxima (en minutos) de un turno o de un slot de agenda
+DURACION_MAXIMA_TURNO = 240
 
 # --- Catálogos ---
 
@@ -36,6 +38,32 @@ class ObraSocial(models.Model):
         verbose_name_plural = "Obras Sociales"
         ordering = ['nombre']
 
+
+class HorarioAtencion(models.Model):
+    """Franja de atención semanal de un profesional (ej: lunes 08:00 a 12:00, turnos de 20 min)."""
+    DIA_SEMANA_CHOICES = [
+        (0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'),
+        (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo'),
+    ]
+    profesional = models.ForeignKey(
+        Profesional, on_delete=models.CASCADE, related_name='horarios')
+    dia_semana = models.PositiveSmallIntegerField(choices=DIA_SEMANA_CHOICES)
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    duracion_turno = models.PositiveSmallIntegerField(
+        default=30,
+        validators=[MinValueValidator(5), MaxValueValidator(DURACION_MAXIMA_TURNO)],
+        verbose_name='Duración del Turno (min)'
+    )
+
+    def __str__(self):
+        return f'{self.profesional} - {self.get_dia_semana_display()} {self.hora_inicio:%H:%M}-{self.hora_fin:%H:%M}'
+
+    class Meta:
+        verbose_name = "Horario de Atención"
+        verbose_name_plural = "Horarios de Atención"
+        ordering = ['profesional', 'dia_semana', 'hora_inicio']
+
 # --- Modelos Operativos ---
 
 
@@ -53,7 +81,8 @@ class Paciente(models.Model):
     nombre = models.CharField(max_length=100)
     apellido = models.CharField(max_length=100)
     dni = models.CharField(max_length=20, unique=True)
-    fecha_nacimiento = models.DateField()
+    # Indexado: los filtros por rango de edad se traducen a rangos de fecha (reportes.py)
+    fecha_nacimiento = models.DateField(db_index=True)
     GENERO_CHOICES = [('M', 'Masculino'), ('F', 'Femenino'), ('O', 'Otro')]
     genero = models.CharField(max_length=1, choices=GENERO_CHOICES)
     telefono = models.CharField(max_length=50)
@@ -69,12 +98,17 @@ class Paciente(models.Model):
     antecedentes_oftalmologicos = models.TextField(
         blank=True, verbose_name="Antecedentes Oftalmológicos")
 
+    # Sello de versión de la ficha: lo actualizan las señales (signals.py) al editar
+    # el paciente o al cargar/modificar una HC o un E.O. Forma parte de la clave de
+    # la caché de fragmentos de paciente_detail.html.
+    ficha_actualizada = models.DateTimeField(default=timezone.now, editable=False)
+
     # MÉTODO DE CÁLCULO DE EDAD
     @property
     def edad(self):
         """Calcula la edad actual del paciente a partir de la fecha de nacimiento."""
         if self.fecha_nacimiento:
-            hoy = date.today()
+            hoy = timezone.localdate()
             edad_calculada = hoy.year - self.fecha_nacimiento.year
             if (hoy.month, hoy.day) < (self.fecha_nacimiento.month, self.fecha_nacimiento.day):
                 edad_calculada -= 1
@@ -85,10 +119,14 @@ class Paciente(models.Model):
         return f'{self.num_registro} - {self.apellido}, {self.nombre}'
 
     def get_absolute_url(self):
-        return reverse('pacientes:detalle_paciente', kwargs={'pk': self.pk})
+        return reverse('gestion_clinica:detalle_paciente', kwargs={'pk': self.pk})
 
     class Meta:
         ordering = ['apellido', 'nombre']
+        indexes = [
+            # Orden del listado y clave de la paginación por cursor
+            models.Index(fields=['apellido', 'nombre', 'id'], name='paciente_orden_idx'),
+        ]
 
 
 class HistoriaClinica(models.Model):
@@ -97,7 +135,7 @@ class HistoriaClinica(models.Model):
     profesional = models.ForeignKey(Profesional, on_delete=models.PROTECT)
     # ⭐ Campo renombrado de 'fecha_consulta' a 'fecha' ⭐
     fecha = models.DateTimeField(
-        auto_now_add=True, verbose_name='Fecha de Consulta')
+        auto_now_add=True, db_index=True, verbose_name='Fecha de Consulta')
     motivo_consulta = models.TextField()
     # ⭐ Campo renombrado de 'diagnostico_principal' a 'diagnostico' ⭐
     diagnostico = models.TextField(verbose_name='Diagnóstico Principal')
@@ -108,7 +146,7 @@ class HistoriaClinica(models.Model):
         return f'HC de {self.paciente} - {self.fecha.strftime("%Y-%m-%d")}'
 
     def get_absolute_url(self):
-        return reverse('pacientes:detalle_paciente', kwargs={'pk': self.paciente.pk})
+        return reverse('gestion_clinica:detalle_paciente', kwargs={'pk': self.paciente.pk})
 
     class Meta:
         verbose_name = "Historia Clínica"
@@ -136,6 +174,17 @@ class ExamenOftalmologico(models.Model):
     observaciones = models.TextField(
         blank=True, verbose_name='Observaciones del Examen')
 
+    # Copias numéricas e indexadas de PIO y AV para pesquisas en la base (ver mediciones.py).
+    # Las completa la señal pre_save; quedan en NULL si el texto no se puede interpretar.
+    pio_od_valor = models.DecimalField(
+        max_digits=4, decimal_places=1, null=True, editable=False, db_index=True)
+    pio_oi_valor = models.DecimalField(
+        max_digits=4, decimal_places=1, null=True, editable=False, db_index=True)
+    agudeza_visual_od_valor = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, editable=False, db_index=True)
+    agudeza_visual_oi_valor = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, editable=False, db_index=True)
+
     # ❌ ELIMINADO: Campos de Soft Delete (is_active y fecha_anulacion)
     # is_active = models.BooleanField(default=True, verbose_name='Activo')
     # fecha_anulacion = models.DateTimeField(
@@ -147,7 +196,7 @@ class ExamenOftalmologico(models.Model):
 
     def get_absolute_url(self):
         # Ahora redirigimos al detalle del E.O.
-        return reverse('pacientes:detalle_examen_oftalmologico', kwargs={'hc_pk': self.historia_clinica.pk})
+        return reverse('gestion_clinica:detalle_examen_oftalmologico', kwargs={'hc_pk': self.historia_clinica.pk})
 
     class Meta:
         verbose_name = "Examen Oftalmológico"
@@ -167,8 +216,14 @@ class Turno(models.Model):
         on_delete=models.PROTECT,
         related_name='turnos_asignados'
     )
-    # Fecha y hora del turno
-    fecha_hora = models.DateTimeField(default=timezone.now)
+    # Fecha y hora del turno (indexada: el calendario consulta por rangos)
+    fecha_hora = models.DateTimeField(default=timezone.now, db_index=True)
+    # Duración en minutos (define el intervalo que ocupa en la agenda del profesional)
+    duracion = models.PositiveSmallIntegerField(
+        default=30,
+        validators=[MinValueValidator(5), MaxValueValidator(DURACION_MAXIMA_TURNO)],
+        verbose_name='Duración (min)'
+    )
 
     # Estado del turno
     ESTADO_CHOICES = [
@@ -189,17 +244,192 @@ class Turno(models.Model):
         verbose_name='Observaciones del Turno'
     )
 
+    # Marca de última modificación (usada para el ETag del calendario)
+    actualizado = models.DateTimeField(auto_now=True, editable=False)
+
     class Meta:
         verbose_name = "Turno"
         verbose_name_plural = "Turnos"
         ordering = ['fecha_hora']
+        indexes = [
+            # Clave de la paginación por cursor del listado de turnos
+            models.Index(fields=['fecha_hora', 'id'], name='turno_orden_idx'),
+        ]
 
     def __str__(self):
         return f"Turno {self.estado} - {self.fecha_hora.strftime('%d/%m/%Y %H:%M')} - {self.paciente.apellido}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Fecha con la que se leyó: signals.py detecta las reprogramaciones sin volver a leer el turno
+        instancia._fecha_hora_original = instancia.__dict__.get('fecha_hora')
+        return instancia
+
 
 # =================================================================
 # ❌ ELIMINADO: Todo el bloque de Prescripción de Lentes
 # =================================================================
 # TIPO_LENTE_CHOICES = (...)
 # class PrescripcionLentes(models.Model): (...)
+
+
+# --- Índice de Búsqueda de Pacientes ---
+
+
+class IndicePaciente(models.Model):
+    """
+    Copia normalizada (minúsculas, sin acentos) de los campos de búsqueda del
+    paciente. Se mantiene sincronizada por señales (ver busqueda.py) y permite
+    búsquedas por prefijo usando los índices B-tree en lugar de LIKE '%q%'.
+    """
+    paciente = models.OneToOneField(
+        Paciente, on_delete=models.CASCADE, primary_key=True, related_name='indice_busqueda')
+    apellido = models.CharField(max_length=100, db_index=True)
+    nombre = models.CharField(max_length=100, db_index=True)
+    dni = models.CharField(max_length=20, db_index=True)
+    num_registro = models.CharField(max_length=6, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Índice de Paciente"
+        verbose_name_plural = "Índices de Pacientes"
+
+
+class TrigramaPaciente(models.Model):
+    """Trigramas del apellido y nombre normalizados (búsqueda aproximada)."""
+    paciente = models.ForeignKey(
+        Paciente, on_delete=models.CASCADE, related_name='trigramas')
+    trigrama = models.CharField(max_length=3)
+
+    class Meta:
+        verbose_name = "Trigrama de Paciente"
+        verbose_name_plural = "Trigramas de Pacientes"
+        indexes = [
+            models.Index(fields=['trigrama', 'paciente'], name='trigrama_paciente_idx'),
+        ]
+
+
+class PalabraPaciente(models.Model):
+    """
+    Cada palabra del apellido y del nombre normalizados, para encontrar por prefijo
+    también las que no van primero (ej: 'garcia' en 'perez garcia').
+    """
+    paciente = models.ForeignKey(
+        Paciente, on_delete=models.CASCADE, related_name='palabras')
+    palabra = models.CharField(max_length=100)
+    en_apellido = models.BooleanField()
+
+    class Meta:
+        verbose_name = "Palabra de Paciente"
+        verbose_name_plural = "Palabras de Pacientes"
+        indexes = [
+            models.Index(fields=['palabra', 'paciente'], name='palabra_paciente_idx'),
+        ]
+
+
+# --- Secuencias ---
+
+
+class Secuencia(models.Model):
+    """
+    Contador persistente para numeraciones propias (ej: N° de registro de paciente).
+    Se reserva en bloques atómicos a través de secuencias.py.
+    """
+    nombre = models.CharField(max_length=50, primary_key=True)
+    ultimo_valor = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.nombre}: {self.ultimo_valor}'
+
+    class Meta:
+        verbose_name = "Secuencia"
+        verbose_name_plural = "Secuencias"
+
+
+# --- Contadores del Dashboard ---
+
+
+class Contador(models.Model):
+    """Contador global materializado (ej: total de pacientes). Ver contadores.py."""
+    clave = models.CharField(max_length=50, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.clave}: {self.valor}'
+
+    class Meta:
+        verbose_name = "Contador"
+        verbose_name_plural = "Contadores"
+
+
+class ContadorDiario(models.Model):
+    """Cantidad de registros de una métrica por día (consultas, turnos). Ver contadores.py."""
+    metrica = models.CharField(max_length=30)
+    dia = models.DateField()
+    cantidad = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.metrica} {self.dia}: {self.cantidad}'
+
+    class Meta:
+        verbose_name = "Contador Diario"
+        verbose_name_plural = "Contadores Diarios"
+        constraints = [
+            models.UniqueConstraint(fields=['metrica', 'dia'], name='contador_diario_unico'),
+        ]
+
+
+# --- Cola de Tareas en Segundo Plano ---
+
+
+class Tarea(models.Model):
+    """
+    Trabajo encolado para el worker ('python manage.py procesar_tareas'). Ver tareas.py.
+
+    Se toma por prioridad (mayor primero) y antigüedad, a partir de 'disponible_desde'
+    (que también sirve para la espera entre reintentos).
+    """
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADA', 'Completada'),
+        ('FALLIDA', 'Fallida'),
+        ('CANCELADA', 'Cancelada'),
+    ]
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='PENDIENTE')
+    prioridad = models.SmallIntegerField(default=0)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+
+    # Avance informado por la tarea (0 a 100) y resultado final
+    progreso = models.PositiveSmallIntegerField(default=0)
+    mensaje = models.CharField(max_length=255, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='tareas')
+    worker = models.CharField(max_length=100, blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    finalizada = models.DateTimeField(null=True, blank=True)
+    # Si el worker muere con la tarea en curso, vuelve a la cola al vencer el plazo
+    vence = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Tarea {self.pk} {self.tipo} ({self.estado})'
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-creada']
+        indexes = [
+            # Próxima tarea a tomar: pendientes disponibles por prioridad y antigüedad
+            models.Index(fields=['estado', 'disponible_desde', 'prioridad'], name='tarea_cola_idx'),
+            # Límite de concurrencia por tipo
+            models.Index(fields=['tipo', 'estado'], name='tarea_tipo_estado_idx'),
+        ]
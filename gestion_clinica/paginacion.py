@@ -0,0 +1,256 @@
+# gestion_clinica/paginacion.py
+
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En lugar de OFFSET, cada página se pide con un cursor opaco (firmado) que guarda
+los valores de ordenamiento del último/primer registro mostrado, y se filtra con
+(campo1, campo2, ..., id) > (v1, v2, ..., vid). Así la página N cuesta lo mismo
+que la página 1 y no hace falta contar la tabla.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+SALT_CURSOR = 'gestion_clinica.paginacion'
+
+
+class CursorInvalido(Exception):
+    pass
+
+
+def estimar_total(queryset):
+    """
+    Cantidad aproximada de filas de la tabla, sin recorrerla. Solo se estima
+    para listados sin filtros; devuelve None si no hay una estimación barata.
+    """
+    if queryset.query.where:
+        return None
+
+    modelo = queryset.model
+    conexion = connections[queryset.db]
+    tabla = modelo._meta.db_table
+
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [tabla])
+            fila = cursor.fetchone()
+            if fila and fila[0] >= 0:
+                return fila[0]
+        elif conexion.vendor == 'sqlite':
+            # Estadísticas generadas por ANALYZE (si existen)
+            try:
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [tabla])
+                fila = cursor.fetchone()
+            except Exception:
+                fila = None
+            if fila and fila[0]:
+                return int(fila[0].split()[0])
+
+    # Último recurso: el mayor id (una búsqueda en el índice de la clave primaria)
+    return modelo._default_manager.using(queryset.db).aggregate(maximo=Max('pk'))['maximo'] or 0
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator por número de página que nunca cuenta la tabla entera (lo usa el
+    admin, ver ChangelistRapidoMixin). Sin filtros, el total es estimar_total();
+    con filtros o búsqueda se cuenta como mucho ADMIN_LIMITE_CONTEO filas, así
+    que las páginas siguientes a ese tope no aparecen en los enlaces.
+    """
+
+    @cached_property
+    def count(self):
+        total = estimar_total(self.object_list)
+        if total is not None:
+            return total
+        return self.object_list.order_by()[:settings.ADMIN_LIMITE_CONTEO].count()
+
+
+class ListaPorIds:
+    """
+    Resultados en un orden ya calculado (ej: la relevancia de busqueda.py), para
+    el Paginator de Django: el total es la cantidad de ids y cada página trae
+    solo sus filas con una consulta pk__in, sin un CASE con todos los ids.
+    Con parcial=True los ids son solo los primeros resultados: el total es un
+    mínimo y la plantilla no muestra la cantidad de páginas.
+    """
+
+    def __init__(self, queryset, ids, parcial=False):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.ids = list(ids)
+        self.parcial = parcial
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, indice):
+        if not isinstance(indice, slice):
+            return self[indice:indice + 1 or None][0]
+        ids = self.ids[indice]
+        objetos = self.queryset.in_bulk(ids)
+        # Los que se borraron después de la búsqueda se omiten
+        return [objetos[pk] for pk in ids if pk in objetos]
+
+
+class PaginaKeyset:
+    """Página de resultados con la interfaz mínima que usan las plantillas."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def cursor_siguiente(self):
+        if self._has_next and self.object_list:
+            return self.paginator.codificar(self.object_list[-1], 'sig')
+        return None
+
+    @property
+    def cursor_anterior(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.codificar(self.object_list[0], 'ant')
+        return None
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor. 'ordenamiento' es la tupla de campos ascendentes que
+    define el orden total del listado; debe terminar en un campo único (ej: 'id').
+    """
+
+    def __init__(self, queryset, ordenamiento, per_page, estimar=False):
+        self.queryset = queryset
+        self.ordenamiento = tuple(ordenamiento)
+        self.per_page = per_page
+        self.estimar = estimar
+        self._campos = [queryset.model._meta.get_field(nombre) for nombre in self.ordenamiento]
+
+    # --- Cursores ---
+
+    def codificar(self, obj, direccion):
+        valores = [
+            campo.value_to_string(obj) for campo in self._campos
+        ]
+        return signing.dumps({'v': valores, 'd': direccion}, salt=SALT_CURSOR, compress=True)
+
+    def decodificar(self, cursor):
+        try:
+            datos = signing.loads(cursor, salt=SALT_CURSOR)
+            if len(datos['v']) != len(self._campos) or datos['d'] not in ('sig', 'ant'):
+                raise ValueError
+            valores = [campo.to_python(valor) for campo, valor in zip(self._campos, datos['v'])]
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError) as error:
+            raise CursorInvalido("Cursor de paginación inválido.") from error
+        return valores, datos['d']
+
+    # --- Consultas ---
+
+    def _filtro(self, valores, operador):
+        """
+        (c1, c2, ..., cn) op (v1, v2, ..., vn) expresado como OR de ANDs, precedido
+        de c1 op= v1: con solo el OR la base recorre el índice desde el principio;
+        esa cota redundante le permite empezar en v1 (SEARCH ... USING INDEX (c1>?)).
+        """
+        condiciones = []
+        for i, nombre in enumerate(self.ordenamiento):
+            iguales = {campo: valor for campo, valor in zip(self.ordenamiento[:i], valores[:i])}
+            iguales[f'{nombre}__{operador}'] = valores[i]
+            condiciones.append(Q(**iguales))
+        if len(condiciones) == 1:
+            return condiciones[0]
+        return Q(**{f'{self.ordenamiento[0]}__{operador}e': valores[0]}) & reduce(or_, condiciones)
+
+    def get_page(self, cursor=None):
+        queryset = self.queryset
+        direccion = 'sig'
+        if cursor:
+            valores, direccion = self.decodificar(cursor)
+            operador = 'gt' if direccion == 'sig' else 'lt'
+            queryset = queryset.filter(self._filtro(valores, operador))
+
+        if direccion == 'sig':
+            queryset = queryset.order_by(*self.ordenamiento)
+        else:
+            queryset = queryset.order_by(*[f'-{nombre}' for nombre in self.ordenamiento])
+
+        # Se pide un registro de más para saber si hay otra página en esa dirección
+        filas = list(queryset[:self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+
+        if direccion == 'sig':
+            return PaginaKeyset(filas, self, has_next=hay_mas, has_previous=bool(cursor))
+        filas.reverse()
+        return PaginaKeyset(filas, self, has_next=True, has_previous=hay_mas)
+
+    @property
+    def total_estimado(self):
+        if not self.estimar:
+            return None
+        if not hasattr(self, '_total_estimado'):
+            self._total_estimado = estimar_total(self.queryset)
+        return self._total_estimado
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ListView: activa la paginación por cursor con ?paginacion=cursor.
+    Sin ese parámetro se mantiene la paginación por número de página habitual.
+    """
+    keyset_ordering = ('id',)
+    keyset_estimar_total = True
+
+    def usar_keyset(self):
+        return self.request.GET.get('paginacion') == 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usar_keyset():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(
+            queryset, self.keyset_ordering, page_size, estimar=self.keyset_estimar_total)
+        try:
+            page = paginator.get_page(self.request.GET.get('cursor'))
+        except CursorInvalido:
+            page = paginator.get_page()
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['modo_keyset'] = self.usar_keyset()
+        # Parámetros actuales (filtros/búsqueda) para conservarlos en los enlaces de paginación
+        parametros = self.request.GET.copy()
+        for clave in ('page', 'cursor'):
+            parametros.pop(clave, None)
+        context['parametros_paginacion'] = parametros.urlencode()
+        return context
@@ -0,0 +1,154 @@
+# gestion_clinica/replica.py
+
+"""
+Réplica de solo lectura de la base SQLite para listados, reportes y exportaciones.
+
+- refrescar() copia la base principal con la API de backup online de SQLite a
+  un archivo temporal y lo renombra sobre la réplica (el comando
+  'refrescar_replica' lo hace periódicamente). Con WAL, la copia no bloquea a
+  quienes cargan consultas en la principal, y nadie lee una réplica a medio
+  copiar: las conexiones abiertas siguen sobre el archivo anterior hasta que
+  renovar_conexion() nota el cambio de generación (el inode del archivo) y las
+  reabre.
+- Las vistas de solo lectura envuelven su ejecución en leer_de_replica(); el
+  router (routers.py) envía entonces las lecturas de gestion_clinica a la réplica.
+- Después de una escritura (POST exitoso) el navegador queda "fijado" a la base
+  principal durante REPLICA_FIJAR_PRIMARIO segundos, para que el usuario vea lo
+  que acaba de guardar aunque la réplica todavía no se haya refrescado.
+"""
+
+import contextvars
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+COOKIE_PRIMARIO = 'leer_primario_hasta'
+
+# Cada cuánto se verifica que el archivo de la réplica exista (segundos)
+VERIFICAR_CADA = 5
+
+_leyendo_replica = contextvars.ContextVar('leyendo_replica', default=False)
+_disponible = {'valor': False, 'generacion': None, 'verificado': None}
+
+
+def configurada():
+    return REPLICA in settings.DATABASES
+
+
+def _copiada(nombre):
+    return os.path.isfile(nombre) and os.path.getsize(nombre) > 0
+
+
+def disponible():
+    """¿Existe una réplica ya copiada? (verificación cacheada unos segundos)."""
+    if not configurada():
+        return False
+    ahora = time.monotonic()
+    if _disponible['verificado'] is None or ahora - _disponible['verificado'] > VERIFICAR_CADA:
+        nombre = str(connections[REPLICA].settings_dict['NAME'])
+        _disponible['valor'] = _copiada(nombre)
+        _disponible['generacion'] = os.stat(nombre).st_ino if _disponible['valor'] else None
+        _disponible['verificado'] = ahora
+    return _disponible['valor']
+
+
+def renovar_conexion():
+    """
+    Cierra la conexión a la réplica si quedó sobre un archivo anterior (ver
+    refrescar). Se llama al empezar una vista, no en cada consulta, para no
+    cerrar una conexión con cursores abiertos.
+    """
+    if not disponible():
+        return
+    conexion = connections[REPLICA]
+    generacion = _disponible['generacion']
+    if getattr(conexion, 'generacion_replica', None) != generacion:
+        if conexion.connection is not None and not conexion.in_atomic_block:
+            conexion.close()
+        conexion.generacion_replica = generacion
+
+
+def alias_lectura():
+    """Alias a usar para una lectura que puede tolerar el retraso de la réplica."""
+    return REPLICA if disponible() else DEFAULT_DB_ALIAS
+
+
+def leyendo_replica():
+    return _leyendo_replica.get()
+
+
+@contextmanager
+def leer_de_replica(activar=True):
+    token = _leyendo_replica.set(activar)
+    try:
+        yield
+    finally:
+        _leyendo_replica.reset(token)
+
+
+# -------------------------------------------------------------
+# Lectura de lo propio escrito
+# -------------------------------------------------------------
+
+
+def segundos_fijar_primario():
+    return getattr(settings, 'REPLICA_FIJAR_PRIMARIO', 120)
+
+
+def primario_fijado(request):
+    try:
+        return float(request.COOKIES.get(COOKIE_PRIMARIO, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def fijar_primario(response):
+    """Marca al navegador para leer de la base principal por un tiempo."""
+    segundos = segundos_fijar_primario()
+    response.set_cookie(
+        COOKIE_PRIMARIO, str(int(time.time() + segundos)), max_age=segundos,
+        httponly=True, samesite='Lax')
+
+
+# -------------------------------------------------------------
+# Refresco
+# -------------------------------------------------------------
+
+
+def refrescar(paginas_por_paso=-1):
+    """
+    Copia la base principal sobre la réplica y devuelve los segundos que tardó.
+
+    La copia se escribe siempre en un archivo temporal que se renombra al
+    terminar (os.replace es atómico): quien tiene la réplica abierta termina sus
+    consultas sobre el archivo anterior, sin SQLITE_BUSY ni páginas a medio
+    copiar, y renovar_conexion() reabre la conexión sobre el nuevo. Con
+    paginas_por_paso > 0 la copia avanza de a tramos, liberando la principal
+    entre uno y otro.
+    """
+    origen_nombre = str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+    destino_nombre = str(connections[REPLICA].settings_dict['NAME'])
+    timeout = connections[REPLICA].settings_dict['OPTIONS'].get('timeout', 10)
+
+    inicio = time.monotonic()
+    archivo = f'{destino_nombre}.tmp'
+    if os.path.exists(archivo):
+        os.remove(archivo)  # Resto de un refresco interrumpido
+
+    origen = sqlite3.connect(origen_nombre, timeout=timeout)
+    destino = sqlite3.connect(archivo, timeout=timeout)
+    try:
+        origen.backup(destino, pages=paginas_por_paso)
+    finally:
+        destino.close()
+        origen.close()
+
+    os.replace(archivo, destino_nombre)
+    # Las conexiones de este proceso pasan al archivo nuevo en la próxima lectura
+    _disponible['verificado'] = None
+    return time.monotonic() - inicio
@@ -0,0 +1,180 @@
+# gestion_clinica/reportes.py
+
+"""
+Edad calculada por la base y reportes agregados de la población de pacientes.
+
+Paciente.edad es una propiedad de Python: sirve para mostrar un paciente, pero
+no para filtrar ni agrupar. Este módulo ofrece:
+
+- rango_edad() / filtrar_por_edad(): un rango de edades se traduce a un rango
+  de fechas de nacimiento, que aprovecha el índice de fecha_nacimiento.
+- edad_sql() / anotar_edad(): años cumplidos como expresión SQL (annotate).
+- franja_sql(): la franja de FRANJAS_EDAD como CASE, para agrupar.
+- reporte_poblacion(): totales por franja, género y obra social (y el cruce
+  franja x género) a partir de una única consulta agrupada.
+
+Las fechas se calculan con timezone.localdate(); el 29/02 cumple años el 01/03
+en los años no bisiestos, igual que Paciente.edad.
+"""
+
+from django.db.models import Case, CharField, Count, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+
+from . import catalogos
+from .models import Paciente
+
+# (etiqueta, edad mínima, edad máxima o None)
+FRANJAS_EDAD = (
+    ('0-17', 0, 17),
+    ('18-39', 18, 39),
+    ('40-59', 40, 59),
+    ('60-74', 60, 74),
+    ('75+', 75, None),
+)
+
+# Edad máxima aceptada en los filtros (valores mayores se toman como este)
+EDAD_MAXIMA = 150
+
+SIN_OBRA_SOCIAL = 'Sin obra social'
+SIN_FRANJA = 'Sin dato'  # fecha de nacimiento futura
+
+# -------------------------------------------------------------
+# 1. Edad en la base
+# -------------------------------------------------------------
+
+
+def _anios_antes(dia, anios):
+    """La misma fecha 'anios' años antes (el 29/02 pasa al 28/02)."""
+    try:
+        return dia.replace(year=dia.year - anios)
+    except ValueError:
+        return dia.replace(year=dia.year - anios, day=28)
+
+
+def rango_edad(minimo=None, maximo=None, hoy=None, campo='fecha_nacimiento'):
+    """Q equivalente a minimo <= edad <= maximo, expresada sobre la fecha de nacimiento."""
+    hoy = hoy or timezone.localdate()
+    condicion = Q()
+    if minimo is not None:
+        condicion &= Q(**{f'{campo}__lte': _anios_antes(hoy, minimo)})
+    if maximo is not None:
+        condicion &= Q(**{f'{campo}__gt': _anios_antes(hoy, maximo + 1)})
+    return condicion
+
+
+def filtrar_por_edad(queryset, minimo=None, maximo=None, hoy=None):
+    return queryset.filter(rango_edad(minimo, maximo, hoy))
+
+
+def edad_sql(hoy=None, campo='fecha_nacimiento'):
+    """Años cumplidos a la fecha 'hoy', como expresión para annotate/aggregate."""
+    hoy = hoy or timezone.localdate()
+    cumplio = (
+        Q(**{f'{campo}__month__lt': hoy.month})
+        | Q(**{f'{campo}__month': hoy.month, f'{campo}__day__lte': hoy.day})
+    )
+    return Value(hoy.year) - ExtractYear(campo) - Case(
+        When(cumplio, then=Value(0)), default=Value(1), output_field=IntegerField())
+
+
+def anotar_edad(queryset, hoy=None):
+    """Agrega 'edad_anios' (no 'edad': es el nombre de la propiedad del modelo)."""
+    return queryset.annotate(edad_anios=edad_sql(hoy))
+
+
+def franja_sql(hoy=None):
+    """Etiqueta de FRANJAS_EDAD de cada paciente, como expresión CASE."""
+    hoy = hoy or timezone.localdate()
+    return Case(
+        *[When(rango_edad(minimo, maximo, hoy), then=Value(etiqueta)) for etiqueta, minimo, maximo in FRANJAS_EDAD],
+        default=Value(SIN_FRANJA),
+        output_field=CharField(),
+    )
+
+
+def parsear_rango(parametros, nombre_minimo='edad_min', nombre_maximo='edad_max'):
+    """
+    (mínimo, máximo) a partir de parámetros GET; los valores vacíos o inválidos se
+    ignoran y los mayores a EDAD_MAXIMA se limitan a ella (ej: ?edad_max=3000).
+    """
+    valores = []
+    for nombre in (nombre_minimo, nombre_maximo):
+        valor = parametros.get(nombre, '').strip()
+        valores.append(min(int(valor), EDAD_MAXIMA) if valor.isdigit() else None)
+    return tuple(valores)
+
+
+# -------------------------------------------------------------
+# 2. Reporte de población
+# -------------------------------------------------------------
+
+
+def _fila(etiqueta, cantidad, suma_edades, total):
+    return {
+        'etiqueta': etiqueta,
+        'cantidad': cantidad,
+        'porcentaje': round(100 * cantidad / total, 1) if total else 0,
+        'edad_promedio': round(suma_edades / cantidad, 1) if cantidad else None,
+    }
+
+
+def reporte_poblacion(queryset=None, hoy=None):
+    """
+    Pacientes por franja de edad, género y obra social (queryset opcional con filtros previos).
+
+    Una sola consulta agrupada por (franja, género, obra social); los totales de
+    cada dimensión se suman en Python sobre esas pocas filas. Los nombres de las
+    obras sociales salen de la caché de catálogos.
+    """
+    if queryset is None:
+        queryset = Paciente.objects.all()
+    hoy = hoy or timezone.localdate()
+    filas = list(
+        queryset.annotate(franja=franja_sql(hoy))
+        .values('franja', 'genero', 'obra_social_id')
+        .annotate(cantidad=Count('pk'), suma_edades=Sum(edad_sql(hoy)))
+        .order_by()
+    )
+
+    franjas = {etiqueta: [0, 0] for etiqueta, _, _ in FRANJAS_EDAD}
+    generos = {codigo: [0, 0] for codigo, _ in Paciente.GENERO_CHOICES}
+    obras_sociales = {}
+    cruce = {}
+    for fila in filas:
+        cantidad, suma = fila['cantidad'], fila['suma_edades'] or 0
+        for acumulado in (
+            franjas.setdefault(fila['franja'], [0, 0]),
+            generos.setdefault(fila['genero'], [0, 0]),
+            obras_sociales.setdefault(fila['obra_social_id'], [0, 0]),
+        ):
+            acumulado[0] += cantidad
+            acumulado[1] += suma
+        clave = (fila['franja'], fila['genero'])
+        cruce[clave] = cruce.get(clave, 0) + cantidad
+
+    total = sum(cantidad for cantidad, _ in franjas.values())
+    suma_total = sum(suma for _, suma in franjas.values())
+    nombres_genero = dict(Paciente.GENERO_CHOICES)
+
+    def nombre_obra_social(pk):
+        if pk is None:
+            return SIN_OBRA_SOCIAL
+        obra_social = catalogos.OBRAS_SOCIALES.obtener(pk)
+        return str(obra_social) if obra_social else f'Obra social {pk}'
+
+    por_obra_social = sorted(
+        (_fila(nombre_obra_social(pk), cantidad, suma, total) for pk, (cantidad, suma) in obras_sociales.items()),
+        key=lambda fila: (-fila['cantidad'], fila['etiqueta']),
+    )
+    return {
+        'total': total,
+        'edad_promedio': round(suma_total / total, 1) if total else None,
+        'por_franja': [_fila(etiqueta, *valores, total) for etiqueta, valores in franjas.items()],
+        'por_genero': [
+            _fila(nombres_genero.get(codigo, codigo), *valores, total) for codigo, valores in generos.items()],
+        'por_obra_social': por_obra_social,
+        'generos': [nombres_genero.get(codigo, codigo) for codigo in generos],
+        'franja_genero': [
+            (etiqueta, [cruce.get((etiqueta, codigo), 0) for codigo in generos]) for etiqueta in franjas],
+    }
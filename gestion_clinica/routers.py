@@ -0,0 +1,30 @@
+# gestion_clinica/routers.py
+
+from . import replica
+
+
+class ReplicaRouter:
+    """
+    Envía a la réplica las lecturas de los modelos de gestion_clinica hechas
+    dentro de replica.leer_de_replica() (vistas de solo lectura). Todo lo demás,
+    incluidas las escrituras, sesiones y usuarios, usa la base principal.
+    """
+    app_label = 'gestion_clinica'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == self.app_label and replica.leyendo_replica():
+            return replica.alias_lectura()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y principal contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica es una copia de la principal: nunca se migra directamente
+        if db == replica.REPLICA:
+            return False
+        return None
@@ -0,0 +1,115 @@
+# gestion_clinica/secuencias.py
+
+"""
+Asignador de secuencias respaldado por la tabla Secuencia.
+
+Cada proceso reserva bloques de números con una única sentencia
+UPDATE ... RETURNING (atómica en la base de datos), y los entrega desde memoria
+hasta agotarlos. Así varios puestos pueden registrar pacientes a la vez sin leer
+la tabla de pacientes ni generar números duplicados.
+
+Los números reservados por un proceso que termina se pierden: la numeración es
+única y creciente por proceso, pero puede tener huecos.
+"""
+
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .models import Paciente, Secuencia
+
+SECUENCIA_NUM_REGISTRO = 'num_registro_paciente'
+
+
+def _valor_inicial(nombre):
+    """Punto de partida de una secuencia nueva (el mayor número ya asignado)."""
+    if nombre == SECUENCIA_NUM_REGISTRO:
+        ultimo = Paciente.objects.aggregate(ultimo=Max('num_registro'))['ultimo']
+        if ultimo and ultimo.isdigit():
+            return int(ultimo)
+    return 0
+
+
+def reservar_bloque(nombre, cantidad):
+    """
+    Reserva 'cantidad' números consecutivos en un solo viaje a la base de datos
+    y devuelve el rango reservado.
+    """
+    if cantidad < 1:
+        raise ValueError("La cantidad a reservar debe ser mayor a cero.")
+
+    tabla = connection.ops.quote_name(Secuencia._meta.db_table)
+    sql = (
+        f'UPDATE {tabla} SET ultimo_valor = ultimo_valor + %s '
+        f'WHERE nombre = %s RETURNING ultimo_valor'
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [cantidad, nombre])
+            fila = cursor.fetchone()
+
+        if fila is None:
+            # Primera reserva: se crea la secuencia partiendo del último valor existente
+            secuencia, _ = Secuencia.objects.get_or_create(
+                nombre=nombre, defaults={'ultimo_valor': _valor_inicial(nombre)})
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [cantidad, secuencia.nombre])
+                fila = cursor.fetchone()
+
+    ultimo = fila[0]
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+class AsignadorSecuencia:
+    """Entrega números de una secuencia desde un bloque reservado por el proceso."""
+
+    def __init__(self, nombre, tamano_bloque):
+        self.nombre = nombre
+        self.tamano_bloque = tamano_bloque
+        self._lock = threading.Lock()
+        self._bloque = iter(())
+        self._pid = os.getpid()
+
+    def siguiente(self):
+        # Dentro de una transacción externa no se usa el bloque en memoria:
+        # si esa transacción se revierte, la reserva también se revierte y los
+        # números que quedaran en memoria podrían volver a entregarse.
+        if connection.in_atomic_block:
+            return reservar_bloque(self.nombre, 1)[0]
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (fork): no debe compartir el bloque del proceso padre
+                self._bloque = iter(())
+                self._pid = os.getpid()
+
+            numero = next(self._bloque, None)
+            if numero is None:
+                self._bloque = iter(reservar_bloque(self.nombre, self.tamano_bloque))
+                numero = next(self._bloque)
+            return numero
+
+    def reservar(self, cantidad):
+        """Reserva 'cantidad' números de una vez (altas masivas)."""
+        return reservar_bloque(self.nombre, cantidad)
+
+
+asignador_num_registro = AsignadorSecuencia(
+    SECUENCIA_NUM_REGISTRO, getattr(settings, 'NUM_REGISTRO_BLOQUE', 20))
+
+
+def formatear_num_registro(numero):
+    """Formatea a 6 dígitos con ceros a la izquierda (000001, 000002, ...)."""
+    return str(numero).zfill(6)
+
+
+def siguiente_num_registro():
+    return formatear_num_registro(asignador_num_registro.siguiente())
+
+
+def reservar_num_registros(cantidad):
+    """Devuelve 'cantidad' números de registro ya formateados, en un solo viaje a la BD."""
+    return [formatear_num_registro(numero) for numero in asignador_num_registro.reservar(cantidad)]
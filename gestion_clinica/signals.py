@@ -1,10 +1,12 @@
 # gestion_clinica/signals.py
 
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import Paciente
-# Importamos F para un acceso más robusto a los campos de BD
-from django.db.models import F
+from django.utils import timezone
+from .models import Paciente, HistoriaClinica, ExamenOftalmologico, Turno, Profesional, ObraSocial
+from . import catalogos, contadores, mediciones
+from .busqueda import indexar_paciente
+from .secuencias import siguiente_num_registro
 
 
 @receiver(pre_save, sender=Paciente)
@@ -12,22 +14,134 @@ def set_num_registro_paciente(sender, instance, **kwargs):
     """
     Asigna un número de registro secuencial (000001, 000002, ...)
     solo si el paciente es nuevo (no tiene PK) y no tiene un num_registro asignado.
+
+    El número sale del asignador de secuencias (secuencias.py), que reserva
+    bloques atómicos por proceso: no consulta la tabla de pacientes y no
+    repite números aunque varios puestos registren pacientes a la vez.
     """
     if not instance.pk and not instance.num_registro:
-        # Lógica para determinar el siguiente ID secuencial sin riesgo de error de recarga:
-        try:
-            # En entorno de desarrollo, el acceso a .pk puede fallar.
-            # Se usa .id del último registro.
-            last_paciente = Paciente.objects.all().order_by('id').last()
-
-            if last_paciente:
-                # El nuevo ID se basa en el último ID de la base de datos + 1
-                new_id = last_paciente.pk + 1
-            else:
-                new_id = 1
-        except Exception:
-            # En caso de error (BD bloqueada/no disponible), usamos el ID 1 como fallback.
-            new_id = 1
-
-        # Formatear a 6 dígitos con ceros a la izquierda
-        instance.num_registro = str(new_id).zfill(6)
+        instance.num_registro = siguiente_num_registro()
+
+
+@receiver(post_save, sender=Paciente)
+def indexar_paciente_busqueda(sender, instance, raw=False, **kwargs):
+    """
+    Mantiene el índice de búsqueda sincronizado con cada alta/edición.
+    Las bajas se propagan solas (on_delete=CASCADE en IndicePaciente, PalabraPaciente y TrigramaPaciente).
+    """
+    if raw:
+        # Carga de fixtures: el índice se reconstruye con 'reindexar_pacientes'
+        return
+    indexar_paciente(instance)
+
+
+# -------------------------------------------------------------
+# Contadores materializados del dashboard (ver contadores.py)
+# -------------------------------------------------------------
+
+
+@receiver(post_save, sender=Paciente)
+def contar_alta_paciente(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contadores.incrementar_total(contadores.TOTAL_PACIENTES)
+
+
+@receiver(post_delete, sender=Paciente)
+def contar_baja_paciente(sender, instance, **kwargs):
+    contadores.incrementar_total(contadores.TOTAL_PACIENTES, -1)
+
+
+@receiver(post_save, sender=HistoriaClinica)
+def contar_alta_consulta(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contadores.incrementar_dia(contadores.CONSULTAS, contadores.dia_local(instance.fecha))
+
+
+@receiver(post_delete, sender=HistoriaClinica)
+def contar_baja_consulta(sender, instance, **kwargs):
+    contadores.incrementar_dia(contadores.CONSULTAS, contadores.dia_local(instance.fecha), -1)
+
+
+@receiver(pre_save, sender=Turno)
+def recordar_dia_turno(sender, instance, raw=False, **kwargs):
+    """
+    Guarda el día original del turno para detectar reprogramaciones en post_save.
+    Sale de la fecha con la que se leyó el turno (Turno.from_db); solo se consulta
+    la base si la instancia no vino de ella o se leyó sin fecha_hora.
+    """
+    instance._dia_original = None
+    if instance.pk and not raw:
+        fecha_hora = getattr(instance, '_fecha_hora_original', None)
+        if fecha_hora is None:
+            fecha_hora = Turno.objects.filter(pk=instance.pk).values_list('fecha_hora', flat=True).first()
+        if fecha_hora:
+            instance._dia_original = contadores.dia_local(fecha_hora)
+
+
+@receiver(post_save, sender=Turno)
+def contar_turno(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    dia = contadores.dia_local(instance.fecha_hora)
+    dia_original = getattr(instance, '_dia_original', None)
+    if created or dia_original is None:
+        contadores.incrementar_dia(contadores.TURNOS, dia)
+    elif dia_original != dia:
+        # Turno reprogramado a otro día: se mueve de bucket
+        contadores.incrementar_dia(contadores.TURNOS, dia_original, -1)
+        contadores.incrementar_dia(contadores.TURNOS, dia)
+    # Un nuevo save() de la misma instancia parte de la fecha recién guardada
+    instance._fecha_hora_original = instance.fecha_hora
+
+
+@receiver(post_delete, sender=Turno)
+def contar_baja_turno(sender, instance, **kwargs):
+    contadores.incrementar_dia(contadores.TURNOS, contadores.dia_local(instance.fecha_hora), -1)
+
+
+# -------------------------------------------------------------
+# Caché de catálogos (ver catalogos.py)
+# -------------------------------------------------------------
+
+
+@receiver([post_save, post_delete], sender=Profesional)
+@receiver([post_save, post_delete], sender=ObraSocial)
+def invalidar_catalogo(sender, **kwargs):
+    catalogos.de_modelo(sender).invalidar()
+
+
+# -------------------------------------------------------------
+# Sello de versión de la ficha del paciente (caché de paciente_detail.html)
+# -------------------------------------------------------------
+
+
+@receiver(pre_save, sender=Paciente)
+def sellar_ficha_paciente(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.ficha_actualizada = timezone.now()
+
+
+def tocar_ficha(paciente_ids):
+    """Actualiza el sello con un UPDATE directo (sin pasar por save() ni sus señales)."""
+    Paciente.objects.filter(pk__in=paciente_ids).update(ficha_actualizada=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=HistoriaClinica)
+def sellar_ficha_por_historia(sender, instance, **kwargs):
+    tocar_ficha([instance.paciente_id])
+
+
+@receiver([post_save, post_delete], sender=ExamenOftalmologico)
+def sellar_ficha_por_examen(sender, instance, **kwargs):
+    tocar_ficha(HistoriaClinica.objects.filter(
+        pk=instance.historia_clinica_id).values('paciente_id'))
+
+
+# -------------------------------------------------------------
+# Valores numéricos de PIO y AV (ver mediciones.py)
+# -------------------------------------------------------------
+
+
+@receiver(pre_save, sender=ExamenOftalmologico)
+def calcular_valores_examen(sender, instance, **kwargs):
+    mediciones.completar_valores(instance)
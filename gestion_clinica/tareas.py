@@ -0,0 +1,341 @@
+# gestion_clinica/tareas.py
+
+"""
+Cola de tareas en segundo plano guardada en la propia base (modelo Tarea), sin broker.
+
+- Los tipos de tarea se registran con el decorador @tarea (ver trabajos.py) y
+  reciben un Contexto con los parámetros y un método progreso().
+- encolar() crea la fila; el worker ('python manage.py procesar_tareas') las
+  toma por prioridad y antigüedad con un UPDATE condicional dentro de una
+  transacción (BEGIN IMMEDIATE en SQLite): dos workers nunca toman la misma.
+- limite: máximo de tareas de un tipo en curso a la vez, entre todos los workers.
+- en_proceso: la tarea corre en un ProcessPoolExecutor (uso intensivo de CPU);
+  las demás, en threads.
+- Si la función lanza una excepción, la tarea vuelve a la cola con espera
+  exponencial (espera_base * 2^(intento-1) segundos) hasta max_intentos.
+- Una tarea en curso cuyo plazo (tiempo_maximo) vence sin terminar se considera
+  un intento fallido (worker caído) y vuelve a la cola.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import django
+from django.db import connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Tarea
+
+logger = logging.getLogger('gestion_clinica.tareas')
+
+PENDIENTE, EN_CURSO, COMPLETADA, FALLIDA, CANCELADA = 'PENDIENTE', 'EN_CURSO', 'COMPLETADA', 'FALLIDA', 'CANCELADA'
+TERMINADAS = (COMPLETADA, FALLIDA, CANCELADA)
+
+# Segundos mínimos entre dos escrituras de progreso de una misma tarea
+INTERVALO_PROGRESO = 1.0
+# Cada cuánto el worker busca tareas con el plazo vencido (segundos)
+INTERVALO_RECUPERACION = 60
+
+# -------------------------------------------------------------
+# 1. Registro de tipos de tarea
+# -------------------------------------------------------------
+
+REGISTRO = {}
+
+
+class TipoTarea:
+
+    def __init__(self, nombre, funcion, limite=None, en_proceso=False, max_intentos=3,
+                 espera_base=30, tiempo_maximo=3600):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.limite = limite
+        self.en_proceso = en_proceso
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.tiempo_maximo = tiempo_maximo
+
+    def espera(self, intento):
+        """Segundos hasta el próximo reintento."""
+        return self.espera_base * 2 ** max(intento - 1, 0)
+
+
+def tarea(nombre, **opciones):
+    """Decorador: registra funcion(contexto) como tipo de tarea. Lo que devuelve se guarda como resultado (JSON)."""
+    def registrar(funcion):
+        REGISTRO[nombre] = TipoTarea(nombre, funcion, **opciones)
+        return funcion
+    return registrar
+
+
+def encolar(tipo, parametros=None, prioridad=0, usuario=None, disponible_desde=None):
+    if tipo not in REGISTRO:
+        raise ValueError(f"Tipo de tarea inexistente: {tipo!r}.")
+    return Tarea.objects.create(
+        tipo=tipo,
+        parametros=parametros or {},
+        prioridad=prioridad,
+        usuario=usuario,
+        max_intentos=REGISTRO[tipo].max_intentos,
+        disponible_desde=disponible_desde or timezone.now(),
+    )
+
+
+def cancelar(tarea_id):
+    """Cancela una tarea pendiente o en curso (la tarea en curso se detiene en su próximo progreso())."""
+    return Tarea.objects.filter(pk=tarea_id, estado__in=(PENDIENTE, EN_CURSO)).update(
+        estado=CANCELADA, finalizada=timezone.now(), vence=None)
+
+
+# -------------------------------------------------------------
+# 2. Ejecución de una tarea
+# -------------------------------------------------------------
+
+
+class TareaCancelada(Exception):
+    pass
+
+
+class Contexto:
+    """
+    Lo que recibe la función de la tarea.
+
+    progreso() escribe desde un thread propio (con su propia conexión): la
+    tarea puede estar recorriendo un iterator() y, en SQLite (WAL), una escritura
+    en la misma conexión falla si otro proceso escribió desde que empezó la lectura.
+    """
+
+    def __init__(self, tarea):
+        self.tarea_id = tarea.pk
+        self.parametros = tarea.parametros
+        self.intento = tarea.intentos
+        self.usuario_id = tarea.usuario_id
+        self._ultimo_progreso = 0.0
+        self._escritor = None
+
+    def progreso(self, porcentaje, mensaje=''):
+        """
+        Informa el avance (0 a 100). Se escribe como mucho una vez por INTERVALO_PROGRESO.
+        Lanza TareaCancelada si la tarea se canceló mientras corría.
+        """
+        ahora = time.monotonic()
+        if ahora - self._ultimo_progreso < INTERVALO_PROGRESO and porcentaje < 100:
+            return
+        self._ultimo_progreso = ahora
+        if self._escritor is None:
+            self._escritor = ThreadPoolExecutor(1, thread_name_prefix='progreso')
+        actualizadas = self._escritor.submit(
+            Tarea.objects.filter(pk=self.tarea_id, estado=EN_CURSO).update,
+            progreso=max(0, min(int(porcentaje), 100)), mensaje=mensaje[:255],
+        ).result()
+        if not actualizadas:
+            raise TareaCancelada(self.tarea_id)
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.submit(connections.close_all).result()
+            self._escritor.shutdown()
+
+
+def _registrar_fallo(tarea, detalle):
+    # Un tipo que ya no está registrado usa la espera por defecto
+    tipo = REGISTRO.get(tarea.tipo) or TipoTarea(tarea.tipo, None)
+    en_curso = Tarea.objects.filter(pk=tarea.pk, estado=EN_CURSO)
+    if tarea.intentos < tarea.max_intentos:
+        espera = tipo.espera(tarea.intentos)
+        en_curso.update(
+            estado=PENDIENTE, error=detalle, worker='', vence=None,
+            disponible_desde=timezone.now() + timezone.timedelta(seconds=espera))
+        logger.warning("Tarea %s (%s) falló en el intento %s; se reintenta en %s s.",
+                       tarea.pk, tarea.tipo, tarea.intentos, espera)
+    else:
+        en_curso.update(estado=FALLIDA, error=detalle, finalizada=timezone.now(), vence=None)
+        logger.error("Tarea %s (%s) falló definitivamente tras %s intentos.", tarea.pk, tarea.tipo, tarea.intentos)
+
+
+def ejecutar(tarea_id):
+    """
+    Corre una tarea ya tomada (EN_CURSO) y registra el resultado o el fallo.
+    Se ejecuta en un thread del worker o en un proceso hijo (por eso recibe solo el id).
+    """
+    try:
+        tarea = Tarea.objects.get(pk=tarea_id)
+        if tarea.estado != EN_CURSO:
+            return
+        contexto = Contexto(tarea)
+        try:
+            resultado = REGISTRO[tarea.tipo].funcion(contexto)
+            Tarea.objects.filter(pk=tarea_id, estado=EN_CURSO).update(
+                estado=COMPLETADA, progreso=100, mensaje='', resultado=resultado, error='',
+                finalizada=timezone.now(), vence=None)
+        except TareaCancelada:
+            logger.info("Tarea %s (%s) cancelada.", tarea.pk, tarea.tipo)
+        except Exception:
+            _registrar_fallo(tarea, traceback.format_exc())
+        finally:
+            contexto.cerrar()
+    finally:
+        # Cada thread/proceso abre su propia conexión: se cierra al terminar
+        connections.close_all()
+
+
+def _informar_error(tarea_id, error):
+    """
+    Errores fuera de la función de la tarea (la base, o un proceso hijo que murió).
+    Cuentan como un intento fallido.
+    """
+    logger.error("Error al ejecutar la tarea %s.", tarea_id, exc_info=error)
+    tarea = Tarea.objects.filter(pk=tarea_id, estado=EN_CURSO).first()
+    if tarea is not None:
+        _registrar_fallo(tarea, repr(error))
+
+
+# -------------------------------------------------------------
+# 3. Cola
+# -------------------------------------------------------------
+
+
+def tomar(worker='', excluir=()):
+    """
+    Marca como EN_CURSO la próxima tarea disponible, respetando los límites por tipo.
+    Devuelve (id, TipoTarea) o None si no hay ninguna.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        en_curso = dict(
+            Tarea.objects.filter(estado=EN_CURSO).values_list('tipo').annotate(cantidad=Count('pk')).order_by())
+        llenos = [
+            nombre for nombre, tipo in REGISTRO.items()
+            if tipo.limite is not None and en_curso.get(nombre, 0) >= tipo.limite
+        ]
+        disponibles = set(REGISTRO) - set(llenos) - set(excluir)
+        if not disponibles:
+            return None
+        candidata = (
+            Tarea.objects.filter(estado=PENDIENTE, disponible_desde__lte=ahora, tipo__in=disponibles)
+            .order_by('-prioridad', 'disponible_desde', 'pk')
+            .only('pk', 'tipo').first()
+        )
+        if candidata is None:
+            return None
+        tipo = REGISTRO[candidata.tipo]
+        # UPDATE condicional: si otro worker la tomó primero no se modifica ninguna fila
+        tomada = Tarea.objects.filter(pk=candidata.pk, estado=PENDIENTE).update(
+            estado=EN_CURSO, intentos=F('intentos') + 1, iniciada=ahora, worker=worker[:100],
+            progreso=0, mensaje='', vence=ahora + timezone.timedelta(seconds=tipo.tiempo_maximo))
+    return (candidata.pk, tipo) if tomada else None
+
+
+def recuperar_vencidas():
+    """Tareas en curso con el plazo vencido (worker caído o colgado): cuentan como un intento fallido."""
+    vencidas = list(Tarea.objects.filter(estado=EN_CURSO, vence__lt=timezone.now()))
+    for tarea in vencidas:
+        _registrar_fallo(tarea, f"Plazo vencido (worker {tarea.worker or 'desconocido'}).")
+    return len(vencidas)
+
+
+class Worker:
+    """
+    Toma tareas de la cola mientras tenga lugar en sus pools y las ejecuta.
+    detener() (o SIGTERM en el comando) deja de tomar y espera las que están en curso.
+    """
+
+    def __init__(self, hilos=4, procesos=2, intervalo=1.0):
+        self.nombre = f'{socket.gethostname()}:{os.getpid()}'
+        self.intervalo = intervalo
+        self.max_hilos = hilos
+        self.max_procesos = procesos
+        self.hilos = ThreadPoolExecutor(hilos, thread_name_prefix='tarea')
+        self.procesos = None
+        if procesos:
+            self.procesos = ProcessPoolExecutor(
+                # Los procesos hijos (spawn) cargan Django y, con él, el registro de tareas (apps.ready)
+                procesos, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup)
+        self.en_hilos = set()
+        self.en_procesos = set()
+        self._detenido = threading.Event()
+        self._ultima_recuperacion = 0.0
+        # Los callbacks de los futuros corren en otro thread: solo encolan el error y
+        # el bucle principal lo registra con su propia conexión
+        self._errores = queue.SimpleQueue()
+
+    def detener(self):
+        self._detenido.set()
+
+    def _excluidos(self):
+        """Tipos que no se pueden tomar ahora por falta de lugar en el pool correspondiente."""
+        self.en_hilos = {futuro for futuro in self.en_hilos if not futuro.done()}
+        self.en_procesos = {futuro for futuro in self.en_procesos if not futuro.done()}
+        hilos_llenos = len(self.en_hilos) >= self.max_hilos
+        procesos_llenos = self.procesos is None or len(self.en_procesos) >= self.max_procesos
+        if self.procesos is None:
+            # Sin procesos hijos, las tareas de CPU también corren en threads
+            procesos_llenos = hilos_llenos
+        return [
+            nombre for nombre, tipo in REGISTRO.items()
+            if (procesos_llenos if tipo.en_proceso else hilos_llenos)
+        ]
+
+    def _tomar_disponibles(self):
+        tomadas = 0
+        while not self._detenido.is_set():
+            excluir = self._excluidos()
+            if len(excluir) == len(REGISTRO):
+                break
+            tomada = tomar(self.nombre, excluir)
+            if tomada is None:
+                break
+            tarea_id, tipo = tomada
+            if tipo.en_proceso and self.procesos is not None:
+                futuro = self.procesos.submit(ejecutar, tarea_id)
+                self.en_procesos.add(futuro)
+            else:
+                futuro = self.hilos.submit(ejecutar, tarea_id)
+                self.en_hilos.add(futuro)
+            futuro.add_done_callback(partial(self._al_terminar, tarea_id))
+            tomadas += 1
+        return tomadas
+
+    def _al_terminar(self, tarea_id, futuro):
+        if not futuro.cancelled() and futuro.exception() is not None:
+            self._errores.put((tarea_id, futuro.exception()))
+
+    def _informar_errores(self):
+        while True:
+            try:
+                tarea_id, error = self._errores.get_nowait()
+            except queue.Empty:
+                return
+            _informar_error(tarea_id, error)
+
+    def en_curso(self):
+        return any(not futuro.done() for futuro in self.en_hilos | self.en_procesos)
+
+    def ejecutar(self, hasta_vaciar=False):
+        """Bucle principal. Con hasta_vaciar=True termina cuando no quedan tareas disponibles ni en curso."""
+        try:
+            while not self._detenido.is_set():
+                if time.monotonic() - self._ultima_recuperacion > INTERVALO_RECUPERACION:
+                    self._ultima_recuperacion = time.monotonic()
+                    recuperar_vencidas()
+                self._informar_errores()
+                tomadas = self._tomar_disponibles()
+                if hasta_vaciar and not tomadas and not self.en_curso():
+                    break
+                if not tomadas:
+                    self._detenido.wait(self.intervalo)
+        finally:
+            self.hilos.shutdown(wait=True)
+            if self.procesos is not None:
+                self.procesos.shutdown(wait=True)
+            self._informar_errores()
+            connections.close_all()
@@ -0,0 +1,126 @@
+# gestion_clinica/templatetags/admin_rapido.py
+
+"""
+date_hierarchy del admin para tablas grandes.
+
+    {% load admin_rapido %}
+    {% jerarquia_fechas cl %}
+
+Genera lo mismo que {% date_hierarchy cl %} (plantilla admin/date_hierarchy.html,
+mismos parámetros __year/__month/__day en los enlaces), pero sin sus consultas:
+
+- Años: van de la primera a la última fecha de la tabla. Son dos consultas
+  ORDER BY ... LIMIT 1 sobre el índice del campo, guardadas en la caché
+  'default' por ADMIN_LIMITES_FECHAS_SEGUNDOS.
+- Meses y días: salen del calendario, sin consultar la base (Django haría un
+  SELECT DISTINCT sobre el año o el mes elegido).
+
+Los límites son los de la tabla, no los del listado filtrado: con filtros puede
+aparecer un año, mes o día sin resultados.
+"""
+
+import calendar
+import datetime
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def limites_fechas(modelo, campo):
+    """(primera, última) fecha del campo en la tabla, o None si está vacía."""
+    clave = f'admin:limites_fechas:{modelo._meta.label_lower}:{campo}'
+    limites = cache.get(clave)
+    if limites is None:
+        valores = modelo._default_manager.exclude(**{f'{campo}__isnull': True}).values_list(campo, flat=True)
+        primera = valores.order_by(campo).first()
+        ultima = valores.order_by(f'-{campo}').first()
+        # Se guarda también la tabla vacía (()) para no volver a consultarla
+        limites = (primera, ultima) if primera is not None else ()
+        cache.set(clave, limites, settings.ADMIN_LIMITES_FECHAS_SEGUNDOS)
+    if not limites:
+        return None
+    return tuple(
+        timezone.localtime(valor) if isinstance(valor, datetime.datetime) and timezone.is_aware(valor) else valor
+        for valor in limites
+    )
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def jerarquia_fechas(cl):
+    if not cl.date_hierarchy:
+        return {'show': False}
+    campo = cl.date_hierarchy
+    campo_anio, campo_mes, campo_dia = f'{campo}__year', f'{campo}__month', f'{campo}__day'
+    anio, mes, dia = (cl.params.get(nombre) for nombre in (campo_anio, campo_mes, campo_dia))
+
+    def enlace(filtros):
+        return cl.get_query_string(filtros, [f'{campo}__'])
+
+    limites = limites_fechas(cl.model, campo)
+    if limites and not (anio or mes or dia):
+        # Igual que Django: si todo cae en un mismo año (y mes) se empieza por ese nivel
+        primera, ultima = limites
+        if primera.year == ultima.year:
+            anio = primera.year
+            if primera.month == ultima.month:
+                mes = primera.month
+
+    if anio and mes and dia:
+        fecha = datetime.date(int(anio), int(mes), int(dia))
+        return {
+            'show': True,
+            'back': {
+                'link': enlace({campo_anio: anio, campo_mes: mes}),
+                'title': capfirst(formats.date_format(fecha, 'YEAR_MONTH_FORMAT')),
+            },
+            'choices': [{'title': capfirst(formats.date_format(fecha, 'MONTH_DAY_FORMAT'))}],
+        }
+    if anio and mes:
+        anio, mes = int(anio), int(mes)
+        dias = range(1, calendar.monthrange(anio, mes)[1] + 1)
+        return {
+            'show': True,
+            'back': {'link': enlace({campo_anio: anio}), 'title': str(anio)},
+            'choices': [
+                {
+                    'link': enlace({campo_anio: anio, campo_mes: mes, campo_dia: dia}),
+                    'title': capfirst(formats.date_format(datetime.date(anio, mes, dia), 'MONTH_DAY_FORMAT')),
+                }
+                for dia in dias
+            ],
+        }
+    if anio:
+        anio = int(anio)
+        meses = range(1, 13)
+        if limites:
+            primera, ultima = limites
+            meses = range(primera.month if anio == primera.year else 1,
+                          (ultima.month if anio == ultima.year else 12) + 1)
+        return {
+            'show': True,
+            'back': {'link': enlace({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': enlace({campo_anio: anio, campo_mes: mes}),
+                    'title': capfirst(formats.date_format(datetime.date(anio, mes, 1), 'YEAR_MONTH_FORMAT')),
+                }
+                for mes in meses
+            ],
+        }
+    if not limites:
+        return {'show': True, 'back': None, 'choices': []}
+    primera, ultima = limites
+    return {
+        'show': True,
+        'back': None,
+        'choices': [
+            {'link': enlace({campo_anio: str(anio)}), 'title': str(anio)}
+            for anio in range(primera.year, ultima.year + 1)
+        ],
+    }
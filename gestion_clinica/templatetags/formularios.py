@@ -0,0 +1,115 @@
+# gestion_clinica/templatetags/formularios.py
+
+"""
+Caché del HTML de formularios sin enviar.
+
+    {% load formularios %}
+    {% formulario_en_cache form 'campos' %}
+        {{ form|crispy }}
+    {% endformulario_en_cache %}
+
+Un formulario nuevo sin enviar (GET de una vista de alta) se renderiza siempre
+igual, así que el HTML del bloque se guarda en memoria (por proceso) con una
+clave formada por la clase del formulario, su prefijo, el nombre del bloque,
+los valores iniciales y la versión de los catálogos que usa (catalogos.py).
+Los formularios enviados (con datos o errores) y los de edición de un objeto
+existente se renderizan siempre de forma normal.
+
+El bloque solo debe contener los campos del formulario: nada que dependa del
+request (ej: {% csrf_token %} o el usuario).
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django import template
+from django.conf import settings
+
+register = template.Library()
+
+CAPACIDAD_DEFECTO = 200
+
+
+class RendersFormularios:
+    """Diccionario LRU acotado de HTML ya renderizado."""
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._renders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            html = self._renders.get(clave)
+            if html is not None:
+                self._renders.move_to_end(clave)
+            return html
+
+    def guardar(self, clave, html):
+        with self._lock:
+            self._renders[clave] = html
+            self._renders.move_to_end(clave)
+            while len(self._renders) > self.capacidad:
+                self._renders.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._renders.clear()
+
+
+renders = RendersFormularios(getattr(settings, 'FORMULARIOS_CACHE_CAPACIDAD', CAPACIDAD_DEFECTO))
+
+
+def clave_render(form, nombre):
+    """Clave de caché del bloque, o None si el formulario no se puede cachear."""
+    if form.is_bound:
+        return None
+    instancia = getattr(form, 'instance', None)
+    if instancia is not None and not instancia._state.adding:
+        return None
+
+    versiones = []
+    for campo in form.fields.values():
+        catalogo = getattr(campo, 'catalogo', None)
+        if catalogo is not None:
+            catalogo.por_pk()  # verifica la versión vigente del catálogo
+            versiones.append((catalogo.clave, catalogo.version))
+
+    iniciales = repr(sorted((nombre_campo, repr(valor)) for nombre_campo, valor in form.initial.items()))
+    return (
+        f'{type(form).__module__}.{type(form).__qualname__}',
+        form.prefix,
+        nombre,
+        tuple(versiones),
+        hashlib.md5(iniciales.encode(), usedforsecurity=False).hexdigest(),
+    )
+
+
+class FormularioEnCacheNode(template.Node):
+
+    def __init__(self, nodelist, form, nombre):
+        self.nodelist = nodelist
+        self.form = form
+        self.nombre = nombre
+
+    def render(self, context):
+        clave = clave_render(self.form.resolve(context), self.nombre.resolve(context))
+        if clave is None:
+            return self.nodelist.render(context)
+        html = renders.obtener(clave)
+        if html is None:
+            html = self.nodelist.render(context)
+            renders.guardar(clave, html)
+        return html
+
+
+@register.tag
+def formulario_en_cache(parser, token):
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f"Uso: {{% {bits[0]} form 'nombre' %}} ... {{% end{bits[0]} %}}")
+    nodelist = parser.parse((f'end{bits[0]}',))
+    parser.delete_first_token()
+    return FormularioEnCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -0,0 +1,226 @@
+# gestion_clinica/tendencias.py
+
+"""
+Evolución longitudinal de PIO y agudeza visual (por paciente o por cohorte).
+
+Los exámenes se leen con una sola consulta (columnas numéricas de mediciones.py)
+y se cargan en arreglos de NumPy ordenados por paciente y fecha. Todos los
+cálculos se hacen por grupo (paciente) sin recorrer las filas en Python:
+
+- basal / último: primer y último valor registrado de cada medida.
+- delta_basal: diferencia de cada examen con el valor basal.
+- tasa_anual: cambio respecto del examen anterior, en unidades por año.
+- pendiente_anual: pendiente de la recta de mínimos cuadrados (unidades por año).
+- atipico: residuo de esa recta con z modificado (mediana/MAD) mayor a 3.5;
+  solo con MINIMO_PARA_ATIPICOS valores o más.
+
+de_paciente() guarda el resultado en caché con el sello de versión de la ficha
+(Paciente.ficha_actualizada): una consulta nueva o un examen modificado generan
+otra clave.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ExamenOftalmologico
+
+MEDIDAS = ('pio_od', 'pio_oi', 'agudeza_visual_od', 'agudeza_visual_oi')
+COLUMNAS = tuple(f'{medida}_valor' for medida in MEDIDAS)
+
+DIAS_POR_ANIO = 365.25
+SEGUNDOS_POR_DIA = 86400.0
+UMBRAL_ATIPICO = 3.5  # z modificado (Iglewicz y Hoaglin)
+MINIMO_PARA_ATIPICOS = 4
+DECIMALES = 3
+
+# -------------------------------------------------------------
+# 1. Carga
+# -------------------------------------------------------------
+
+
+def cargar(paciente_ids):
+    """
+    Exámenes de los pacientes indicados (lista de pks o queryset de pks), en una consulta.
+
+    Devuelve (pacientes, historias, fechas, dias, valores): los tres primeros como
+    arreglos por examen, 'dias' como float (días desde epoch) y 'valores' como
+    matriz examen x medida con NaN donde no hay dato.
+    """
+    filas = list(
+        ExamenOftalmologico.objects.filter(historia_clinica__paciente_id__in=paciente_ids)
+        .order_by('historia_clinica__paciente_id', 'historia_clinica__fecha', 'pk')
+        .values_list('historia_clinica__paciente_id', 'historia_clinica_id', 'historia_clinica__fecha', *COLUMNAS)
+    )
+    pacientes = np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas))
+    historias = np.fromiter((fila[1] for fila in filas), dtype=np.int64, count=len(filas))
+    fechas = [fila[2] for fila in filas]
+    dias = np.fromiter((fecha.timestamp() for fecha in fechas), dtype=float, count=len(filas)) / SEGUNDOS_POR_DIA
+    # None -> NaN, Decimal -> float
+    valores = np.array([fila[3:] for fila in filas], dtype=float).reshape(len(filas), len(COLUMNAS))
+    return pacientes, historias, fechas, dias, valores
+
+
+# -------------------------------------------------------------
+# 2. Cálculos por grupo (vectorizados)
+# -------------------------------------------------------------
+
+
+def _suma(grupos, pesos, cantidad):
+    return np.bincount(grupos, weights=pesos, minlength=cantidad)
+
+
+def _dividir(numerador, denominador):
+    resultado = np.full(numerador.shape, np.nan)
+    np.divide(numerador, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def _mediana(grupos, valores, cantidad):
+    """Mediana por grupo (NaN en los grupos vacíos)."""
+    orden = np.lexsort((valores, grupos))
+    ordenados = valores[orden]
+    cuenta = np.bincount(grupos, minlength=cantidad)
+    inicio = np.cumsum(cuenta) - cuenta
+    hay = cuenta > 0
+    bajo = inicio[hay] + (cuenta[hay] - 1) // 2
+    alto = inicio[hay] + cuenta[hay] // 2
+    mediana = np.full(cantidad, np.nan)
+    mediana[hay] = (ordenados[bajo] + ordenados[alto]) / 2
+    return mediana
+
+
+def _extremos(grupos, valores, cantidad):
+    """Primer y último valor de cada grupo (las filas vienen ordenadas por grupo y fecha)."""
+    primero = np.full(cantidad, np.nan)
+    ultimo = np.full(cantidad, np.nan)
+    _, indices = np.unique(grupos, return_index=True)
+    primero[grupos[indices]] = valores[indices]
+    _, indices = np.unique(grupos[::-1], return_index=True)
+    indices = len(grupos) - 1 - indices
+    ultimo[grupos[indices]] = valores[indices]
+    return primero, ultimo
+
+
+def analizar_medida(grupos, dias, valores, cantidad):
+    """
+    Indicadores de una medida para 'cantidad' grupos.
+
+    grupos: índice de grupo de cada examen (0..cantidad-1), ordenado por grupo y fecha.
+    Devuelve un dict con arreglos por grupo (cantidad, basal, ultimo, pendiente_anual)
+    y por examen (delta_basal, tasa_anual, atipico).
+    """
+    validos = ~np.isnan(valores)
+    g, t, y = grupos[validos], dias[validos], valores[validos]
+
+    n = np.bincount(g, minlength=cantidad)
+    basal, ultimo = _extremos(g, y, cantidad)
+
+    # Recta de mínimos cuadrados por grupo, con el tiempo centrado en la media del grupo
+    media_t = _dividir(_suma(g, t, cantidad), n)
+    media_y = _dividir(_suma(g, y, cantidad), n)
+    tc = t - media_t[g]
+    pendiente = _dividir(_suma(g, tc * (y - media_y[g]), cantidad), _suma(g, tc * tc, cantidad))
+
+    # Cambio respecto del examen anterior del mismo grupo
+    tasa_validos = np.full(len(y), np.nan)
+    if len(y) > 1:
+        mismo = g[1:] == g[:-1]
+        dt = np.diff(t)
+        tasa_validos[1:] = np.where(mismo, _dividir(np.diff(y), dt), np.nan) * DIAS_POR_ANIO
+
+    # Residuos atípicos (z modificado sobre los residuos de la recta)
+    residuo = y - (media_y[g] + np.nan_to_num(pendiente[g]) * tc)
+    mediana = _mediana(g, residuo, cantidad)
+    desvio = np.abs(residuo - mediana[g])
+    mad = _mediana(g, desvio, cantidad)
+    z = _dividir(0.6745 * desvio, mad[g])
+    atipico_validos = (np.nan_to_num(z) > UMBRAL_ATIPICO) & (n[g] >= MINIMO_PARA_ATIPICOS)
+
+    # De vuelta a una fila por examen (NaN / False donde no hay dato)
+    tasa_anual = np.full(len(valores), np.nan)
+    tasa_anual[validos] = tasa_validos
+    atipico = np.zeros(len(valores), dtype=bool)
+    atipico[validos] = atipico_validos
+
+    return {
+        'cantidad': n,
+        'basal': basal,
+        'ultimo': ultimo,
+        'pendiente_anual': pendiente * DIAS_POR_ANIO,
+        'delta_basal': valores - basal[grupos],
+        'tasa_anual': tasa_anual,
+        'atipico': atipico,
+    }
+
+
+# -------------------------------------------------------------
+# 3. Resultados (JSON)
+# -------------------------------------------------------------
+
+
+def _lista(arreglo):
+    """Arreglo -> lista para JSON, con NaN -> None."""
+    redondeado = np.round(arreglo, DECIMALES)
+    return [None if np.isnan(valor) else valor for valor in redondeado.tolist()]
+
+
+def _numero(valor):
+    return None if np.isnan(valor) else round(float(valor), DECIMALES)
+
+
+def analizar(paciente_ids):
+    """Tendencias de una cohorte: {paciente_id: resultado} (los pacientes sin exámenes no aparecen)."""
+    pacientes, historias, fechas, dias, valores = cargar(paciente_ids)
+    ids, grupos = np.unique(pacientes, return_inverse=True)
+    cantidad = len(ids)
+    por_medida = {
+        medida: analizar_medida(grupos, dias, valores[:, columna], cantidad)
+        for columna, medida in enumerate(MEDIDAS)
+    }
+
+    # Cada paciente ocupa un tramo contiguo de filas
+    fin = np.cumsum(np.bincount(grupos, minlength=cantidad))
+    inicio = fin - np.bincount(grupos, minlength=cantidad)
+    resultados = {}
+    for indice, paciente_id in enumerate(ids.tolist()):
+        tramo = slice(inicio[indice], fin[indice])
+        medidas = {}
+        for columna, medida in enumerate(MEDIDAS):
+            datos = por_medida[medida]
+            medidas[medida] = {
+                'cantidad': int(datos['cantidad'][indice]),
+                'basal': _numero(datos['basal'][indice]),
+                'ultimo': _numero(datos['ultimo'][indice]),
+                'pendiente_anual': _numero(datos['pendiente_anual'][indice]),
+                'valores': _lista(valores[tramo, columna]),
+                'delta_basal': _lista(datos['delta_basal'][tramo]),
+                'tasa_anual': _lista(datos['tasa_anual'][tramo]),
+                'atipico': datos['atipico'][tramo].tolist(),
+            }
+        resultados[paciente_id] = {
+            'paciente': paciente_id,
+            'fechas': [fecha.isoformat() for fecha in fechas[tramo]],
+            'historias': historias[tramo].tolist(),
+            'medidas': medidas,
+        }
+    return resultados
+
+
+def vacio(paciente_id):
+    """Resultado de un paciente sin exámenes."""
+    return {'paciente': paciente_id, 'fechas': [], 'historias': [], 'medidas': {}}
+
+
+def version(paciente):
+    return f'{paciente.pk}-{paciente.ficha_actualizada.timestamp()}'
+
+
+def de_paciente(paciente):
+    """Tendencias de un paciente, en caché mientras no cambie su ficha."""
+    clave = f'tendencias:{version(paciente)}'
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = analizar([paciente.pk]).get(paciente.pk) or vacio(paciente.pk)
+        cache.set(clave, resultado, settings.FICHA_PACIENTE_CACHE_SEGUNDOS)
+    return resultado
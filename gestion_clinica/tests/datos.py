@@ -0,0 +1,33 @@
+# gestion_clinica/tests/datos.py
+
+"""Altas mínimas de los modelos que usan las pruebas."""
+
+from datetime import date
+from itertools import count
+
+from gestion_clinica.models import HistoriaClinica, Paciente, Profesional
+
+_dni = count(10000000)
+_matricula = count(1)
+
+
+def crear_paciente(apellido='Pérez', nombre='Juan', **campos):
+    datos = {
+        'dni': str(next(_dni)),
+        'fecha_nacimiento': date(1960, 5, 10),
+        'genero': 'M',
+        'telefono': '1234',
+        'domicilio': 'Calle 1',
+    }
+    datos.update(campos)
+    return Paciente.objects.create(apellido=apellido, nombre=nombre, **datos)
+
+
+def crear_profesional(apellido='Gómez', nombre='Ana'):
+    return Profesional.objects.create(apellido=apellido, nombre=nombre, matricula=f'MP{next(_matricula)}')
+
+
+def crear_historia(paciente, profesional, **campos):
+    datos = {'motivo_consulta': 'Control', 'diagnostico': 'Sin hallazgos', 'tratamiento': 'Ninguno'}
+    datos.update(campos)
+    return HistoriaClinica.objects.create(paciente=paciente, profesional=profesional, **datos)
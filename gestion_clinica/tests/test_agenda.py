@@ -0,0 +1,128 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion_clinica import agenda
+from gestion_clinica.models import HorarioAtencion, Turno
+
+from .datos import crear_paciente, crear_profesional
+
+
+def _proximo_lunes(hora):
+    hoy = timezone.localdate()
+    lunes = hoy + timedelta(days=7 - hoy.weekday())
+    return timezone.make_aware(datetime.combine(lunes, hora))
+
+
+class IndiceIntervalosTests(TestCase):
+
+    def test_solapamientos(self):
+        indice = agenda.IndiceIntervalos([(10, 20), (30, 40), (12, 15)])
+        self.assertFalse(indice.esta_libre(14, 16))
+        self.assertFalse(indice.esta_libre(19, 31))
+        self.assertTrue(indice.esta_libre(20, 30))   # los extremos no se superponen
+        self.assertTrue(indice.esta_libre(0, 10))
+        self.assertTrue(indice.esta_libre(40, 50))
+        self.assertTrue(agenda.IndiceIntervalos([]).esta_libre(0, 1))
+
+
+class ReservarTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profesional = crear_profesional()
+        cls.paciente = crear_paciente()
+        cls.inicio = _proximo_lunes(time(9))
+        cls.ocupado = Turno.objects.create(
+            paciente=cls.paciente, profesional=cls.profesional, fecha_hora=cls.inicio, duracion=60)
+
+    def _turno(self, minutos, duracion=30, **campos):
+        return Turno(paciente=self.paciente, profesional=self.profesional,
+                     fecha_hora=self.inicio + timedelta(minutes=minutos), duracion=duracion, **campos)
+
+    def test_rechaza_superposiciones(self):
+        for minutos, duracion in ((0, 30), (30, 30), (-15, 30), (45, 60), (-60, 180)):
+            with self.subTest(minutos=minutos, duracion=duracion):
+                with self.assertRaises(ValidationError) as contexto:
+                    agenda.reservar(self._turno(minutos, duracion))
+                self.assertEqual(contexto.exception.code, 'superpuesto')
+        self.assertEqual(Turno.objects.count(), 1)
+
+    def test_acepta_turnos_contiguos(self):
+        agenda.reservar(self._turno(-30))
+        agenda.reservar(self._turno(60))
+        self.assertEqual(Turno.objects.count(), 3)
+
+    def test_otro_profesional_o_turno_cancelado_no_ocupan_lugar(self):
+        otro = self._turno(0)
+        otro.profesional = crear_profesional(apellido='Otro')
+        agenda.reservar(otro)
+
+        self.ocupado.estado = 'CANCELADO'
+        agenda.reservar(self.ocupado)
+        agenda.reservar(self._turno(15))
+        # Reactivar el cancelado ahora se superpone con el nuevo
+        self.ocupado.estado = 'PENDIENTE'
+        with self.assertRaises(ValidationError):
+            agenda.reservar(self.ocupado)
+
+    def test_reprogramar_excluye_al_propio_turno(self):
+        self.ocupado.fecha_hora += timedelta(minutes=30)
+        agenda.reservar(self.ocupado)
+        self.assertFalse(agenda.esta_libre(self.profesional.pk, self.inicio + timedelta(minutes=60), 30))
+        self.assertTrue(agenda.esta_libre(self.profesional.pk, self.inicio, 30))
+
+    def test_fuera_del_horario_de_atencion(self):
+        HorarioAtencion.objects.create(
+            profesional=self.profesional, dia_semana=0, hora_inicio=time(8), hora_fin=time(12), duracion_turno=30)
+        with self.assertRaises(ValidationError) as contexto:
+            agenda.reservar(self._turno(180))   # 12:00 a 12:30
+        self.assertEqual(contexto.exception.code, 'fuera_de_horario')
+        agenda.reservar(self._turno(150))       # 11:30 a 12:00
+
+    def test_proximos_libres_saltea_los_ocupados(self):
+        HorarioAtencion.objects.create(
+            profesional=self.profesional, dia_semana=0, hora_inicio=time(8), hora_fin=time(12), duracion_turno=30)
+        libres = agenda.proximos_libres(self.profesional.pk, desde=self.inicio - timedelta(hours=1), cantidad=4)
+        self.assertEqual(
+            [timezone.localtime(inicio).time() for inicio, _ in libres],
+            [time(8), time(8, 30), time(10), time(10, 30)])
+
+
+class DisponibilidadViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcion', password='x')
+        cls.profesional = crear_profesional()
+        cls.paciente = crear_paciente()
+        cls.inicio = _proximo_lunes(time(9))
+        Turno.objects.create(paciente=cls.paciente, profesional=cls.profesional, fecha_hora=cls.inicio)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_consulta_de_un_horario(self):
+        url = reverse('gestion_clinica:disponibilidad_turnos_api')
+        ocupado = self.client.get(url, {'profesional': self.profesional.pk, 'inicio': self.inicio.isoformat()})
+        libre = self.client.get(url, {'profesional': self.profesional.pk,
+                                      'inicio': (self.inicio + timedelta(minutes=30)).isoformat()})
+        self.assertFalse(ocupado.json()['libre'])
+        self.assertTrue(libre.json()['libre'])
+
+    def test_alta_superpuesta_muestra_el_error(self):
+        datos = {
+            'paciente': self.paciente.pk,
+            'profesional': self.profesional.pk,
+            'fecha_hora': timezone.localtime(self.inicio + timedelta(minutes=15)).strftime('%Y-%m-%dT%H:%M'),
+            'duracion': 30,
+            'estado': 'PENDIENTE',
+        }
+        respuesta = self.client.post(reverse('gestion_clinica:crear_turno'), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.context['form'].errors)
+        self.assertEqual(Turno.objects.count(), 1)
@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from gestion_clinica.busqueda import buscar_pacientes, normalizar, trigramas
+from gestion_clinica.models import IndicePaciente, PalabraPaciente, TrigramaPaciente
+
+from .datos import crear_paciente
+
+
+class NormalizacionTests(TestCase):
+
+    def test_normalizar_quita_acentos_mayusculas_y_signos(self):
+        self.assertEqual(normalizar('Pérez-NÚÑEZ'), 'perez nunez')
+        self.assertEqual(normalizar(None), '')
+
+    def test_trigramas_por_palabra_con_relleno(self):
+        self.assertEqual(trigramas('Ana'), {'  a', ' an', 'ana', 'na '})
+
+
+class BuscarPacientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.juan = crear_paciente('Pérez', 'Juan', dni='20123456')
+        cls.maria = crear_paciente('Núñez García', 'María José', dni='30111222')
+        cls.pedro = crear_paciente('Perales', 'Pedro', dni='12345678')
+        cls.ana = crear_paciente('García', 'Ana', dni='40999888')
+        cls.perez_nombre = crear_paciente('Sosa', 'Perez', dni='50222333')
+
+    def test_dni_exacto_primero(self):
+        self.assertEqual(buscar_pacientes('20123456'), [self.juan.pk])
+
+    def test_prefijo_de_dni_y_num_registro(self):
+        self.assertEqual(buscar_pacientes('3011'), [self.maria.pk])
+        self.assertIn(self.pedro.pk, buscar_pacientes(self.pedro.num_registro))
+
+    def test_insensible_a_acentos_y_mayusculas(self):
+        self.assertEqual(buscar_pacientes('PÉREZ')[0], self.juan.pk)
+        self.assertEqual(buscar_pacientes('nunez'), [self.maria.pk])
+
+    def test_orden_por_relevancia(self):
+        # Apellido exacto > palabra del nombre > parecidos (trigramas)
+        self.assertEqual(buscar_pacientes('perez'), [self.juan.pk, self.perez_nombre.pk, self.pedro.pk])
+        # Prefijo de apellido (empates por pk) > prefijo del nombre
+        self.assertEqual(buscar_pacientes('per'), [self.juan.pk, self.pedro.pk, self.perez_nombre.pk])
+
+    def test_palabra_que_no_va_primero_en_el_apellido(self):
+        # 'García' exacto antes que la segunda palabra de 'Núñez García'
+        self.assertEqual(buscar_pacientes('garcia'), [self.ana.pk, self.maria.pk])
+        self.assertEqual(buscar_pacientes('jose'), [self.maria.pk])
+
+    @mock.patch('gestion_clinica.busqueda.MINIMO_SIN_TRIGRAMAS', 0)
+    def test_varias_palabras_deben_coincidir_todas(self):
+        # Sin la búsqueda aproximada, que sumaría a los parecidos
+        self.assertEqual(buscar_pacientes('perez juan'), [self.juan.pk])
+        self.assertEqual(buscar_pacientes('garcia maria'), [self.maria.pk])
+        self.assertEqual(buscar_pacientes('perez pedro'), [])
+
+    def test_errores_de_tipeo_por_trigramas(self):
+        self.assertIn(self.pedro.pk, buscar_pacientes('peralez'))
+
+    def test_limite(self):
+        self.assertEqual(len(buscar_pacientes('p', limite=2)), 2)
+        self.assertEqual(buscar_pacientes('   '), [])
+
+    def test_el_indice_sigue_a_los_cambios_del_paciente(self):
+        self.juan.apellido = 'Gómez'
+        self.juan.save()
+        self.assertEqual(buscar_pacientes('gomez'), [self.juan.pk])
+        self.assertNotIn(self.juan.pk, buscar_pacientes('perez'))
+
+        pk = self.juan.pk
+        self.juan.delete()
+        self.assertFalse(IndicePaciente.objects.filter(paciente_id=pk).exists())
+        self.assertFalse(PalabraPaciente.objects.filter(paciente_id=pk).exists())
+        self.assertFalse(TrigramaPaciente.objects.filter(paciente_id=pk).exists())
+
+
+class ListaPacientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcion', password='x')
+        for numero in range(25):
+            crear_paciente('Pérez García', f'Nombre{numero:02d}')
+        crear_paciente('Sosa', 'Luis')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_busqueda_paginada(self):
+        url = reverse('gestion_clinica:lista_pacientes')
+        respuesta = self.client.get(url, {'q': 'garcia'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context['pacientes']), respuesta.context['paginator'].per_page)
+
+        vistos = []
+        pagina = 1
+        while True:
+            respuesta = self.client.get(url, {'q': 'garcia', 'page': pagina})
+            vistos += [paciente.pk for paciente in respuesta.context['pacientes']]
+            if not respuesta.context['page_obj'].has_next():
+                break
+            pagina += 1
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(len(set(vistos)), 25)
+
+    def test_pagina_fuera_de_rango(self):
+        respuesta = self.client.get(reverse('gestion_clinica:lista_pacientes'), {'q': 'sosa', 'page': 5})
+        self.assertEqual(respuesta.status_code, 404)
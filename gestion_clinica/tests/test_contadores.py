@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gestion_clinica import contadores
+from gestion_clinica.models import ContadorDiario, HistoriaClinica, Turno
+
+from .datos import crear_historia, crear_paciente, crear_profesional
+
+
+def _local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class ContadoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profesional = crear_profesional()
+        cls.pacientes = [crear_paciente(apellido=f'Apellido{numero}') for numero in range(3)]
+        # Consultas en tres días distintos, una cerca de la medianoche
+        for fecha in (_local(2025, 3, 10, 9), _local(2025, 3, 10, 23, 50), _local(2025, 3, 12, 0, 5)):
+            with mock.patch('django.utils.timezone.now', return_value=fecha):
+                crear_historia(cls.pacientes[0], cls.profesional)
+        cls.turnos = [
+            Turno.objects.create(paciente=cls.pacientes[numero % 3], profesional=cls.profesional,
+                                 fecha_hora=_local(2025, 3, 10 + numero % 4, 8 + numero))
+            for numero in range(8)
+        ]
+
+    def _estado(self):
+        """Contadores actuales, sin los días que quedaron en cero."""
+        return (
+            contadores.total(contadores.TOTAL_PACIENTES),
+            set(ContadorDiario.objects.exclude(cantidad=0).values_list('metrica', 'dia', 'cantidad')),
+        )
+
+    def test_incremental_igual_a_reconstruir(self):
+        # Reprogramación (a otro día y dentro del mismo día), baja de turno, de consulta y de paciente
+        turno = Turno.objects.get(pk=self.turnos[0].pk)
+        turno.fecha_hora += timedelta(days=5)
+        turno.save()
+        turno.fecha_hora += timedelta(hours=1)
+        turno.save()
+        self.turnos[1].delete()
+        HistoriaClinica.objects.order_by('fecha').first().delete()
+        crear_paciente().delete()
+        self.pacientes[2].delete()
+
+        incremental = self._estado()
+        contadores.reconstruir()
+        self.assertEqual(self._estado(), incremental)
+        self.assertEqual(incremental[0], 2)
+
+    def test_reprogramar_no_consulta_el_turno(self):
+        turno = Turno.objects.get(pk=self.turnos[0].pk)
+        turno.fecha_hora += timedelta(days=1)
+        # UPDATE del turno, -1 en el día anterior y +1 en el nuevo
+        with self.assertNumQueries(3):
+            turno.save()
+
+    def test_suma_dias(self):
+        self.assertEqual(contadores.suma_dias(contadores.CONSULTAS, _local(2025, 3, 10).date(),
+                                              _local(2025, 3, 11).date()), 2)
+        self.assertEqual(contadores.suma_dias(contadores.TURNOS, _local(2025, 3, 1).date(),
+                                              _local(2025, 3, 31).date()), 8)
+
+    def test_contar_entre_igual_al_conteo_directo(self):
+        ventanas = [
+            (_local(2025, 3, 10, 23), _local(2025, 3, 12, 0, 10)),   # puntas parciales y un día completo
+            (_local(2025, 3, 10), _local(2025, 3, 13)),              # solo días completos
+            (_local(2025, 3, 10, 9, 30), _local(2025, 3, 10, 23)),   # dentro de un mismo día
+            (_local(2025, 3, 11, 10), _local(2025, 3, 13, 12)),
+        ]
+        for desde, hasta in ventanas:
+            with self.subTest(desde=desde, hasta=hasta):
+                self.assertEqual(
+                    contadores.contar_entre(contadores.CONSULTAS, desde, hasta),
+                    HistoriaClinica.objects.filter(fecha__gte=desde, fecha__lt=hasta).count())
+                self.assertEqual(
+                    contadores.contar_entre(contadores.TURNOS, desde, hasta),
+                    Turno.objects.filter(fecha_hora__gte=desde, fecha_hora__lt=hasta).count())
@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gestion_clinica import catalogos, documentos
+from gestion_clinica.models import ExamenOftalmologico, Tarea
+
+from .datos import crear_historia, crear_paciente, crear_profesional
+
+
+class DocumentosTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directorio = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(DOCUMENTOS_PDF_DIR=cls.directorio))
+        cls.addClassCleanup(shutil.rmtree, cls.directorio, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('medico', password='x')
+        cls.profesional = crear_profesional()
+        cls.paciente = crear_paciente()
+        cls.historia = crear_historia(cls.paciente, cls.profesional, diagnostico='Glaucoma')
+        ExamenOftalmologico.objects.create(historia_clinica=cls.historia, pio_od='21', agudeza_visual_od='0.8')
+
+    def setUp(self):
+        # Las cachés de proceso no se revierten con la transacción de cada prueba
+        cache.clear()
+        catalogos.PROFESIONALES.olvidar()
+        catalogos.OBRAS_SOCIALES.olvidar()
+        self.paciente.refresh_from_db()
+
+    def _clave_ficha(self):
+        return documentos.clave(documentos.datos_ficha(self.paciente))
+
+    def test_datos_de_la_consulta(self):
+        datos = documentos.datos_consulta(self.historia.pk)
+        self.assertEqual(datos['documento'], 'consulta')
+        self.assertEqual(datos['paciente']['num_registro'], self.paciente.num_registro)
+        self.assertEqual(datos['historias'][0]['diagnostico'], 'Glaucoma')
+        self.assertEqual(datos['historias'][0]['examen']['pio_od'], '21')
+
+    def test_misma_consulta_misma_clave(self):
+        clave = documentos.clave(documentos.datos_consulta(self.historia.pk))
+        self.assertEqual(documentos.clave(documentos.datos_consulta(self.historia.pk)), clave)
+        otra = crear_historia(self.paciente, self.profesional)
+        self.assertNotEqual(documentos.clave(documentos.datos_consulta(otra.pk)), clave)
+
+    def test_la_clave_cambia_con_lo_que_se_imprime(self):
+        claves = {self._clave_ficha()}
+
+        crear_historia(self.paciente, self.profesional)
+        claves.add(self._clave_ficha())
+
+        self.paciente.domicilio = 'No se imprime'
+        self.paciente.save()
+        self.assertIn(self._clave_ficha(), claves)
+
+        self.paciente.apellido = 'Otro'
+        self.paciente.save()
+        claves.add(self._clave_ficha())
+
+        self.profesional.apellido = 'Renombrado'
+        self.profesional.save()
+        claves.add(self._clave_ficha())
+
+        with mock.patch.object(documentos, 'VERSION_DISENO', documentos.VERSION_DISENO + 1):
+            claves.add(self._clave_ficha())
+        self.assertEqual(len(claves), 5)
+
+    def test_clave_ficha_en_cache(self):
+        self.assertEqual(documentos.clave_ficha(self.paciente), (self._clave_ficha(), 1))
+        with self.assertNumQueries(0):
+            documentos.clave_ficha(self.paciente)
+
+        crear_historia(self.paciente, self.profesional)
+        self.paciente.refresh_from_db()
+        self.assertEqual(documentos.clave_ficha(self.paciente), (self._clave_ficha(), 2))
+
+    def test_obtener_genera_el_pdf_una_sola_vez(self):
+        datos = documentos.datos_consulta(self.historia.pk)
+        ruta = documentos.obtener(datos)
+        self.assertEqual(ruta, documentos.ruta(documentos.clave(datos)))
+        contenido = ruta.read_bytes()
+        self.assertTrue(contenido.startswith(b'%PDF'))
+
+        with mock.patch.object(documentos, 'renderizar') as renderizar:
+            self.assertEqual(documentos.obtener(datos), ruta)
+        renderizar.assert_not_called()
+
+        # Los mismos datos dan los mismos bytes
+        ruta.unlink()
+        self.assertEqual(documentos.obtener(datos).read_bytes(), contenido)
+
+    def test_vista_con_etag(self):
+        self.client.force_login(self.usuario)
+        url = reverse('gestion_clinica:pdf_consulta', args=[self.historia.pk])
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(respuesta.streaming_content).startswith(b'%PDF'))
+
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_ficha_grande_se_genera_en_segundo_plano(self):
+        self.client.force_login(self.usuario)
+        url = reverse('gestion_clinica:pdf_ficha', args=[self.paciente.pk])
+        with mock.patch.object(documentos, 'CONSULTAS_SINCRONICAS', 0):
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 202)
+            # Mientras tanto, no se encola otra tarea para la misma ficha
+            self.assertEqual(self.client.get(url).json()['tarea'], respuesta.json()['tarea'])
+        self.assertEqual(Tarea.objects.filter(tipo='generar_ficha_pdf').count(), 1)
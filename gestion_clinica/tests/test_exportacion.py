@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+
+from django.test import TestCase
+
+from gestion_clinica import exportacion
+
+from .datos import crear_historia, crear_paciente, crear_profesional
+
+
+class ExportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        paciente = crear_paciente('=HYPERLINK("http://x")', '-Juan')
+        crear_historia(paciente, crear_profesional(), diagnostico='+1 dioptría', observaciones='@nota')
+
+    def test_csv_escapa_formulas(self):
+        generador = exportacion.generar_csv(exportacion.historias_para_exportar())
+        filas = list(csv.DictReader(io.StringIO(''.join(generador))))
+        self.assertEqual(len(filas), 1)
+        fila = filas[0]
+        self.assertEqual(fila['paciente_apellido'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(fila['paciente_nombre'], "'-Juan")
+        self.assertEqual(fila['diagnostico'], "'+1 dioptría")
+        self.assertEqual(fila['observaciones'], "'@nota")
+        self.assertEqual(fila['motivo_consulta'], 'Control')
+
+    def test_ambos_formatos_emiten_antes_de_la_consulta(self):
+        for generar in (exportacion.generar_csv, exportacion.generar_ndjson):
+            with self.subTest(formato=generar.__name__):
+                generador = generar(exportacion.historias_para_exportar())
+                with self.assertNumQueries(0):
+                    self.assertTrue(next(generador))
+                generador.close()
+
+    def test_ndjson(self):
+        lineas = ''.join(exportacion.generar_ndjson(exportacion.historias_para_exportar())).splitlines()
+        registros = [json.loads(linea) for linea in lineas if linea]
+        self.assertEqual(len(registros), 1)
+        # Sin escape: no lo abre una planilla
+        self.assertEqual(registros[0]['paciente_nombre'], '-Juan')
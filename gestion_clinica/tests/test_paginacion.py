@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion_clinica.models import Paciente, Turno
+from gestion_clinica.paginacion import SALT_CURSOR, CursorInvalido, KeysetPaginator, ListaPorIds
+
+from .datos import crear_paciente, crear_profesional
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Apellidos y nombres repetidos: el orden total lo define el id
+        for numero in range(23):
+            crear_paciente(apellido=f'Apellido{numero % 3}', nombre=f'Nombre{numero % 2}')
+        cls.orden = list(Paciente.objects.order_by('apellido', 'nombre', 'id').values_list('pk', flat=True))
+
+    def _paginador(self):
+        return KeysetPaginator(Paciente.objects.all(), ('apellido', 'nombre', 'id'), per_page=5)
+
+    def test_recorre_todo_en_orden_sin_repetir(self):
+        paginador = self._paginador()
+        pagina = paginador.get_page()
+        self.assertFalse(pagina.has_previous())
+        vistos = []
+        while True:
+            vistos += [paciente.pk for paciente in pagina]
+            if not pagina.has_next():
+                break
+            pagina = paginador.get_page(pagina.cursor_siguiente)
+        self.assertEqual(vistos, self.orden)
+        self.assertEqual(len(pagina), 3)
+        self.assertIsNone(pagina.cursor_siguiente)
+
+    def test_cursor_anterior(self):
+        paginador = self._paginador()
+        segunda = paginador.get_page(paginador.get_page().cursor_siguiente)
+        tercera = paginador.get_page(segunda.cursor_siguiente)
+
+        anterior = paginador.get_page(tercera.cursor_anterior)
+        self.assertEqual([paciente.pk for paciente in anterior], self.orden[5:10])
+        self.assertTrue(anterior.has_next())
+
+        primera = paginador.get_page(anterior.cursor_anterior)
+        self.assertEqual([paciente.pk for paciente in primera], self.orden[:5])
+        self.assertFalse(primera.has_previous())
+
+    def test_cursor_invalido(self):
+        paginador = self._paginador()
+        for cursor in ('basura', signing.dumps({'v': ['x'], 'd': 'sig'}, salt=SALT_CURSOR),
+                       signing.dumps({'v': ['a', 'b', '1'], 'd': 'sig'}, salt='otra')):
+            with self.subTest(cursor=cursor), self.assertRaises(CursorInvalido):
+                paginador.get_page(cursor)
+
+    def test_una_consulta_por_pagina(self):
+        paginador = self._paginador()
+        cursor = paginador.get_page().cursor_siguiente
+        with self.assertNumQueries(1):
+            paginador.get_page(cursor)
+
+
+class ListaPorIdsTests(TestCase):
+
+    def test_respeta_el_orden_y_omite_borrados(self):
+        pacientes = [crear_paciente(apellido=f'A{numero}') for numero in range(4)]
+        ids = [pacientes[2].pk, pacientes[0].pk, pacientes[3].pk, pacientes[1].pk]
+        pacientes[3].delete()
+        lista = ListaPorIds(Paciente.objects.all(), ids)
+        self.assertEqual(len(lista), 4)
+        with self.assertNumQueries(1):
+            self.assertEqual([paciente.pk for paciente in lista[:3]], [pacientes[2].pk, pacientes[0].pk])
+
+
+class ListadoTurnosKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcion', password='x')
+        paciente = crear_paciente()
+        profesional = crear_profesional()
+        inicio = timezone.now().replace(microsecond=0)
+        # Dos turnos por hora: fecha_hora repetida entre turnos distintos
+        Turno.objects.bulk_create([
+            Turno(paciente=paciente, profesional=profesional, fecha_hora=inicio + timedelta(hours=numero // 2))
+            for numero in range(45)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_paginacion_por_cursor(self):
+        url = reverse('gestion_clinica:lista_turnos')
+        vistos = []
+        parametros = {'paginacion': 'cursor'}
+        while True:
+            respuesta = self.client.get(url, parametros)
+            vistos += [turno.pk for turno in respuesta.context['turnos']]
+            cursor = respuesta.context['page_obj'].cursor_siguiente
+            if not cursor:
+                break
+            parametros['cursor'] = cursor
+        self.assertEqual(vistos, list(Turno.objects.order_by('fecha_hora', 'id').values_list('pk', flat=True)))
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        url = reverse('gestion_clinica:lista_turnos')
+        respuesta = self.client.get(url, {'paginacion': 'cursor', 'cursor': 'basura'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.context['page_obj'].has_previous())
@@ -0,0 +1,84 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.views import View
+
+from gestion_clinica import replica
+from gestion_clinica.models import Paciente
+from gestion_clinica.views import LecturaReplicaMixin
+
+from .datos import crear_paciente
+
+
+@mock.patch('gestion_clinica.replica.disponible', return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def test_lecturas_dentro_de_leer_de_replica(self, disponible):
+        self.assertEqual(router.db_for_read(Paciente), DEFAULT_DB_ALIAS)
+        with replica.leer_de_replica():
+            self.assertEqual(router.db_for_read(Paciente), replica.REPLICA)
+            # Usuarios y sesiones siempre de la principal
+            self.assertEqual(router.db_for_read(User), DEFAULT_DB_ALIAS)
+            # Escrituras a la principal
+            self.assertEqual(router.db_for_write(Paciente), DEFAULT_DB_ALIAS)
+            with replica.leer_de_replica(False):
+                self.assertEqual(router.db_for_read(Paciente), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Paciente), DEFAULT_DB_ALIAS)
+
+    def test_sin_replica_copiada_lee_de_la_principal(self, disponible):
+        disponible.return_value = False
+        with replica.leer_de_replica():
+            self.assertEqual(router.db_for_read(Paciente), DEFAULT_DB_ALIAS)
+
+    def test_la_replica_no_se_migra(self, disponible):
+        self.assertFalse(router.allow_migrate(replica.REPLICA, 'gestion_clinica'))
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'gestion_clinica'))
+
+
+class VistaDeLectura(LecturaReplicaMixin, View):
+
+    def get(self, request):
+        return HttpResponse(router.db_for_read(Paciente))
+
+
+@mock.patch('gestion_clinica.replica.disponible', return_value=True)
+class FijarPrimarioTests(SimpleTestCase):
+
+    def test_vista_de_lectura_usa_la_replica(self, disponible):
+        respuesta = VistaDeLectura.as_view()(RequestFactory().get('/'))
+        self.assertEqual(respuesta.content.decode(), replica.REPLICA)
+
+    def test_navegador_fijado_lee_de_la_principal(self, disponible):
+        request = RequestFactory().get('/')
+        request.COOKIES[replica.COOKIE_PRIMARIO] = str(int(time.time() + 60))
+        respuesta = VistaDeLectura.as_view()(request)
+        self.assertEqual(respuesta.content.decode(), DEFAULT_DB_ALIAS)
+
+    def test_cookie_vencida_o_invalida(self, disponible):
+        for valor in (str(int(time.time() - 1)), 'basura'):
+            request = RequestFactory().get('/')
+            request.COOKIES[replica.COOKIE_PRIMARIO] = valor
+            self.assertFalse(replica.primario_fijado(request))
+
+
+class FijarPrimarioMiddlewareTests(TestCase):
+
+    def test_una_escritura_exitosa_fija_el_navegador(self):
+        self.client.force_login(User.objects.create_user('recepcion', password='x'))
+        paciente = crear_paciente()
+        respuesta = self.client.get(reverse('gestion_clinica:lista_pacientes'))
+        self.assertNotIn(replica.COOKIE_PRIMARIO, respuesta.cookies)
+
+        respuesta = self.client.post(reverse('gestion_clinica:editar_paciente', args=[paciente.pk]), {
+            'nombre': 'Juan', 'apellido': 'Pérez', 'dni': paciente.dni, 'fecha_nacimiento': '1960-05-10',
+            'genero': 'M', 'telefono': '1234', 'domicilio': 'Calle 2',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        cookie = respuesta.cookies[replica.COOKIE_PRIMARIO]
+        self.assertEqual(cookie['max-age'], replica.segundos_fijar_primario())
+        self.assertTrue(cookie['httponly'])
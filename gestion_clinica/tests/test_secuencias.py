@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from gestion_clinica.models import Paciente, Secuencia
+from gestion_clinica.secuencias import (
+    SECUENCIA_NUM_REGISTRO, AsignadorSecuencia, reservar_bloque, reservar_num_registros,
+)
+
+from .datos import crear_paciente
+
+
+class ReservarBloqueTests(TestCase):
+
+    def test_bloques_consecutivos_sin_superposicion(self):
+        self.assertEqual(reservar_bloque('prueba', 5), range(1, 6))
+        self.assertEqual(reservar_bloque('prueba', 3), range(6, 9))
+        self.assertEqual(Secuencia.objects.get(nombre='prueba').ultimo_valor, 8)
+
+    def test_cantidad_invalida(self):
+        with self.assertRaises(ValueError):
+            reservar_bloque('prueba', 0)
+
+    def test_secuencia_nueva_parte_del_mayor_num_registro(self):
+        # La migración crea la fila; sin ella se crea en la primera reserva
+        Secuencia.objects.filter(nombre=SECUENCIA_NUM_REGISTRO).delete()
+        Paciente.objects.bulk_create([
+            Paciente(num_registro='000041', apellido='A', nombre='B', dni='1', fecha_nacimiento='1970-01-01',
+                     genero='F', telefono='1', domicilio='d'),
+        ])
+        self.assertEqual(reservar_num_registros(3), ['000042', '000043', '000044'])
+
+    def test_alta_de_pacientes(self):
+        registros = [crear_paciente().num_registro for _ in range(3)]
+        self.assertEqual(registros, ['000001', '000002', '000003'])
+        self.assertEqual(Secuencia.objects.get(nombre=SECUENCIA_NUM_REGISTRO).ultimo_valor, 3)
+
+
+class AsignadorSecuenciaTests(TransactionTestCase):
+
+    def test_entrega_desde_memoria_y_reserva_por_bloque(self):
+        asignador = AsignadorSecuencia('prueba', tamano_bloque=5)
+        numeros = [asignador.siguiente() for _ in range(7)]
+        self.assertEqual(numeros, list(range(1, 8)))
+        # Dos reservas de 5: los 3 números que quedan en memoria ya no se entregan a otros
+        self.assertEqual(Secuencia.objects.get(nombre='prueba').ultimo_valor, 10)
+        self.assertEqual(AsignadorSecuencia('prueba', tamano_bloque=5).siguiente(), 11)
+
+    def test_dentro_de_una_transaccion_no_usa_el_bloque(self):
+        asignador = AsignadorSecuencia('prueba', tamano_bloque=5)
+        with transaction.atomic():
+            self.assertEqual([asignador.siguiente(), asignador.siguiente()], [1, 2])
+        self.assertEqual(Secuencia.objects.get(nombre='prueba').ultimo_valor, 2)
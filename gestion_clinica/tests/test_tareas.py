@@ -0,0 +1,154 @@
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from gestion_clinica import tareas
+from gestion_clinica.models import Tarea
+
+
+def _correcta(contexto):
+    return {'parametros': contexto.parametros, 'intento': contexto.intento}
+
+
+def _con_error(contexto):
+    raise RuntimeError('falla de prueba')
+
+
+def _con_progreso(contexto):
+    contexto.progreso(50, 'mitad')
+    return 'ok'
+
+
+REGISTRO_PRUEBA = {
+    'correcta': tareas.TipoTarea('correcta', _correcta),
+    'con_error': tareas.TipoTarea('con_error', _con_error, max_intentos=2, espera_base=10),
+    'limitada': tareas.TipoTarea('limitada', _correcta, limite=1),
+    'con_progreso': tareas.TipoTarea('con_progreso', _con_progreso),
+}
+
+
+@mock.patch.dict(tareas.REGISTRO, REGISTRO_PRUEBA, clear=True)
+class ColaTests(TestCase):
+
+    def _tomar(self):
+        tomada = tareas.tomar('prueba')
+        return tomada and Tarea.objects.get(pk=tomada[0])
+
+    def test_encolar_tipo_inexistente(self):
+        with self.assertRaises(ValueError):
+            tareas.encolar('inexistente')
+
+    def test_toma_por_prioridad_y_antiguedad(self):
+        primera = tareas.encolar('correcta')
+        urgente = tareas.encolar('correcta', prioridad=5)
+        segunda = tareas.encolar('correcta')
+        tareas.encolar('correcta', disponible_desde=timezone.now() + timedelta(hours=1))
+
+        tomadas = [self._tomar() for _ in range(4)]
+        self.assertEqual([tarea.pk for tarea in tomadas[:3]], [urgente.pk, primera.pk, segunda.pk])
+        self.assertIsNone(tomadas[3])
+        self.assertEqual(tomadas[0].estado, tareas.EN_CURSO)
+        self.assertEqual(tomadas[0].intentos, 1)
+        self.assertEqual(tomadas[0].worker, 'prueba')
+        self.assertIsNotNone(tomadas[0].vence)
+
+    def test_limite_por_tipo_y_exclusiones(self):
+        tareas.encolar('limitada')
+        tareas.encolar('limitada')
+        tareas.encolar('correcta')
+        self.assertEqual(self._tomar().tipo, 'limitada')
+        # La segunda 'limitada' espera a que termine la primera
+        self.assertEqual(self._tomar().tipo, 'correcta')
+        self.assertIsNone(self._tomar())
+        self.assertIsNone(tareas.tomar('prueba', excluir=['limitada']))
+
+    def test_ejecucion_correcta(self):
+        tarea = tareas.encolar('correcta', {'a': 1})
+        self._tomar()
+        tareas.ejecutar(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, tareas.COMPLETADA)
+        self.assertEqual(tarea.progreso, 100)
+        self.assertEqual(tarea.resultado, {'parametros': {'a': 1}, 'intento': 1})
+        self.assertIsNotNone(tarea.finalizada)
+
+    def test_reintento_con_espera_exponencial_y_fallo_definitivo(self):
+        tarea = tareas.encolar('con_error')
+        antes = timezone.now()
+        self._tomar()
+        with self.assertLogs('gestion_clinica.tareas', 'WARNING'):
+            tareas.ejecutar(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, tareas.PENDIENTE)
+        self.assertIn('falla de prueba', tarea.error)
+        self.assertGreaterEqual(tarea.disponible_desde, antes + timedelta(seconds=10))
+        # Todavía no está disponible
+        self.assertIsNone(self._tomar())
+
+        Tarea.objects.filter(pk=tarea.pk).update(disponible_desde=timezone.now())
+        self.assertEqual(self._tomar().intentos, 2)
+        with self.assertLogs('gestion_clinica.tareas', 'ERROR'):
+            tareas.ejecutar(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, tareas.FALLIDA)
+        self.assertIsNotNone(tarea.finalizada)
+
+    def test_espera_exponencial(self):
+        tipo = REGISTRO_PRUEBA['con_error']
+        self.assertEqual([tipo.espera(intento) for intento in (1, 2, 3)], [10, 20, 40])
+
+    def test_tareas_vencidas_vuelven_a_la_cola(self):
+        tarea = tareas.encolar('correcta')
+        self._tomar()
+        Tarea.objects.filter(pk=tarea.pk).update(vence=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('gestion_clinica.tareas', 'WARNING'):
+            self.assertEqual(tareas.recuperar_vencidas(), 1)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, tareas.PENDIENTE)
+        self.assertIn('Plazo vencido', tarea.error)
+
+    def test_cancelada_no_se_toma(self):
+        self.assertEqual(tareas.cancelar(tareas.encolar('correcta').pk), 1)
+        self.assertIsNone(self._tomar())
+
+    def test_errores_fuera_de_la_tarea_se_registran_en_el_bucle_principal(self):
+        tarea = tareas.encolar('correcta')
+        self._tomar()
+        worker = tareas.Worker(hilos=1, procesos=0)
+        try:
+            futuro = Future()
+            futuro.set_exception(RuntimeError('proceso hijo terminado'))
+            worker._al_terminar(tarea.pk, futuro)
+            # El callback solo encola el error
+            self.assertEqual(Tarea.objects.get(pk=tarea.pk).estado, tareas.EN_CURSO)
+            with self.assertLogs('gestion_clinica.tareas', 'ERROR'):
+                worker._informar_errores()
+        finally:
+            worker.hilos.shutdown()
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, tareas.PENDIENTE)
+        self.assertIn('proceso hijo terminado', tarea.error)
+
+
+@mock.patch.dict(tareas.REGISTRO, REGISTRO_PRUEBA, clear=True)
+class ProgresoTests(TransactionTestCase):
+    # progreso() escribe desde otro thread: necesita ver la tarea ya confirmada
+
+    def test_progreso(self):
+        tarea = tareas.encolar('con_progreso')
+        tareas.tomar('prueba')
+        tareas.ejecutar(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.resultado), (tareas.COMPLETADA, 'ok'))
+
+    def test_cancelar_detiene_la_tarea_en_su_progreso(self):
+        tarea = tareas.encolar('con_progreso')
+        tareas.tomar('prueba')
+        tareas.cancelar(tarea.pk)
+        tareas.ejecutar(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, tareas.CANCELADA)
+        self.assertIsNone(tarea.resultado)
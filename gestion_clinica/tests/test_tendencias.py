@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from gestion_clinica import tendencias
+from gestion_clinica.models import ExamenOftalmologico
+
+from .datos import crear_historia, crear_paciente, crear_profesional
+
+ANIO = tendencias.DIAS_POR_ANIO
+
+
+class AnalizarMedidaTests(SimpleTestCase):
+
+    def _analizar(self, grupos, dias, valores):
+        grupos = np.array(grupos)
+        return tendencias.analizar_medida(
+            grupos, np.array(dias, dtype=float), np.array(valores, dtype=float), grupos.max() + 1)
+
+    def test_recta_exacta(self):
+        # Grupo 0: sube 2 por año; grupo 1: baja 1 por año
+        resultado = self._analizar(
+            [0, 0, 0, 1, 1],
+            [0, ANIO / 2, ANIO, 100, 100 + ANIO],
+            [10, 11, 12, 20, 19])
+        np.testing.assert_allclose(resultado['pendiente_anual'], [2, -1])
+        np.testing.assert_array_equal(resultado['basal'], [10, 20])
+        np.testing.assert_array_equal(resultado['ultimo'], [12, 19])
+        np.testing.assert_array_equal(resultado['cantidad'], [3, 2])
+        np.testing.assert_array_equal(resultado['delta_basal'], [0, 1, 2, 0, -1])
+        # La tasa no se calcula entre exámenes de grupos distintos
+        np.testing.assert_allclose(resultado['tasa_anual'], [np.nan, 2, 2, np.nan, -1])
+        self.assertFalse(resultado['atipico'].any())
+
+    def test_valores_faltantes(self):
+        resultado = self._analizar([0, 0, 0, 0], [0, 10, 20, 30], [15, np.nan, 17, np.nan])
+        self.assertEqual(resultado['cantidad'][0], 2)
+        self.assertEqual(resultado['ultimo'][0], 17)
+        np.testing.assert_allclose(resultado['pendiente_anual'], [0.1 * ANIO])
+        # La tasa se mide contra el último valor registrado, no contra el hueco
+        np.testing.assert_allclose(resultado['tasa_anual'], [np.nan, np.nan, 0.1 * ANIO, np.nan])
+        self.assertTrue(np.isnan(resultado['delta_basal'][1]))
+
+    def test_un_solo_examen(self):
+        resultado = self._analizar([0], [5], [14])
+        self.assertTrue(np.isnan(resultado['pendiente_anual'][0]))
+        self.assertEqual(resultado['basal'][0], resultado['ultimo'][0])
+
+    def test_atipicos(self):
+        dias = list(range(0, 70, 10))
+        valores = [15, 15.2, 14.9, 15.1, 28, 15, 15.1]
+        resultado = self._analizar([0] * len(dias), dias, valores)
+        self.assertEqual(resultado['atipico'].tolist(), [False, False, False, False, True, False, False])
+
+        # Con menos de MINIMO_PARA_ATIPICOS valores no se marca nada
+        resultado = self._analizar([0, 0, 0], [0, 10, 20], [15, 15.1, 40])
+        self.assertFalse(resultado['atipico'].any())
+
+    def test_mediana_por_grupo(self):
+        mediana = tendencias._mediana(np.array([0, 0, 0, 1, 1, 1, 1]), np.array([3., 1, 2, 10, 40, 20, 30]), 3)
+        np.testing.assert_array_equal(mediana[:2], [2, 25])
+        self.assertTrue(np.isnan(mediana[2]))
+
+
+class AnalizarPacientesTests(TestCase):
+
+    def test_resultado_por_paciente(self):
+        profesional = crear_profesional()
+        paciente, otro, sin_examenes = crear_paciente(), crear_paciente(), crear_paciente()
+        inicio = timezone.make_aware(datetime(2023, 1, 1, 10))
+        for numero, (pio, av) in enumerate([('14', '1.0'), ('16', '0.8'), ('18', '')]):
+            with mock.patch('django.utils.timezone.now', return_value=inicio + timedelta(days=365 * numero)):
+                historia = crear_historia(paciente, profesional)
+            ExamenOftalmologico.objects.create(historia_clinica=historia, pio_od=pio, agudeza_visual_od=av)
+        ExamenOftalmologico.objects.create(historia_clinica=crear_historia(otro, profesional), pio_oi='20')
+
+        resultados = tendencias.analizar([paciente.pk, otro.pk, sin_examenes.pk])
+        self.assertEqual(set(resultados), {paciente.pk, otro.pk})
+
+        pio = resultados[paciente.pk]['medidas']['pio_od']
+        self.assertEqual(pio['valores'], [14, 16, 18])
+        self.assertEqual((pio['basal'], pio['ultimo'], pio['cantidad']), (14, 18, 3))
+        self.assertAlmostEqual(pio['pendiente_anual'], 2 * ANIO / 365, places=2)
+        self.assertEqual(resultados[paciente.pk]['medidas']['agudeza_visual_od']['valores'], [1.0, 0.8, None])
+        self.assertEqual(resultados[otro.pk]['medidas']['pio_oi']['valores'], [20])
+
+        self.assertEqual(tendencias.de_paciente(sin_examenes), tendencias.vacio(sin_examenes.pk))
@@ -0,0 +1,80 @@
+# gestion_clinica/trabajos.py
+
+"""
+Tipos de tarea que ejecuta el worker (ver tareas.py). Se importa en
+GestionClinicaConfig.ready(), así el registro existe tanto en el servidor web
+(para encolar) como en el worker y sus procesos hijos.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import contadores, documentos, exportacion, replica
+from .models import Paciente
+from .tareas import tarea
+
+
+@tarea('reconstruir_contadores', limite=1)
+def reconstruir_contadores(contexto):
+    return {'dias': contadores.reconstruir()}
+
+
+@tarea('reindexar_pacientes', limite=1, en_proceso=True, tiempo_maximo=4 * 3600)
+def reindexar_pacientes(contexto):
+    call_command('reindexar_pacientes', lote=contexto.parametros.get('lote', 2000))
+
+
+@tarea('refrescar_replica', limite=1, max_intentos=5, espera_base=10)
+def refrescar_replica(contexto):
+    if not replica.configurada():
+        return None
+    return {'segundos': round(replica.refrescar(), 2)}
+
+
+def directorio_archivos():
+    """Directorio de los archivos generados por tareas (se crea si no existe)."""
+    directorio = Path(settings.TAREAS_ARCHIVOS_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+@tarea('exportar_historias', limite=2, en_proceso=True)
+def exportar_historias(contexto):
+    """
+    Exportación de historias clínicas a un archivo (mismos filtros que ExportarHistoriasView).
+    Parámetros: formato, desde, hasta (AAAA-MM-DD) y profesional.
+    """
+    parametros = contexto.parametros
+    formato = parametros.get('formato', 'csv')
+    desde = parse_date(parametros['desde']) if parametros.get('desde') else None
+    hasta = parse_date(parametros['hasta']) if parametros.get('hasta') else None
+    queryset = exportacion.historias_para_exportar(desde, hasta, parametros.get('profesional'))
+    generador, content_type, extension = exportacion.FORMATOS[formato]
+
+    total = queryset.count()
+    nombre = f"historias_{timezone.localdate():%Y%m%d}_{contexto.tarea_id}.{extension}"
+    filas = 0
+    with open(directorio_archivos() / nombre, 'w', encoding='utf-8', newline='') as salida:
+        for linea in generador(queryset):
+            salida.write(linea)
+            filas += 1
+            if filas % 1000 == 0:
+                contexto.progreso(100 * filas / (total + 1), f"{filas} de {total} historias")
+    return {'archivo': nombre, 'content_type': content_type, 'historias': total}
+
+
+@tarea('generar_ficha_pdf', limite=2, en_proceso=True, max_intentos=2)
+def generar_ficha_pdf(contexto):
+    """PDF de la ficha completa de un paciente con muchas consultas (ver documentos.py)."""
+    paciente = Paciente.objects.get(pk=contexto.parametros['paciente'])
+    datos = documentos.datos_ficha(paciente)
+    documentos.obtener(datos, contexto.progreso)
+    return {
+        'documento': documentos.clave(datos),
+        'url': reverse('gestion_clinica:pdf_ficha', kwargs={'pk': paciente.pk}),
+    }
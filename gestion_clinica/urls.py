@@ -12,17 +12,28 @@ urlpatterns = [
 
     # --- Rutas de Pacientes (CRUD de Datos Filiatorios) ---
     path('lista/', views.PacienteListView.as_view(), name='lista_pacientes'),
+    path('api/buscar/', views.BuscarPacientesJsonView.as_view(), name='buscar_pacientes_api'),
+    path('api/autocompletar/<str:catalogo>/', views.AutocompletarCatalogoView.as_view(),
+         name='autocompletar_catalogo'),
     path('nuevo/', views.PacienteCreateView.as_view(), name='crear_paciente'),
     path('<int:pk>/', views.PacienteDetailView.as_view(),
          name='detalle_paciente'),
     path('<int:pk>/editar/',
          views.PacienteUpdateView.as_view(), name='editar_paciente'),
+    path('<int:pk>/historias/',
+         views.PacienteHistoriasFragmentoView.as_view(), name='historias_paciente_fragmento'),
+    path('<int:pk>/tendencias/',
+         views.PacienteTendenciasJsonView.as_view(), name='tendencias_paciente_api'),
+    path('<int:pk>/pdf/', views.FichaPdfView.as_view(), name='pdf_ficha'),
 
     # --- Rutas de HC y Examen ---
     path('<int:paciente_pk>/hc/nuevo/',
          views.ExamenOftalmologicoFirstCreateView.as_view(), name='crear_historia_clinica'),
     path('hc/<int:hc_pk>/examen/ver/',
          views.ExamenOftalmologicoDetailView.as_view(), name='detalle_examen_oftalmologico'),
+    path('hc/<int:hc_pk>/pdf/', views.ConsultaPdfView.as_view(), name='pdf_consulta'),
+    path('hc/exportar/', views.ExportarHistoriasView.as_view(), name='exportar_historias'),
+    path('hc/buscar/', views.BusquedaClinicaView.as_view(), name='busqueda_clinica'),
 
     # ⭐ RUTAS DE CATÁLOGO (CRUD COMPLETO) ⭐
 
@@ -53,6 +64,18 @@ urlpatterns = [
     path('turnos/<int:pk>/detalle/',
          views.TurnoDetailView.as_view(), name='detalle_turno'),
     path('turnos/api/json/', views.TurnosJsonView.as_view(), name='turnos_json_api'),
+    path('turnos/api/disponibilidad/', views.DisponibilidadTurnosView.as_view(),
+         name='disponibilidad_turnos_api'),
+
+    # --- Reportes ---
+    path('reportes/poblacion/', views.ReportePoblacionView.as_view(), name='reporte_poblacion'),
+
+    # --- Tareas en segundo plano ---
+    path('tareas/<int:pk>/', views.TareaEstadoJsonView.as_view(), name='estado_tarea'),
+    path('tareas/<int:pk>/archivo/', views.TareaArchivoView.as_view(), name='archivo_tarea'),
+
+    # --- Métricas de rendimiento (solo staff) ---
+    path('metricas/', views.MetricasView.as_view(), name='metricas'),
 
     # =================================================================
     # ❌ RUTAS ELIMINADAS
@@ -6,21 +6,32 @@ from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, View
 )
 from django.urls import reverse_lazy, reverse
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.conf import settings
 from django.utils import timezone  # Necesario para filtrar turnos
+from django.utils.functional import SimpleLazyObject
 # ⭐ AGREGAR: Necesario para mensajes
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin  # <--- NUEVA IMPORTACIÓN
 # ⭐ NUEVA IMPORTACIÓN para transacciones atómicas
 from django.db import transaction
 # ⭐ NUEVAS IMPORTACIONES para la vista JSON de Turnos ⭐
-from django.http import JsonResponse, Http404
+from django.http import FileResponse, JsonResponse, Http404, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import quote_etag, urlencode
+import hashlib
+from pathlib import Path
+from asgiref.sync import sync_to_async
 
 # ⭐ IMPORTACIÓN NECESARIA PARA FILTROS OR (Q objects) ⭐
-from django.db.models import Q
+from django.db.models import Q, Count, Max
 
 from .models import (
-    Paciente, HistoriaClinica, ExamenOftalmologico, Profesional, ObraSocial, Turno,
+    Paciente, HistoriaClinica, ExamenOftalmologico, Profesional, ObraSocial, Turno, Tarea,
+    DURACION_MAXIMA_TURNO,
     # ❌ ELIMINADA: PrescripcionLentes ya no se importa
 )
 from .forms import (
@@ -28,77 +39,285 @@ from .forms import (
     TurnoEstadoForm,
     # ❌ ELIMINADA: PrescripcionLentesForm ya no se importa
 )
+from . import (
+    agenda, busqueda_clinica, catalogos, contadores, documentos, exportacion, metricas, replica, reportes, tareas,
+    tendencias, trabajos,
+)
+from .busqueda import buscar_pacientes
+from .paginacion import KeysetPaginationMixin, ListaPorIds
 
 # -------------------------------------------------------------
 # 1. DASHBOARD
 # -------------------------------------------------------------
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
-    """Vista principal que muestra métricas resumidas."""
+class LoginRequeridoAsyncMixin(LoginRequiredMixin):
+    """
+    LoginRequiredMixin que también sirve para vistas async: obtiene el usuario
+    con request.auser() en lugar de la carga síncrona de request.user.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.view_is_async:
+            return super().dispatch(request, *args, **kwargs)
+        return self._dispatch_login_async(request, *args, **kwargs)
+
+    async def _dispatch_login_async(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        # Se saltea LoginRequiredMixin.dispatch (síncrono): el usuario ya fue verificado
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+class LecturaReplicaMixin:
+    """
+    Ejecuta (y renderiza) la vista leyendo de la réplica (replica.py), salvo que
+    el navegador haya escrito hace poco y esté fijado a la base principal.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._dispatch_replica_async(request, *args, **kwargs)
+        replica.renovar_conexion()
+        with replica.leer_de_replica(not replica.primario_fijado(request)):
+            response = super().dispatch(request, *args, **kwargs)
+            # Las TemplateResponse se renderizan después de la vista: los querysets
+            # que se evalúan en la plantilla deben hacerlo todavía dentro del contexto.
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+
+    async def _dispatch_replica_async(self, request, *args, **kwargs):
+        # El contextvar de la réplica se propaga a las consultas que el ORM async
+        # ejecuta en threads (sync_to_async copia el contexto)
+        await sync_to_async(replica.renovar_conexion)()
+        with replica.leer_de_replica(not replica.primario_fijado(request)):
+            response = await super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                await sync_to_async(response.render)()
+            return response
+
+
+class DashboardView(LoginRequeridoAsyncMixin, LecturaReplicaMixin, TemplateView):
+    """Vista principal que muestra métricas resumidas (async)."""
     template_name = 'gestion_clinica/dashboard.html'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Métricas simples para el dashboard
-        context['total_pacientes'] = Paciente.objects.count()
-        # Ejemplo: Consultas/Registros en el último mes
-        hace_un_mes = timezone.now() - timezone.timedelta(days=30)
-        context['consultas_mes'] = HistoriaClinica.objects.filter(
-            fecha__gte=hace_un_mes).count()
-        # Ejemplo: Próximos turnos en los próximos 7 días
-        hace_siete_dias = timezone.now() + timezone.timedelta(days=7)
-        context['proximos_turnos'] = Turno.objects.filter(
-            fecha_hora__range=[timezone.now(), hace_siete_dias]
-        ).count()
-        return context
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        # Métricas leídas de los contadores materializados (contadores.py):
+        # unas pocas filas por día en lugar de contar las tablas completas.
+        ahora = timezone.now()
+        context['total_pacientes'] = await contadores.atotal(contadores.TOTAL_PACIENTES)
+        # Consultas/Registros en los últimos 30 días (las HC se fechan al cargarlas)
+        context['consultas_mes'] = await contadores.acontar_entre(
+            contadores.CONSULTAS, ahora - timezone.timedelta(days=30), ahora)
+        # Turnos desde ahora hasta dentro de 7 días
+        context['proximos_turnos'] = await contadores.acontar_entre(
+            contadores.TURNOS, ahora, ahora + timezone.timedelta(days=7))
+        return self.render_to_response(context)
 
 # -------------------------------------------------------------
 # 2. VISTAS PARA PACIENTES (CRUD)
 # -------------------------------------------------------------
 
 
-class PacienteListView(LoginRequiredMixin, ListView):
+class PacienteListView(LoginRequiredMixin, LecturaReplicaMixin, KeysetPaginationMixin, ListView):
     model = Paciente
     template_name = 'gestion_clinica/paciente_list.html'
     context_object_name = 'pacientes'
     paginate_by = 10
+    # Paginación por cursor opcional (?paginacion=cursor), en el orden alfabético del listado
+    keyset_ordering = ('apellido', 'nombre', 'id')
+    # Ids por consulta al aplicar el rango de edad sobre los resultados de una búsqueda
+    lote_filtro_edad = 500
+
+    def usar_keyset(self):
+        # Los resultados de una búsqueda están ordenados por relevancia: usan números de página
+        return super().usar_keyset() and not self.request.GET.get('q', '').strip()
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('obra_social')
 
         # 1. Obtener el término de búsqueda, asumiendo que el campo en el template es 'q'.
-        query = self.request.GET.get('q')
+        query = self.request.GET.get('q', '').strip()
+
+        # 2. Rango de edad opcional: se resuelve como rango de fechas de nacimiento (reportes.py)
+        edad_min, edad_max = reportes.parsear_rango(self.request.GET)
+        if not query:
+            return reportes.filtrar_por_edad(queryset, edad_min, edad_max)
+
+        # 3. Resolver la búsqueda con el índice (DNI, apellido, nombre y N° de registro),
+        # en el orden por relevancia del motor. Se piden solo las coincidencias hasta
+        # la página actual y una más (para saber si hay otra); cada página trae solo
+        # sus pacientes (ListaPorIds).
+        pagina = self.request.GET.get(self.page_kwarg, '')
+        necesarios = (int(pagina) if pagina.isdigit() and int(pagina) > 0 else 1) * self.paginate_by + 1
+        filtrar_edad = edad_min is not None or edad_max is not None
+        limite = necesarios
+        while True:
+            ids = buscar_pacientes(query, limite=limite)
+            agotado = len(ids) < limite
+            if filtrar_edad:
+                ids = self.filtrar_ids_por_edad(queryset, ids, edad_min, edad_max)
+            if agotado or len(ids) >= necesarios:
+                break
+            # El rango de edad descartó demasiados: se piden más coincidencias
+            limite *= 4
+        if agotado:
+            return ListaPorIds(queryset, ids)
+        return ListaPorIds(queryset, ids[:necesarios], parcial=True)
+
+    def filtrar_ids_por_edad(self, queryset, ids, edad_min, edad_max):
+        """Los ids (en el mismo orden) de los pacientes dentro del rango de edad."""
+        permitidos = set()
+        for inicio in range(0, len(ids), self.lote_filtro_edad):
+            lote = queryset.filter(pk__in=ids[inicio:inicio + self.lote_filtro_edad])
+            permitidos.update(
+                reportes.filtrar_por_edad(lote, edad_min, edad_max).values_list('pk', flat=True))
+        return [paciente_id for paciente_id in ids if paciente_id in permitidos]
 
-        if query:
-            # 2. Aplicar el filtro de búsqueda OR en DNI y Apellido (insensible a mayúsculas)
-            queryset = queryset.filter(
-                Q(dni__icontains=query) |
-                Q(apellido__icontains=query)
-            ).distinct()  # Evita resultados duplicados
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '').strip()
+        context['edad_min'], context['edad_max'] = reportes.parsear_rango(self.request.GET)
+        return context
 
-        return queryset
+
+class BuscarPacientesJsonView(LoginRequeridoAsyncMixin, LecturaReplicaMixin, View):
+    """
+    API de búsqueda de pacientes (async) para autocompletado:
+    ?q=texto[&limite=N] -> {"results": [{id, text, dni, num_registro, url}, ...]}
+    """
+    limite_defecto = 20
+    limite_maximo = 50
+
+    async def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        limite = request.GET.get('limite', '')
+        limite = min(int(limite), self.limite_maximo) if limite.isdigit() else self.limite_defecto
+        if not query or not limite:
+            return JsonResponse({'results': []})
+
+        # El motor de búsqueda es síncrono (varias consultas al índice): corre en un thread
+        ids = await sync_to_async(buscar_pacientes)(query, limite)
+        filas = {
+            fila['pk']: fila
+            async for fila in Paciente.objects.filter(pk__in=ids).values(
+                'pk', 'apellido', 'nombre', 'dni', 'num_registro').aiterator()
+        }
+
+        url_detalle = reverse('gestion_clinica:detalle_paciente', kwargs={'pk': 0})
+        prefijo_url, sufijo_url = url_detalle.rsplit('/0/', 1)
+        resultados = [
+            {
+                'id': fila['pk'],
+                'text': f"{fila['apellido']}, {fila['nombre']} (DNI {fila['dni']})",
+                'dni': fila['dni'],
+                'num_registro': fila['num_registro'],
+                'url': f"{prefijo_url}/{fila['pk']}/{sufijo_url}",
+            }
+            # Se conserva el orden por relevancia del motor
+            for fila in (filas.get(paciente_id) for paciente_id in ids) if fila
+        ]
+        return JsonResponse({'results': resultados})
+
+
+class AutocompletarCatalogoView(LoginRequeridoAsyncMixin, LecturaReplicaMixin, View):
+    """
+    API de autocompletado (async) para los catálogos: ?q=texto -> {"results": [{id, text}, ...]}.
+    Cada palabra debe aparecer en alguno de los campos de búsqueda del catálogo.
+    """
+    catalogos = {
+        'profesional': (Profesional, ('apellido', 'nombre', 'matricula')),
+        'obra-social': (ObraSocial, ('nombre', 'siglas')),
+    }
+    limite = 20
+
+    async def get(self, request, catalogo, *args, **kwargs):
+        if catalogo not in self.catalogos:
+            raise Http404("Catálogo inexistente.")
+        modelo, campos = self.catalogos[catalogo]
+
+        queryset = modelo.objects.all()
+        for palabra in request.GET.get('q', '').split():
+            filtro = Q()
+            for campo in campos:
+                filtro |= Q(**{f'{campo}__icontains': palabra})
+            queryset = queryset.filter(filtro)
+
+        resultados = [
+            {'id': objeto.pk, 'text': str(objeto)}
+            async for objeto in queryset[:self.limite]
+        ]
+        return JsonResponse({'results': resultados})
+
+
+class LineaTiempoPacienteMixin:
+    """
+    Consulta de la línea de tiempo (HC + E.O.) de un paciente con un número fijo
+    de consultas por página: una para los totales y otra para la página, con el
+    profesional y el examen ya unidos (select_related).
+    """
+    historias_por_pagina = 10
+
+    def get_historias_queryset(self, paciente_id):
+        return HistoriaClinica.objects.filter(
+            paciente_id=paciente_id
+        ).select_related('profesional', 'examen').order_by('-fecha', '-pk')
+
+    def get_totales(self, paciente_id):
+        return HistoriaClinica.objects.filter(paciente_id=paciente_id).aggregate(
+            total_historias=Count('pk'), total_examenes=Count('examen'))
+
+    def get_pagina_historias(self, paciente_id, pagina, totales):
+        """Devuelve el contexto de una página de la línea de tiempo (la 1 es la más reciente)."""
+        desde = (pagina - 1) * self.historias_por_pagina
+        hasta = desde + self.historias_por_pagina
+        total = totales['total_historias']
+        en_pagina = max(0, min(hasta, total) - desde)
+
+        return {
+            'historias': self.get_historias_queryset(paciente_id)[desde:hasta],
+            'pagina': pagina,
+            'hay_mas': hasta < total,
+            'siguiente_pagina': pagina + 1,
+            # Consulta N° = total - posición absoluta: se suma a forloop.revcounter
+            'base_numeracion': total - desde - en_pagina,
+        }
 
 
-class PacienteDetailView(LoginRequiredMixin, DetailView):
+class PacienteDetailView(LoginRequiredMixin, LineaTiempoPacienteMixin, DetailView):
     model = Paciente
     template_name = 'gestion_clinica/paciente_detail.html'
     context_object_name = 'paciente'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('obra_social')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Ordenamos las historias de la más reciente a la más antigua
-        context['historias'] = HistoriaClinica.objects.filter(
-            paciente=self.object
-        ).order_by('-fecha')
-
-        # ⭐ SE MANTIENE SOLO LA LISTA COMPLETA DE EXÁMENES (Inmutables)
-        context['examenes_oftalmologicos_todos'] = ExamenOftalmologico.objects.filter(
-            historia_clinica__paciente=self.object
-        ).order_by('-historia_clinica__fecha')
-
-        # Compatibilidad con la plantilla: todos son 'activos' ahora
-        context['examenes_oftalmologicos_activos'] = context['examenes_oftalmologicos_todos']
+        paciente_pk = self.object.pk
+
+        def get_linea_tiempo():
+            totales = self.get_totales(paciente_pk)
+            # Solo se renderizan las N consultas más recientes (de la más reciente a la más antigua);
+            # las anteriores se cargan bajo demanda desde PacienteHistoriasFragmentoView.
+            # El mismo queryset alimenta las pestañas de Historial y de Exámenes.
+            return {**totales, **self.get_pagina_historias(paciente_pk, 1, totales)}
+
+        # Se evalúa recién al renderizar la ficha: si el fragmento está en caché
+        # (ver {% cache %} en el template) no se consultan HC ni E.O.
+        context['linea_tiempo'] = SimpleLazyObject(get_linea_tiempo)
+        context['paciente_pk'] = paciente_pk
+        context['ficha_cache_segundos'] = settings.FICHA_PACIENTE_CACHE_SEGUNDOS
+        # Los nombres de profesional y obra social salen de los catálogos: su versión
+        # también forma parte de la clave del fragmento
+        versiones = []
+        for catalogo in (catalogos.OBRAS_SOCIALES, catalogos.PROFESIONALES):
+            catalogo.por_pk()  # verifica la versión vigente del catálogo
+            versiones.append(catalogo.version)
+        context['version_catalogos'] = '.'.join(map(str, versiones))
 
         # ❌ ELIMINADO: Contexto para Prescripciones de Lentes
         # context['prescripciones_lentes'] = PrescripcionLentes.objects.filter(
@@ -108,6 +327,55 @@ class PacienteDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
+class PacienteHistoriasFragmentoView(LoginRequiredMixin, LineaTiempoPacienteMixin, TemplateView):
+    """
+    Fragmento HTML con una página anterior de la línea de tiempo del paciente.
+    El parámetro 'seccion' indica si se piden paneles del historial o filas de exámenes.
+    """
+    templates_por_seccion = {
+        'historial': 'gestion_clinica/paciente_historias_fragmento.html',
+        'examenes': 'gestion_clinica/paciente_examenes_fragmento.html',
+    }
+
+    def get_template_names(self):
+        seccion = self.request.GET.get('seccion', 'historial')
+        if seccion not in self.templates_por_seccion:
+            raise Http404("Sección inexistente.")
+        return [self.templates_por_seccion[seccion]]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        pagina = self.request.GET.get('page', '2')
+        if not pagina.isdigit() or int(pagina) < 1:
+            raise Http404("Página inválida.")
+
+        totales = self.get_totales(self.kwargs['pk'])
+        if not totales['total_historias']:
+            raise Http404("El paciente no tiene consultas registradas.")
+
+        context.update(self.get_pagina_historias(self.kwargs['pk'], int(pagina), totales))
+        context['paciente_pk'] = self.kwargs['pk']
+        return context
+
+
+class PacienteTendenciasJsonView(LoginRequiredMixin, View):
+    """
+    Evolución de PIO y AV del paciente (tendencias.py) para el gráfico de la ficha.
+    El ETag es el sello de versión del paciente: sin consultas nuevas responde 304.
+    """
+
+    def get(self, request, *args, **kwargs):
+        paciente = get_object_or_404(Paciente.objects.only('pk', 'ficha_actualizada'), pk=self.kwargs['pk'])
+        etag = quote_etag(tendencias.version(paciente))
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(tendencias.de_paciente(paciente))
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
 # <--- MIXIN APLICADO
 class PacienteCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     model = Paciente
@@ -234,7 +502,7 @@ class ExamenOftalmologicoDetailView(LoginRequiredMixin, DetailView):
 # ⭐⭐ VISTAS DE LISTADO Y CREACIÓN (YA IMPLEMENTADAS Y CORREGIDAS) ⭐⭐
 
 
-class ProfesionalListView(LoginRequiredMixin, ListView):
+class ProfesionalListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = Profesional
     template_name = 'gestion_clinica/profesional_list.html'
     context_object_name = 'profesionales'
@@ -270,7 +538,7 @@ class ProfesionalDeleteView(LoginRequiredMixin, DeleteView):
         return super().form_valid(form)
 
 
-class ObraSocialListView(LoginRequiredMixin, ListView):
+class ObraSocialListView(LoginRequiredMixin, LecturaReplicaMixin, ListView):
     model = ObraSocial
     template_name = 'gestion_clinica/obra_social_list.html'
     context_object_name = 'obras_sociales'
@@ -311,18 +579,21 @@ class ObraSocialDeleteView(LoginRequiredMixin, DeleteView):
 # -------------------------------------------------------------
 
 
-class TurnoListView(LoginRequiredMixin, ListView):
+class TurnoListView(LoginRequiredMixin, LecturaReplicaMixin, KeysetPaginationMixin, ListView):
     # ⭐ CORRECCIÓN CLAVE: Define el modelo para resolver ImproperlyConfigured ⭐
     model = Turno
     template_name = 'gestion_clinica/turno_list.html'
     context_object_name = 'turnos'
     paginate_by = 20
+    # Paginación por cursor opcional (?paginacion=cursor) para el listado de auditoría
+    keyset_ordering = ('fecha_hora', 'id')
 
     def get_queryset(self):
         # 1. Obtener todos los turnos por defecto, ordenados por fecha y hora
         # Usamos filter(fecha_hora__gte=timezone.now()) para mostrar solo los futuros/actuales,
         # pero para el listado general es mejor mostrar todos para auditoría.
-        queryset = super().get_queryset().order_by('fecha_hora')
+        queryset = super().get_queryset().select_related(
+            'paciente', 'profesional').order_by('fecha_hora', 'id')
 
         # 2. Obtener parámetros de filtro de la URL
         fecha_str = self.request.GET.get('fecha')
@@ -354,8 +625,8 @@ class TurnoListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Necesario para el formulario de filtro en la plantilla
-        context['profesionales'] = Profesional.objects.all()
+        # Necesario para el formulario de filtro en la plantilla (caché de catalogos.py)
+        context['profesionales'] = catalogos.PROFESIONALES.todos()
 
         # Pasar los valores de filtro actuales para que el formulario se mantenga seleccionado
         context['fecha_actual'] = self.request.GET.get('fecha', '')
@@ -375,6 +646,18 @@ class TurnoCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     success_url = reverse_lazy('gestion_clinica:lista_turnos')
     success_message = "Turno agendado exitosamente."
 
+    def form_valid(self, form):
+        # La reserva se confirma con la agenda del profesional bloqueada: si otro
+        # puesto tomó el mismo horario un instante antes, se informa en el formulario.
+        try:
+            self.object = agenda.reservar(form.save(commit=False))
+        except ValidationError as error:
+            form.add_error('fecha_hora', error)
+            return self.form_invalid(form)
+
+        messages.success(self.request, self.get_success_message(form.cleaned_data))
+        return redirect(self.get_success_url())
+
 
 class TurnoDetailView(LoginRequiredMixin, SuccessMessageMixin, UpdateView):
     # Usamos UpdateView para permitir cambiar el estado y/o detalles del turno
@@ -390,45 +673,161 @@ class TurnoDetailView(LoginRequiredMixin, SuccessMessageMixin, UpdateView):
     def get_success_url(self):
         return reverse('gestion_clinica:detalle_turno', kwargs={'pk': self.object.pk})
 
+    def form_valid(self, form):
+        # Reactivar un turno cancelado vuelve a ocupar la agenda: se guarda con la agenda
+        # bloqueada (agenda.reservar), igual que un alta.
+        try:
+            self.object = agenda.reservar(form.save(commit=False))
+        except ValidationError as error:
+            form.add_error('estado', error)
+            return self.form_invalid(form)
 
-class TurnosJsonView(LoginRequiredMixin, ListView):
-    model = Turno
+        messages.success(self.request, self.get_success_message(form.cleaned_data))
+        return redirect(self.get_success_url())
 
-    # Deshabilita la paginación y la obtención de contexto estándar
-    def get_context_data(self, **kwargs):
-        return {}
+
+class FechaIsoMixin:
+    """Lectura de fechas ISO 8601 de la query string (calendario y disponibilidad)."""
+
+    def _parse_fecha(self, valor):
+        """
+        Fecha ISO 8601, con o sin hora/zona horaria (ej: '2025-10-27T00:00:00-03:00'
+        o '2025-10-27', como las envía FullCalendar); None si no es válida.
+        """
+        if not valor:
+            return None
+        # El '+' de la zona horaria puede llegar como espacio si no se codificó
+        valor = valor.strip().replace(' ', '+')
+        try:
+            fecha = parse_datetime(valor)
+            if fecha is None:
+                dia = parse_date(valor)
+                if dia is None:
+                    return None
+                fecha = timezone.datetime.combine(dia, timezone.datetime.min.time())
+        except ValueError:
+            return None
+
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
+
+
+class TurnosJsonView(LoginRequeridoAsyncMixin, LecturaReplicaMixin, FechaIsoMixin, View):
+    """
+    Fuente de eventos para FullCalendar.
+
+    Sirve solo la ventana [start, end) que envía el calendario (más los filtros
+    opcionales 'profesional' y 'estado'), construida a partir de una proyección
+    values() y con las URLs de detalle precalculadas. Responde con ETag para que
+    las recargas de una semana sin cambios cuesten un 304. No envía Last-Modified:
+    borrar un turno no cambia ninguna fecha de la ventana, solo la firma del ETag.
+    """
+    # Ventana por defecto si el cliente no envía start/end (compatibilidad)
+    ventana_por_defecto = timezone.timedelta(days=7)
+    # Margen para incluir turnos que comienzan antes de la ventana pero terminan dentro
+    margen_inicio = timezone.timedelta(minutes=DURACION_MAXIMA_TURNO)
+
+    campos_evento = (
+        'pk', 'fecha_hora', 'duracion', 'estado', 'profesional_id',
+        'paciente__apellido', 'paciente__nombre',
+    )
+
+    def get_rango(self):
+        """Obtiene la ventana solicitada a partir de los parámetros start/end."""
+        inicio = self._parse_fecha(self.request.GET.get('start'))
+        fin = self._parse_fecha(self.request.GET.get('end'))
+
+        if inicio is None:
+            inicio = timezone.now() - timezone.timedelta(hours=6)
+        if fin is None or fin <= inicio:
+            fin = inicio + self.ventana_por_defecto
+        return inicio, fin
 
     def get_queryset(self):
-        # Filtra turnos para mostrar solo los futuros o confirmados (para el calendario)
-        # Esto es un ejemplo, se puede ajustar la lógica de filtro según el calendario JS.
+        inicio, fin = self.get_rango()
+        # Se incluyen los turnos que comienzan poco antes de la ventana pero terminan dentro
         queryset = Turno.objects.filter(
-            fecha_hora__gte=timezone.now() - timezone.timedelta(hours=6)
-        ).select_related('paciente', 'profesional')
+            fecha_hora__gte=inicio - self.margen_inicio,
+            fecha_hora__lt=fin,
+        )
+
+        profesional_id = self.request.GET.get('profesional')
+        if profesional_id and profesional_id.isdigit():
+            queryset = queryset.filter(profesional_id=profesional_id)
+
+        estado = self.request.GET.get('estado')
+        if estado and estado != 'todos':
+            queryset = queryset.filter(estado=estado)
 
         return queryset
 
-    def render_to_response(self, context):
-        # ⭐ CORRECCIÓN APLICADA AQUÍ: Definimos una duración fija de 30 minutos para evitar AttributeError ⭐
-        duracion_defecto = timezone.timedelta(minutes=30)
-
-        # Convierte el queryset a un formato JSON compatible con FullCalendar
-        data = []
-        for turno in self.get_queryset():
-
-            # Usamos la duración por defecto para calcular la hora de finalización
-            hora_fin = turno.fecha_hora + duracion_defecto
-
-            data.append({
-                'id': turno.pk,
-                'title': f'{turno.paciente.apellido}, {turno.paciente.nombre} ({turno.estado})',
-                'start': turno.fecha_hora.isoformat(),
-                # ⭐ LÍNEA CORREGIDA PARA USAR hora_fin ⭐
-                'end': hora_fin.isoformat(),
-                'url': reverse('gestion_clinica:detalle_turno', kwargs={'pk': turno.pk}),
-                # Colores basados en el estado (esto es solo un ejemplo de estilo)
-                'color': self.get_color_for_estado(turno.estado)
-            })
-        return JsonResponse(data, safe=False)
+    def get_validadores(self, resumen):
+        """
+        ETag a partir del resumen agregado de la ventana (cantidad de turnos, máximo
+        id, última modificación y última ficha de paciente: una única consulta).
+        """
+        firma = '|'.join(str(valor) for valor in (
+            self.request.GET.get('start', ''),
+            self.request.GET.get('end', ''),
+            self.request.GET.get('profesional', ''),
+            self.request.GET.get('estado', ''),
+            resumen['total'],
+            resumen['ultimo_id'],
+            resumen['ultima_modificacion'].isoformat() if resumen['ultima_modificacion'] else '',
+            # Los títulos incluyen el paciente: editarlo actualiza su ficha_actualizada
+            resumen['ultima_ficha'].isoformat() if resumen['ultima_ficha'] else '',
+            # Los títulos incluyen el profesional: renombrarlo cambia la respuesta
+            resumen['version_profesionales'],
+        ))
+        return quote_etag(hashlib.md5(firma.encode(), usedforsecurity=False).hexdigest())
+
+    async def get(self, request, *args, **kwargs):
+        # Vista async: en ASGI, las pestañas que consultan el calendario no ocupan un thread cada una
+        queryset = self.get_queryset()
+        resumen = await queryset.aaggregate(
+            total=Count('pk'), ultimo_id=Max('pk'), ultima_modificacion=Max('actualizado'),
+            ultima_ficha=Max('paciente__ficha_actualizada'))
+        # Profesionales desde la caché de catálogos (sin JOIN); puede consultar la versión
+        profesionales = await sync_to_async(catalogos.PROFESIONALES.por_pk)()
+        resumen['version_profesionales'] = catalogos.PROFESIONALES.version
+        etag = self.get_validadores(resumen)
+
+        # Devuelve 304 si el cliente ya tiene la versión vigente de la ventana
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            # Precalculamos la URL de detalle una sola vez y solo sustituimos el pk
+            url_detalle = reverse('gestion_clinica:detalle_turno', kwargs={'pk': 0})
+            prefijo_url, sufijo_url = url_detalle.rsplit('/0/', 1)
+            eventos = [
+                self.get_evento(turno, profesionales, prefijo_url, sufijo_url)
+                async for turno in queryset.order_by('fecha_hora').values(*self.campos_evento).aiterator()
+            ]
+            response = JsonResponse(eventos, safe=False)
+
+        response.headers['ETag'] = etag
+        # Obliga al navegador a revalidar siempre (con If-None-Match)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_evento(self, turno, profesionales, prefijo_url, sufijo_url):
+        """Convierte una fila de la proyección al formato JSON de FullCalendar."""
+        # La hora de finalización surge de la duración propia de cada turno
+        hora_fin = turno['fecha_hora'] + timezone.timedelta(minutes=turno['duracion'])
+        titulo = f"{turno['paciente__apellido']}, {turno['paciente__nombre']} ({turno['estado']})"
+        profesional = profesionales.get(turno['profesional_id'])
+        if profesional:
+            titulo = f"{titulo} - {profesional.apellido}"
+        return {
+            'id': turno['pk'],
+            'title': titulo,
+            'start': turno['fecha_hora'].isoformat(),
+            'end': hora_fin.isoformat(),
+            'url': f"{prefijo_url}/{turno['pk']}/{sufijo_url}",
+            # Colores basados en el estado (esto es solo un ejemplo de estilo)
+            'color': self.get_color_for_estado(turno['estado'])
+        }
 
     def get_color_for_estado(self, estado):
         colores = {
@@ -441,6 +840,326 @@ class TurnosJsonView(LoginRequiredMixin, ListView):
         return colores.get(estado, '#000000')  # Negro por defecto
 
 
+class DisponibilidadTurnosView(LoginRequiredMixin, FechaIsoMixin, View):
+    """
+    API de disponibilidad para el formulario de turnos (agenda.py).
+
+    - ?profesional=ID[&desde=ISO][&cantidad=N]: próximos N slots libres.
+    - ?profesional=ID&inicio=ISO&duracion=MIN: indica si ese intervalo está libre.
+    """
+    cantidad_maxima = 50
+
+    def get(self, request, *args, **kwargs):
+        profesional_id = request.GET.get('profesional', '')
+        if not profesional_id.isdigit():
+            return JsonResponse({'error': "Debe indicar un profesional."}, status=400)
+
+        inicio = self._parse_fecha(request.GET.get('inicio'))
+        if inicio:
+            duracion = request.GET.get('duracion', '30')
+            if not duracion.isdigit() or not 0 < int(duracion) <= DURACION_MAXIMA_TURNO:
+                return JsonResponse({'error': "Duración inválida."}, status=400)
+            return JsonResponse({
+                'inicio': inicio.isoformat(),
+                'libre': agenda.esta_libre(int(profesional_id), inicio, int(duracion)),
+            })
+
+        cantidad = request.GET.get('cantidad', '5')
+        cantidad = min(int(cantidad), self.cantidad_maxima) if cantidad.isdigit() else 5
+        desde = self._parse_fecha(request.GET.get('desde'))
+        if desde is not None:
+            desde = max(desde, timezone.now())
+        libres = agenda.proximos_libres(int(profesional_id), desde=desde, cantidad=cantidad)
+        return JsonResponse({
+            'libres': [
+                {
+                    'inicio': timezone.localtime(slot_inicio).isoformat(),
+                    'fin': timezone.localtime(slot_fin).isoformat(),
+                    'duracion': int((slot_fin - slot_inicio).total_seconds() // 60),
+                }
+                for slot_inicio, slot_fin in libres
+            ],
+        })
+
+
+# -------------------------------------------------------------
+# 7. EXPORTACIÓN
+# -------------------------------------------------------------
+
+
+class ExportarHistoriasView(LoginRequiredMixin, UserPassesTestMixin, LecturaReplicaMixin, View):
+    """
+    Descarga en streaming de HC + E.O. (solo personal autorizado).
+
+    GET ?formato=csv|ndjson&desde=AAAA-MM-DD&hasta=AAAA-MM-DD&profesional=ID
+    POST con los mismos parámetros: encola la exportación como tarea en segundo
+    plano (tareas.py) y responde 202 con la URL de estado.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_parametros(self, datos):
+        """(formato, desde, hasta, profesional_id) validados; JsonResponse 400 si hay errores."""
+        formato = datos.get('formato', 'csv')
+        if formato not in exportacion.FORMATOS:
+            return JsonResponse({'error': "Formato inválido (csv o ndjson)."}, status=400)
+
+        try:
+            desde = self._parse_dia(datos.get('desde'))
+            hasta = self._parse_dia(datos.get('hasta'))
+        except ValueError:
+            return JsonResponse({'error': "Fechas inválidas (use AAAA-MM-DD)."}, status=400)
+
+        profesional_id = datos.get('profesional', '')
+        if profesional_id and not profesional_id.isdigit():
+            return JsonResponse({'error': "Profesional inválido."}, status=400)
+        return formato, desde, hasta, profesional_id or None
+
+    def get(self, request, *args, **kwargs):
+        parametros = self.get_parametros(request.GET)
+        if isinstance(parametros, JsonResponse):
+            return parametros
+        formato, desde, hasta, profesional_id = parametros
+
+        queryset = exportacion.historias_para_exportar(desde, hasta, profesional_id)
+        # La respuesta se genera después de salir de la vista: se fija ya la base elegida por el router
+        queryset = queryset.using(queryset.db)
+        generador, content_type, extension = exportacion.FORMATOS[formato]
+        contenido = generador(queryset)
+        if isinstance(request, ASGIRequest):
+            # Con un iterador síncrono, Django bajo ASGI acumularía el archivo entero antes de enviarlo
+            contenido = exportacion.en_async(contenido)
+        response = StreamingHttpResponse(contenido, content_type=content_type)
+        nombre = f"historias_{timezone.localdate():%Y%m%d}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        # Evita que un proxy intermedio acumule la respuesta completa antes de enviarla
+        response['X-Accel-Buffering'] = 'no'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+    def post(self, request, *args, **kwargs):
+        parametros = self.get_parametros(request.POST)
+        if isinstance(parametros, JsonResponse):
+            return parametros
+        formato, desde, hasta, profesional_id = parametros
+
+        tarea = tareas.encolar('exportar_historias', {
+            'formato': formato,
+            'desde': desde.isoformat() if desde else None,
+            'hasta': hasta.isoformat() if hasta else None,
+            'profesional': int(profesional_id) if profesional_id else None,
+        }, usuario=request.user)
+        return JsonResponse({
+            'id': tarea.pk,
+            'estado': tarea.estado,
+            'url_estado': reverse('gestion_clinica:estado_tarea', kwargs={'pk': tarea.pk}),
+        }, status=202)
+
+    def _parse_dia(self, valor):
+        if not valor or not valor.strip():
+            return None
+        dia = parse_date(valor.strip())
+        if dia is None:
+            raise ValueError(valor)
+        return dia
+
+
+# -------------------------------------------------------------
+# 8. MÉTRICAS DE RENDIMIENTO
+# -------------------------------------------------------------
+
+
+class MetricasView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Latencias p50/p95/p99 por vista registradas por InstrumentacionMiddleware (solo staff)."""
+    template_name = 'gestion_clinica/metricas.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filas'] = metricas.registro.resumen()
+        context['capacidad'] = metricas.registro.capacidad
+        return context
+
+
+# -------------------------------------------------------------
+# 9. REPORTES
+# -------------------------------------------------------------
+
+
+class ReportePoblacionView(LoginRequiredMixin, LecturaReplicaMixin, TemplateView):
+    """
+    Pacientes por franja de edad, género y obra social (reportes.py), con filtros
+    opcionales ?edad_min=&edad_max=&genero=. Se resuelve con una consulta agrupada.
+    """
+    template_name = 'gestion_clinica/reporte_poblacion.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        edad_min, edad_max = reportes.parsear_rango(self.request.GET)
+        genero = self.request.GET.get('genero', '')
+        if genero not in dict(Paciente.GENERO_CHOICES):
+            genero = ''
+
+        queryset = reportes.filtrar_por_edad(Paciente.objects.all(), edad_min, edad_max)
+        if genero:
+            queryset = queryset.filter(genero=genero)
+
+        context.update(
+            reporte=reportes.reporte_poblacion(queryset),
+            edad_min=edad_min,
+            edad_max=edad_max,
+            genero=genero,
+            generos=Paciente.GENERO_CHOICES,
+        )
+        return context
+
+
+class BusquedaClinicaView(LoginRequiredMixin, LecturaReplicaMixin, TemplateView):
+    """
+    Búsqueda de texto completo en motivo, diagnóstico, tratamiento y observaciones
+    de la HC y en biomicroscopía, fondo de ojo y observaciones del E.O.
+    (busqueda_clinica.py). ?q=&campo=&paciente=&page=
+    """
+    template_name = 'gestion_clinica/busqueda_clinica.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        parametros = self.request.GET
+        q = parametros.get('q', '').strip()
+        campo = parametros.get('campo', '')
+        if campo not in dict(busqueda_clinica.CAMPOS):
+            campo = ''
+        pagina = parametros.get('page', '')
+        pagina = int(pagina) if pagina.isdigit() and int(pagina) > 0 else 1
+        paciente_id = parametros.get('paciente', '')
+        paciente_id = int(paciente_id) if paciente_id.isdigit() else None
+
+        context.update(
+            q=q,
+            campo=campo,
+            campos=busqueda_clinica.CAMPOS,
+            paciente_id=paciente_id,
+            busqueda=busqueda_clinica.buscar(q, campo or None, pagina, paciente_id=paciente_id),
+            parametros_paginacion=urlencode(
+                {clave: valor for clave, valor in (('q', q), ('campo', campo), ('paciente', paciente_id)) if valor}),
+        )
+        return context
+
+
+# -------------------------------------------------------------
+# 10. TAREAS EN SEGUNDO PLANO
+# -------------------------------------------------------------
+
+
+class TareaUsuarioMixin(LoginRequiredMixin):
+    """Tarea de la URL; solo la ve quien la encoló (o el personal autorizado)."""
+
+    def get_tarea(self):
+        tarea = get_object_or_404(Tarea, pk=self.kwargs['pk'])
+        if tarea.usuario_id != self.request.user.pk and not self.request.user.is_staff:
+            raise Http404("Tarea inexistente.")
+        return tarea
+
+
+class TareaEstadoJsonView(TareaUsuarioMixin, View):
+    """Estado y progreso de una tarea (para consultar periódicamente desde el navegador)."""
+
+    def get(self, request, *args, **kwargs):
+        tarea = self.get_tarea()
+        datos = {
+            'id': tarea.pk,
+            'tipo': tarea.tipo,
+            'estado': tarea.estado,
+            'progreso': tarea.progreso,
+            'mensaje': tarea.mensaje,
+            'intentos': tarea.intentos,
+            'max_intentos': tarea.max_intentos,
+            'creada': tarea.creada.isoformat(),
+            'iniciada': tarea.iniciada.isoformat() if tarea.iniciada else None,
+            'finalizada': tarea.finalizada.isoformat() if tarea.finalizada else None,
+            'resultado': tarea.resultado,
+            # Solo la última línea del traceback
+            'error': tarea.error.strip().splitlines()[-1] if tarea.error.strip() else '',
+            'terminada': tarea.estado in tareas.TERMINADAS,
+        }
+        if tarea.estado == tareas.COMPLETADA and (tarea.resultado or {}).get('archivo'):
+            datos['url_archivo'] = reverse('gestion_clinica:archivo_tarea', kwargs={'pk': tarea.pk})
+        response = JsonResponse(datos)
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
+class TareaArchivoView(TareaUsuarioMixin, View):
+    """Descarga del archivo generado por una tarea completada."""
+
+    def get(self, request, *args, **kwargs):
+        tarea = self.get_tarea()
+        nombre = (tarea.resultado or {}).get('archivo') if tarea.estado == tareas.COMPLETADA else None
+        if not nombre:
+            raise Http404("La tarea no generó un archivo.")
+        # Solo el nombre: nunca una ruta fuera del directorio de archivos
+        ruta = trabajos.directorio_archivos() / Path(nombre).name
+        if not ruta.is_file():
+            raise Http404("El archivo ya no existe.")
+        return FileResponse(
+            open(ruta, 'rb'), as_attachment=True, filename=ruta.name,
+            content_type=tarea.resultado.get('content_type'))
+
+
+# -------------------------------------------------------------
+# 11. DOCUMENTOS PDF
+# -------------------------------------------------------------
+
+
+class DocumentoPdfMixin:
+    """Sirve el PDF guardado por contenido (documentos.py); el ETag es la clave del contenido."""
+
+    def responder_pdf(self, request, datos, clave):
+        etag = quote_etag(clave)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(
+                open(documentos.obtener(datos), 'rb'), content_type='application/pdf',
+                filename=documentos.nombre_archivo(datos))
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ConsultaPdfView(LoginRequiredMixin, DocumentoPdfMixin, View):
+    """PDF de una consulta (HC + E.O.)."""
+
+    def get(self, request, *args, **kwargs):
+        try:
+            datos = documentos.datos_consulta(self.kwargs['hc_pk'])
+        except HistoriaClinica.DoesNotExist:
+            raise Http404("Historia clínica inexistente.")
+        return self.responder_pdf(request, datos, documentos.clave(datos))
+
+
+class FichaPdfView(LoginRequiredMixin, DocumentoPdfMixin, View):
+    """
+    PDF de la ficha completa del paciente. Si todavía no está en disco y tiene
+    muchas consultas, se genera en segundo plano: responde 202 hasta que esté listo.
+    """
+
+    def get(self, request, *args, **kwargs):
+        paciente = get_object_or_404(Paciente, pk=self.kwargs['pk'])
+        # Mientras se espera la tarea (un 202 cada 2 s) no se vuelve a cargar toda la historia
+        clave, cantidad_historias = documentos.clave_ficha(paciente)
+        if cantidad_historias <= documentos.CONSULTAS_SINCRONICAS or documentos.ruta(clave).is_file():
+            return self.responder_pdf(request, documentos.datos_ficha(paciente), clave)
+
+        tarea = documentos.encolar_ficha(paciente, clave, usuario=request.user)
+        response = JsonResponse({'tarea': tarea.pk, 'estado': tarea.estado, 'progreso': tarea.progreso}, status=202)
+        response['Retry-After'] = '2'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
 # =================================================================
 # ❌ ELIMINADAS: Todas las VISTAS de Prescripción de Lentes
 # =================================================================
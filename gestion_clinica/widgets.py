@@ -0,0 +1,54 @@
+# gestion_clinica/widgets.py
+
+"""
+Select con autocompletado remoto para claves foráneas con muchas filas
+(pacientes, profesionales, obras sociales).
+
+Un <select> común de ModelChoiceField emite un <option> por fila de la tabla.
+AutocompletarSelect solo renderiza la opción elegida; las demás se buscan con
+un endpoint JSON ({"results": [{"id", "text"}, ...]}) desde static/js/autocompletar.js.
+La validación no cambia: ModelChoiceField ya verifica solo el pk enviado.
+"""
+
+from django import forms
+from django.core.exceptions import ValidationError
+
+
+class AutocompletarSelect(forms.Select):
+
+    def __init__(self, url, attrs=None, minimo=2):
+        """url: endpoint de búsqueda (puede ser un reverse_lazy)."""
+        super().__init__(attrs)
+        self.url = url
+        self.minimo = minimo
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocompletar-url'] = str(self.url)
+        attrs['data-autocompletar-minimo'] = self.minimo
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Solo la opción vacía y las seleccionadas (una consulta por pk, no por tabla)."""
+        campo = self.choices.field
+        seleccionados = [valor for valor in value if valor not in campo.empty_values]
+
+        objetos = []
+        if seleccionados and getattr(campo, 'catalogo', None) is not None:
+            # Catálogo en caché (catalogos.py): sin consultas
+            objetos = [objeto for objeto in map(campo.catalogo.obtener, seleccionados) if objeto]
+        elif seleccionados:
+            clave = campo.to_field_name or 'pk'
+            try:
+                objetos = list(self.choices.queryset.filter(**{f'{clave}__in': seleccionados}))
+            except (ValueError, ValidationError):
+                # Valor enviado inválido: el campo ya informa el error
+                pass
+
+        opciones = []
+        if not self.is_required or not objetos:
+            opciones.append(self.create_option(name, '', campo.empty_label or '', not objetos, 0))
+        for indice, objeto in enumerate(objetos, start=len(opciones)):
+            opciones.append(self.create_option(
+                name, campo.prepare_value(objeto), campo.label_from_instance(objeto), True, indice))
+        return [(None, opciones, 0)]
@@ -0,0 +1,91 @@
+// static/js/autocompletar.js
+//
+// Autocompletado para los <select data-autocompletar-url> (gestion_clinica/widgets.py).
+// El select solo trae la opción elegida; este script agrega un campo de búsqueda
+// que consulta el endpoint JSON y reemplaza la opción del select al elegir.
+(function() {
+    var ESPERA_MS = 250;
+
+    function iniciar(select) {
+        var url = select.dataset.autocompletarUrl;
+        var minimo = parseInt(select.dataset.autocompletarMinimo || '2', 10);
+
+        var contenedor = document.createElement('div');
+        contenedor.className = 'position-relative mb-1';
+        var entrada = document.createElement('input');
+        entrada.type = 'search';
+        entrada.className = 'form-control form-control-sm';
+        entrada.placeholder = 'Buscar...';
+        entrada.autocomplete = 'off';
+        var lista = document.createElement('div');
+        lista.className = 'list-group position-absolute w-100 shadow d-none';
+        lista.style.zIndex = 1000;
+        contenedor.appendChild(entrada);
+        contenedor.appendChild(lista);
+        select.parentNode.insertBefore(contenedor, select);
+
+        var temporizador = null;
+        var pedido = 0;
+
+        function cerrar() {
+            lista.innerHTML = '';
+            lista.classList.add('d-none');
+        }
+
+        function elegir(resultado) {
+            select.innerHTML = '';
+            select.appendChild(new Option(resultado.text, resultado.id, true, true));
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+            entrada.value = '';
+            cerrar();
+        }
+
+        function buscar() {
+            var texto = entrada.value.trim();
+            if (texto.length < minimo) {
+                cerrar();
+                return;
+            }
+            var numero = ++pedido;
+            fetch(url + '?q=' + encodeURIComponent(texto), {credentials: 'same-origin'})
+                .then(function(respuesta) { return respuesta.json(); })
+                .then(function(datos) {
+                    // Se descartan respuestas de búsquedas anteriores que llegan tarde
+                    if (numero !== pedido) {
+                        return;
+                    }
+                    cerrar();
+                    (datos.results || []).forEach(function(resultado) {
+                        var item = document.createElement('button');
+                        item.type = 'button';
+                        item.className = 'list-group-item list-group-item-action';
+                        item.textContent = resultado.text;
+                        item.addEventListener('click', function() { elegir(resultado); });
+                        lista.appendChild(item);
+                    });
+                    if (lista.children.length) {
+                        lista.classList.remove('d-none');
+                    }
+                });
+        }
+
+        entrada.addEventListener('input', function() {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(buscar, ESPERA_MS);
+        });
+        entrada.addEventListener('keydown', function(evento) {
+            if (evento.key === 'Escape') {
+                cerrar();
+            }
+        });
+        document.addEventListener('click', function(evento) {
+            if (!contenedor.contains(evento.target)) {
+                cerrar();
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('select[data-autocompletar-url]').forEach(iniciar);
+    });
+})();